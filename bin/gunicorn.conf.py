@@ -0,0 +1,66 @@
+"""
+Gunicorn config for serving the API with many concurrent requests
+
+Run with:
+    gunicorn -c bin/gunicorn.conf.py coordinator.wsgi:application
+
+Settings may be overridden by the environment:
+    GUNICORN_WORKER_CLASS  `gthread` (default) or `gevent`
+    GUNICORN_WORKERS       Worker processes, defaults to 2 * CPUs + 1 for
+                           gthread and CPUs + 1 for gevent
+    GUNICORN_THREADS       Threads per gthread worker, defaults to 4
+    GUNICORN_CONNECTIONS   Concurrent requests per gevent worker,
+                           defaults to 100
+    GUNICORN_PRELOAD       Load the app once before forking workers,
+                           defaults to true
+"""
+import os
+import multiprocessing
+
+
+cpus = multiprocessing.cpu_count()
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded so that locks and sockets created at
+    # import are cooperative, and make psycopg2 yield while waiting on
+    # postgres
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+    workers = int(os.environ.get('GUNICORN_WORKERS', cpus + 1))
+    worker_connections = int(os.environ.get('GUNICORN_CONNECTIONS', 100))
+else:
+    workers = int(os.environ.get('GUNICORN_WORKERS', cpus * 2 + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+bind = 'localhost:5000'
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+# Long work, such as syncing studies, runs in rq workers, so a request that
+# takes longer than this is stuck
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def pre_fork(server, worker):
+    """
+    Close any database connections the master opened while preloading the
+    app so that workers don't share them. Redis connection pools reset
+    themselves in a new process.
+    """
+    from django.db import connections
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    """
+    Let prometheus know that a worker is gone so that its live values are
+    no longer reported
+    """
+    if os.environ.get('prometheus_multiproc_dir'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,10 @@
 #!/bin/ash
+# Metrics left by processes from a previous run would be counted again
+rm -rf "$prometheus_multiproc_dir"
+mkdir -p "$prometheus_multiproc_dir"
 if $WORKER ; then
     echo "Is worker"
+    python /app/manage.py worker_config > /etc/supervisor/conf.d/worker_pools.conf
     supervisord -c  /etc/supervisor/conf.d/worker.conf
 else
 	echo "Is not worker"
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import statistics
+import subprocess
+from django.core.management.base import BaseCommand, CommandError
+from coordinator import vault
+
+
+class Command(BaseCommand):
+    help = ('Time loading secrets from vault and from the local cache, and '
+            'the startup time of the app with each')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='Number of times to run each measurement')
+
+    def handle(self, *args, **options):
+        paths = vault.configured_paths()
+        if not paths:
+            raise CommandError('Vault is not configured. VAULT_URL, '
+                               'VAULT_ROLE and the paths of the secrets '
+                               'must be set.')
+        iterations = options['iterations']
+
+        self.report('load from vault', iterations,
+                    lambda: vault.load_secrets(paths, use_cache=False))
+        vault.load_secrets(paths)
+        self.report('load from cache', iterations,
+                    lambda: vault.load_secrets(paths))
+
+        self.report('startup from vault', iterations, self.startup,
+                    setup=vault.clear_cache)
+        self.report('startup from cache', iterations, self.startup)
+
+    def startup(self):
+        """ Start a new interpreter and set up django """
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=os.environ.get(
+                       'DJANGO_SETTINGS_MODULE', 'coordinator.settings'))
+        subprocess.run([sys.executable, '-c',
+                        'import django; django.setup()'],
+                       env=env, check=True)
+
+    def report(self, name, iterations, func, setup=None):
+        times = []
+        for _ in range(iterations):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        self.stdout.write(f'{name:<20} mean {statistics.mean(times):.3f}s  '
+                          f'min {min(times):.3f}s  max {max(times):.3f}s')
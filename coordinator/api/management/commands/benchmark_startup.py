@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import statistics
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Run in a new interpreter to time setting up django and importing modules
+MEASURE = '''
+import sys
+import json
+import time
+import resource
+import importlib
+start = time.perf_counter()
+import django
+django.setup()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Measure the import time and memory of the api and worker entry '
+            'points, failing if either is over budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='Number of times to start each entry point')
+        parser.add_argument('--max-seconds', type=float, default=3.0,
+                            help='Budget for the mean startup time')
+        parser.add_argument('--max-rss', type=float, default=120.0,
+                            help='Budget for the peak memory in MB')
+
+    def entry_points(self):
+        return {
+            'api': ['coordinator.wsgi', settings.ROOT_URLCONF],
+            'worker': ['coordinator.tasks'],
+        }
+
+    def handle(self, *args, **options):
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=os.environ.get(
+                       'DJANGO_SETTINGS_MODULE', 'coordinator.settings'))
+        over = []
+        for name, modules in self.entry_points().items():
+            runs = []
+            for _ in range(options['iterations']):
+                out = subprocess.run([sys.executable, '-c', MEASURE] + modules,
+                                     env=env, check=True,
+                                     stdout=subprocess.PIPE)
+                runs.append(json.loads(out.stdout.decode().splitlines()[-1]))
+
+            seconds = statistics.mean(r['seconds'] for r in runs)
+            rss = max(r['rss'] for r in runs)
+            self.stdout.write(f'{name:<8} mean {seconds:.3f}s  '
+                              f'min {min(r["seconds"] for r in runs):.3f}s  '
+                              f'rss {rss:.1f}MB  '
+                              f'modules {runs[-1]["modules"]}')
+
+            if seconds > options['max_seconds']:
+                over.append(f'{name} took {seconds:.3f}s, budget is '
+                            f'{options["max_seconds"]}s')
+            if rss > options['max_rss']:
+                over.append(f'{name} used {rss:.1f}MB, budget is '
+                            f'{options["max_rss"]}MB')
+
+        if over:
+            raise CommandError('Startup over budget: ' + '; '.join(over))
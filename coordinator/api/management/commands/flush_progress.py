@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from coordinator import progress
+
+
+class Command(BaseCommand):
+    help = 'Write buffered task progress to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=None,
+                            help=('Keep flushing every this many seconds '
+                                  'instead of flushing once'))
+
+    def handle(self, *args, **options):
+        if options['every'] is None:
+            count = progress.flush()
+            self.stdout.write(f'Flushed progress of {count} tasks')
+            return
+
+        while True:
+            started = time.monotonic()
+            progress.flush()
+            time.sleep(max(0, options['every'] -
+                           (time.monotonic() - started)))
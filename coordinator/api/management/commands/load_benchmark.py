@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import random
+import statistics
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from coordinator.api.models import Release, Study, Task, TaskService
+
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '..', '..', '..', '..', 'bin')
+GUNICORN_CONF = os.path.normpath(os.path.join(BIN_DIR, 'gunicorn.conf.py'))
+
+# Gunicorn arguments and environment for each serving mode
+CONFIGS = {
+    'default': ([], {}),
+    'gthread': (['-c', GUNICORN_CONF], {'GUNICORN_WORKER_CLASS': 'gthread'}),
+    'gevent': (['-c', GUNICORN_CONF], {'GUNICORN_WORKER_CLASS': 'gevent'}),
+}
+
+RUN_GUNICORN = 'from gunicorn.app.wsgiapp import run; run()'
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Create and migrate a database to load test against, as the test runner
+    does, and drop it afterwards so that nothing is left in the configured
+    database
+
+    :returns: The environment to start servers with so that they use the
+        throwaway database
+    """
+    name = connection.settings_dict['NAME']
+    test_name = connection.creation.create_test_db(verbosity=0,
+                                                   autoclobber=True,
+                                                   serialize=False)
+    try:
+        yield dict(os.environ, PG_NAME=test_name)
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+
+
+class Command(BaseCommand):
+    help = ('Compare gunicorn serving modes under mixed read and write '
+            'traffic against a throwaway database. Writes require either '
+            'DEBUG or an admin --token.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--configs', default='default,gthread,gevent',
+                            help=('Comma separated serving modes to '
+                                  'compare: ' + ', '.join(CONFIGS)))
+        parser.add_argument('--duration', type=float, default=15,
+                            help='Seconds to run traffic against each mode')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Number of concurrent clients')
+        parser.add_argument('--writes', type=float, default=0.2,
+                            help='Fraction of requests that are writes')
+        parser.add_argument('--port', type=int, default=5050)
+        parser.add_argument('--token', default=None,
+                            help='JWT to authenticate requests with')
+
+    def handle(self, *args, **options):
+        configs = [c.strip() for c in options['configs'].split(',')]
+        unknown = set(configs) - set(CONFIGS)
+        if unknown:
+            raise CommandError(f'Unknown configs: {", ".join(unknown)}')
+
+        with throwaway_database() as db_env:
+            fixtures = self.seed()
+            for name in configs:
+                results = self.run_config(name, fixtures, db_env, options)
+                self.report(name, results, options['duration'])
+
+    def seed(self):
+        """ Make a release with some tasks to read and write """
+        study = Study.objects.create(kf_id='SD_LOADTEST', name='load test')
+        service = TaskService.objects.create(name='load test',
+                                             url='http://localhost',
+                                             author='load test')
+        release = Release.objects.create(name='load test')
+        release.studies.set([study])
+        tasks = [Task.objects.create(release=release, task_service=service)
+                 for _ in range(20)]
+        return {'study': study, 'service': service, 'release': release,
+                'tasks': [t.kf_id for t in tasks]}
+
+    def run_config(self, name, fixtures, db_env, options):
+        args, env = CONFIGS[name]
+        url = f'http://127.0.0.1:{options["port"]}'
+        server = subprocess.Popen(
+            [sys.executable, '-c', RUN_GUNICORN] + args +
+            ['-b', f'127.0.0.1:{options["port"]}',
+             'coordinator.wsgi:application'],
+            env=dict(db_env, **env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self.wait_for(url, server)
+            deadline = time.monotonic() + options['duration']
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                clients = [executor.submit(self.client, url, fixtures,
+                                           deadline, options)
+                           for _ in range(options['concurrency'])]
+                return [r for c in clients for r in c.result()]
+        finally:
+            server.terminate()
+            server.wait()
+
+    def wait_for(self, url, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Gunicorn exited while starting')
+            try:
+                requests.get(url + '/releases?limit=1', timeout=1)
+                return
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        raise CommandError('Gunicorn did not start in time')
+
+    def client(self, url, fixtures, deadline, options):
+        """
+        Make requests until the deadline
+
+        :returns: A list of (kind, status code, seconds) for each request
+        """
+        session = requests.Session()
+        if options['token']:
+            session.headers['Authorization'] = f'Bearer {options["token"]}'
+        release = fixtures['release'].kf_id
+        reads = [
+            f'/releases/{release}',
+            '/releases?limit=20',
+            f'/tasks?release={release}&limit=20',
+            f'/events?release={release}&limit=20',
+            '/studies',
+        ]
+
+        results = []
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                if random.random() < options['writes']:
+                    kind = 'write'
+                    task = random.choice(fixtures['tasks'])
+                    resp = session.patch(f'{url}/tasks/{task}',
+                                         json={'progress':
+                                               random.randint(0, 100)},
+                                         timeout=60)
+                else:
+                    kind = 'read'
+                    resp = session.get(url + random.choice(reads), timeout=60)
+                status = resp.status_code
+            except requests.exceptions.RequestException:
+                status = None
+            results.append((kind, status, time.monotonic() - start))
+        return results
+
+    def report(self, name, results, duration):
+        self.stdout.write(f'{name}: {len(results) / duration:.1f} req/s')
+        for kind in ['read', 'write']:
+            times = sorted(t for k, _, t in results if k == kind)
+            if not times:
+                continue
+            errors = sum(1 for k, s, _ in results
+                         if k == kind and (s is None or s >= 400))
+            p50, p95, p99 = [times[min(int(len(times) * p), len(times) - 1)]
+                             for p in [0.5, 0.95, 0.99]]
+            self.stdout.write(
+                f'  {kind:<6} {len(times):>6} requests  '
+                f'mean {statistics.mean(times) * 1000:.0f}ms  '
+                f'p50 {p50 * 1000:.0f}ms  p95 {p95 * 1000:.0f}ms  '
+                f'p99 {p99 * 1000:.0f}ms  errors {errors}')
@@ -0,0 +1,341 @@
+import os
+import sys
+import json
+import time
+import random
+import statistics
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from concurrent.futures import ThreadPoolExecutor
+import django_rq
+import requests
+from rq.registry import FinishedJobRegistry
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from coordinator.api.models import Study, TaskService
+from coordinator.api.management.commands.load_benchmark import (
+    GUNICORN_CONF,
+    RUN_GUNICORN,
+    throwaway_database
+)
+
+
+MANAGE = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', '..', '..', 'manage.py'))
+
+FINISHED_STATES = ['published', 'failed', 'canceled']
+
+
+def percentiles(times, *points):
+    times = sorted(times)
+    return [times[min(int(len(times) * p), len(times) - 1)] for p in points]
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeTaskService:
+    """
+    A task service implementing `task.yaml` that stages and publishes each
+    task after a while and reports its new state to the coordinator.
+
+    Every response is delayed by up to twice `latency` seconds and rejected
+    with a 503 at the `failure_rate`.
+    """
+
+    def __init__(self, name, coordinator, headers, options):
+        self.name = name
+        self.coordinator = coordinator
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.latency = options['latency']
+        self.failure_rate = options['failure_rate']
+        self.durations = {'staged': options['run_seconds'],
+                          'published': options['publish_seconds']}
+        self.tasks = {}
+        self.lock = threading.Lock()
+        # The time taken by each report of a new state to the coordinator
+        self.reports = []
+        self.server = ThreadingServer(('127.0.0.1', 0), self.handler())
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path != '/status':
+                    return service.respond(self, 404, {})
+                service.respond(self, 200, {'name': service.name,
+                                            'message': 'ready for work',
+                                            'version': '1.0.0'})
+
+            def do_POST(self):
+                if self.path != '/tasks':
+                    return service.respond(self, 404, {})
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length))
+                status, body = service.act(body)
+                service.respond(self, status, body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, handler, status, body):
+        time.sleep(random.uniform(0, 2 * self.latency))
+        data = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def act(self, body):
+        """ Take a task action, returning the status and body to respond """
+        if random.random() < self.failure_rate:
+            return 503, {'message': 'task rejected'}
+
+        action = body.get('action')
+        with self.lock:
+            task = self.tasks.setdefault(body.get('task_id'), {
+                'name': self.name,
+                'kf_id': body.get('task_id'),
+                'release_id': body.get('release_id'),
+                'state': 'pending',
+                'progress': 0,
+            })
+            if action == 'start':
+                task['state'] = 'running'
+                self.finish_later(task['kf_id'], 'staged')
+            elif action == 'publish':
+                task['state'] = 'publishing'
+                self.finish_later(task['kf_id'], 'published')
+            elif action == 'cancel':
+                task['state'] = 'canceled'
+            elif action not in ['initialize', 'get_status']:
+                return 400, {'message': f'unknown action {action}'}
+            return 200, dict(task)
+
+    def finish_later(self, kf_id, state):
+        delay = random.uniform(0.5, 1.5) * self.durations[state]
+        timer = threading.Timer(delay, self.finish, [kf_id, state])
+        timer.daemon = True
+        timer.start()
+
+    def finish(self, kf_id, state):
+        """ Move a task to its next state and tell the coordinator """
+        with self.lock:
+            task = self.tasks[kf_id]
+            if task['state'] == 'canceled':
+                return
+            task['state'] = state
+            task['progress'] = 100
+
+        started = time.monotonic()
+        try:
+            resp = self.session.patch(
+                f'{self.coordinator}/tasks/{kf_id}',
+                json={'state': state, 'progress': 100}, timeout=60)
+            status = resp.status_code
+        except requests.exceptions.RequestException:
+            status = None
+        self.reports.append((status, time.monotonic() - started))
+
+
+class Command(BaseCommand):
+    help = ('Drive releases through the API and rq workers against fake '
+            'task services on this machine, using a throwaway postgres '
+            'database and the configured redis. Releases require either '
+            'DEBUG or an admin --token.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=5,
+                            help='Number of fake task services')
+        parser.add_argument('--releases', type=int, default=20,
+                            help='Number of releases to run')
+        parser.add_argument('--concurrency', type=int, default=5,
+                            help='Number of releases to run at once')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of rq workers')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Mean seconds a task service takes to '
+                                 'respond')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Fraction of task actions that are rejected')
+        parser.add_argument('--run-seconds', type=float, default=5,
+                            help='Mean seconds a task takes to stage')
+        parser.add_argument('--publish-seconds', type=float, default=2,
+                            help='Mean seconds a task takes to publish')
+        parser.add_argument('--timeout', type=float, default=300,
+                            help='Seconds to wait for each release')
+        parser.add_argument('--port', type=int, default=5060)
+        parser.add_argument('--token', default=None,
+                            help='JWT to authenticate requests with')
+
+    def handle(self, *args, **options):
+        url = f'http://127.0.0.1:{options["port"]}'
+        headers = ({'Authorization': f'Bearer {options["token"]}'}
+                   if options['token'] else {})
+        services = [FakeTaskService(f'load test {i}', url, headers, options)
+                    for i in range(options['services'])]
+        for service in services:
+            service.start()
+
+        processes = []
+        with throwaway_database() as db_env:
+            fixtures = self.seed(services)
+            try:
+                processes.append(self.start_api(options['port'], db_env))
+                self.wait_for(url, processes[0])
+                processes += [self.start_worker(db_env)
+                              for _ in range(options['workers'])]
+
+                finished = self.finished_jobs()
+                started = time.monotonic()
+                with ThreadPoolExecutor(options['concurrency']) as executor:
+                    runs = [executor.submit(self.run_release, url, headers,
+                                            fixtures, i, options)
+                            for i in range(options['releases'])]
+                    results = [r.result() for r in runs]
+                elapsed = time.monotonic() - started
+                jobs = self.finished_jobs() - finished
+            finally:
+                # Nothing may be connected when the database is dropped
+                for process in processes:
+                    process.terminate()
+                    process.wait()
+                for service in services:
+                    service.stop()
+
+        self.report(results, services, jobs, elapsed)
+
+    def seed(self, services):
+        """ Register the fake services as the only task services """
+        study = Study.objects.create(kf_id='SD_LOADTEST', name='load test')
+        for service in services:
+            TaskService.objects.create(name=service.name, url=service.url,
+                                       author='load test')
+        return {'study': study}
+
+    def start_api(self, port, env):
+        return subprocess.Popen(
+            [sys.executable, '-c', RUN_GUNICORN, '-c', GUNICORN_CONF,
+             '-b', f'127.0.0.1:{port}', 'coordinator.wsgi:application'],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def start_worker(self, env):
+        return subprocess.Popen(
+            [sys.executable, MANAGE, 'rqworker'] + list(settings.RQ_QUEUES),
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait_for(self, url, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Gunicorn exited while starting')
+            try:
+                requests.get(url + '/releases?limit=1', timeout=1)
+                return
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        raise CommandError('Gunicorn did not start in time')
+
+    def finished_jobs(self):
+        return sum(FinishedJobRegistry(name, connection=django_rq
+                                       .get_connection(name)).count
+                   for name in settings.RQ_QUEUES)
+
+    def run_release(self, url, headers, fixtures, number, options):
+        """
+        Start a release, publish it once staged, and wait for it to finish
+
+        :returns: The release's final state, the seconds it took, and a
+            list of the seconds taken by each request to the API
+        """
+        session = requests.Session()
+        session.headers.update(headers)
+        latencies = []
+
+        def request(method, path, **kwargs):
+            started = time.monotonic()
+            resp = session.request(method, url + path, timeout=60, **kwargs)
+            latencies.append(time.monotonic() - started)
+            return resp
+
+        started = time.monotonic()
+        try:
+            resp = request('POST', '/releases',
+                           json={'name': f'load test {number}',
+                                 'studies': [fixtures['study'].kf_id]})
+        except requests.exceptions.RequestException:
+            return 'error', None, latencies
+        if resp.status_code != 201:
+            return 'rejected', None, latencies
+        kf_id = resp.json()['kf_id']
+
+        state = 'waiting'
+        published = False
+        deadline = started + options['timeout']
+        while time.monotonic() < deadline:
+            time.sleep(0.5)
+            try:
+                state = request('GET', f'/releases/{kf_id}').json()['state']
+                if state == 'staged' and not published:
+                    request('POST', f'/releases/{kf_id}/publish')
+                    published = True
+            except requests.exceptions.RequestException:
+                continue
+            if state in FINISHED_STATES:
+                break
+        else:
+            state = 'timed out'
+        return state, time.monotonic() - started, latencies
+
+    def report(self, results, services, jobs, elapsed):
+        states = {}
+        for state, _, _ in results:
+            states[state] = states.get(state, 0) + 1
+        self.stdout.write(f'{len(results)} releases in {elapsed:.1f}s: ' +
+                          ', '.join(f'{count} {state}'
+                                    for state, count in states.items()))
+
+        done = [t for s, t, _ in results if s == 'published']
+        if done:
+            p50, p99 = percentiles(done, 0.5, 0.99)
+            mean = statistics.mean(done)
+            self.stdout.write(f'  completion  mean {mean:.1f}s  '
+                              f'p50 {p50:.1f}s  p99 {p99:.1f}s')
+
+        timings = {
+            'api': [t for _, _, latencies in results for t in latencies],
+            'reports': [t for s in services for _, t in s.reports],
+        }
+        for kind, times in timings.items():
+            if not times:
+                continue
+            p50, p99 = percentiles(times, 0.5, 0.99)
+            self.stdout.write(f'  {kind:<11} {len(times):>6} requests  '
+                              f'p50 {p50 * 1000:.0f}ms  '
+                              f'p99 {p99 * 1000:.0f}ms')
+
+        errors = sum(1 for s in services for status, _ in s.reports
+                     if status is None or status >= 400)
+        self.stdout.write(f'  workers     {jobs} jobs  '
+                          f'{jobs / elapsed:.1f} jobs/s')
+        if errors:
+            self.stdout.write(f'  {errors} reports of new states failed')
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from coordinator.queues import enqueue
+from coordinator.tasks import refresh_release_stats
+
+
+class Command(BaseCommand):
+    help = ('Recompute the stats served at /releases/stats. Meant to be run '
+            'periodically, eg: with --every or from cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue the refresh for a worker to run')
+        parser.add_argument('--every', type=float, default=None,
+                            help=('Keep refreshing every this many seconds '
+                                  'instead of refreshing once'))
+
+    def handle(self, *args, **options):
+        if options['every'] is None:
+            self.refresh(options['enqueue'])
+            return
+
+        while True:
+            started = time.monotonic()
+            self.refresh(options['enqueue'])
+            time.sleep(max(0, options['every'] -
+                           (time.monotonic() - started)))
+
+    def refresh(self, queue):
+        if queue:
+            job = enqueue(refresh_release_stats)
+            self.stdout.write(f'Queued refresh {job.id}')
+            return
+
+        refresh_release_stats()
+        self.stdout.write('Refreshed release stats')
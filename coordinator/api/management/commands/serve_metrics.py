@@ -0,0 +1,29 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from django.core.management.base import BaseCommand
+from prometheus_client import CONTENT_TYPE_LATEST
+from coordinator.metrics import exposition
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = exposition()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE_LATEST)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = ('Serve the metrics of every process on this host, such as rq '
+            'workers, for prometheus to scrape')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=9100)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Serving metrics on port {options["port"]}')
+        HTTPServer(('', options['port']), MetricsHandler).serve_forever()
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+from coordinator.api.models import StudySync
+from coordinator.queues import enqueue
+from coordinator.tasks import SYNC_TIMEOUT, sync_studies
+
+
+class Command(BaseCommand):
+    help = ('Synchronize studies with the dataservice. Meant to be run '
+            'periodically, eg: from cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=0,
+                            help=('Skip the sync if the last successful '
+                                  'sync finished within this many seconds'))
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue the sync for a worker to run')
+
+    def handle(self, *args, **options):
+        if not settings.DATASERVICE_URL:
+            raise CommandError('No dataservice is configured')
+
+        last = StudySync.last_success()
+        if (last and options['max_age'] and
+                last.finished_at > timezone.now() -
+                timedelta(seconds=options['max_age'])):
+            self.stdout.write(f'Studies were synchronized at '
+                              f'{last.finished_at}, skipping')
+            return
+
+        if options['enqueue']:
+            job = enqueue(sync_studies, timeout=SYNC_TIMEOUT)
+            self.stdout.write(f'Queued sync {job.id}')
+            return
+
+        progress = sync_studies()
+        self.stdout.write(
+            f'Synchronized {progress["studies"]} studies: '
+            f'{progress["new"]} new, {progress["updated"]} updated, '
+            f'{progress["deleted"]} deleted, '
+            f'{progress["unchanged_pages"]} of {progress["pages"]} pages '
+            f'unchanged')
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from coordinator.queues import worker_config
+
+
+class Command(BaseCommand):
+    help = ('Print the supervisor programs for the rq worker pools in '
+            'settings.WORKER_POOLS')
+
+    def handle(self, *args, **options):
+        self.stdout.write(worker_config(settings.WORKER_POOLS), ending='')
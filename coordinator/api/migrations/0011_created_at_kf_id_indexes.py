@@ -0,0 +1,29 @@
+# Generated by Django 2.0.8 on 2026-10-18 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_auto_20181018_1743'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_at', 'kf_id'], name='event_created_kf_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='release',
+            index=models.Index(fields=['created_at', 'kf_id'], name='release_created_kf_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='releasenote',
+            index=models.Index(fields=['created_at', 'kf_id'], name='note_created_kf_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'kf_id'], name='task_created_kf_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.8 on 2026-10-18 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_created_at_kf_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='release',
+            index=models.Index(fields=['state', 'created_at'], name='release_state_created_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.0.8 on 2026-10-18 23:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+MODELS = ['event', 'release', 'releasenote', 'study', 'task', 'taskservice']
+
+
+def set_updated_at(apps, schema_editor):
+    """ Start existing objects off as last updated when they were created """
+    for model_name in MODELS:
+        Model = apps.get_model('api', model_name)
+        (Model.objects.filter(created_at__isnull=False)
+                      .update(updated_at=models.F('created_at')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_release_state_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Time the event was last updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='release',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Time the release was last updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='releasenote',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Time the note was last updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='study',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Time the study was last updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Time the task was last updated'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='taskservice',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Time the service was last updated'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.0.8 on 2026-10-18 23:56
+
+import json
+import hashlib
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+def set_sync_hash(apps, schema_editor):
+    """
+    Hash existing studies so that the first sync only writes studies that
+    changed
+    """
+    Study = apps.get_model('api', 'Study')
+    for study in Study.objects.only('kf_id', 'name', 'visible'):
+        content = json.dumps([study.name, study.visible]).encode()
+        (Study.objects.filter(kf_id=study.kf_id)
+                      .update(sync_hash=hashlib.sha1(content).hexdigest()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudySync',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('running', 'running'), ('succeeded', 'succeeded'), ('failed', 'failed')], db_index=True, default='running', max_length=20)),
+                ('job', models.CharField(blank=True, help_text='Id of the job that ran the sync', max_length=64, null=True)),
+                ('studies', models.IntegerField(default=0, help_text='Number of studies read')),
+                ('new', models.IntegerField(default=0, help_text='Number of studies created')),
+                ('updated', models.IntegerField(default=0, help_text='Number of studies changed')),
+                ('deleted', models.IntegerField(default=0, help_text='Number of studies deleted')),
+                ('unchanged_pages', models.IntegerField(default=0, help_text='Number of pages that were not modified')),
+                ('pages', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, help_text='Validators and studies of each page')),
+                ('message', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(auto_now_add=True, help_text='Time the sync started')),
+                ('finished_at', models.DateTimeField(blank=True, help_text='Time the sync finished', null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='study',
+            name='sync_hash',
+            field=models.CharField(blank=True, help_text='Hash of the synchronized fields', max_length=40, null=True),
+        ),
+        migrations.RunPython(set_sync_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.0.8 on 2026-10-18 23:58
+
+import coordinator.api.models.release
+from django.db import migrations, models
+import semantic_version.django_fields
+
+
+def start_counter(apps, schema_editor):
+    """ Start counting from the highest version already assigned """
+    Release = apps.get_model('api', 'Release')
+    VersionCounter = apps.get_model('api', 'VersionCounter')
+    versions = Release.objects.values_list('version', flat=True)
+    VersionCounter.objects.create(pk=1, version=max(versions, default=None))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_study_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', semantic_version.django_fields.VersionField(coerce=False, help_text='The last version assigned', max_length=200, null=True, partial=False)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='release',
+            name='version',
+            field=semantic_version.django_fields.VersionField(coerce=False, default=coordinator.api.models.release.allocate_version, help_text='Semantic version of the release', max_length=200, partial=False),
+        ),
+        migrations.RunPython(start_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.0.8 on 2026-10-18 23:59
+
+import coordinator.api.models.event
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_version_counter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='kf_id',
+            field=models.CharField(default=coordinator.api.models.event.event_id, max_length=11, primary_key=True, serialize=False),
+        ),
+        migrations.RunSQL(
+            'CREATE SEQUENCE coordinator_kf_id_seq INCREMENT BY 100',
+            'DROP SEQUENCE coordinator_kf_id_seq',
+        ),
+    ]
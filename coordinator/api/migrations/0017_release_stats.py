@@ -0,0 +1,58 @@
+# Generated by Django 2.0.8 on 2026-10-19 00:05
+
+from django.db import migrations, models
+
+
+# Releases are counted by the month they were created in and their state.
+# The time to publish a release is taken from the event recording its move
+# from publishing to published.
+CREATE_VIEW = """
+CREATE MATERIALIZED VIEW release_stats AS
+SELECT row_number() OVER (ORDER BY month, state) AS id, stats.*, now()
+       AS refreshed_at
+FROM (
+    SELECT date_trunc('month', r.created_at) AS month,
+           r.state AS state,
+           count(*) AS releases,
+           percentile_cont(0.5) WITHIN GROUP (
+               ORDER BY extract(epoch FROM p.published_at - r.created_at)
+           ) AS median_publish_seconds
+    FROM api_release r
+    LEFT JOIN (
+        SELECT release_id, min(created_at) AS published_at
+        FROM api_event
+        WHERE message LIKE '% changed from publishing to published'
+        GROUP BY release_id
+    ) p ON p.release_id = r.kf_id
+    GROUP BY 1, 2
+) stats;
+CREATE UNIQUE INDEX release_stats_month_state_idx
+    ON release_stats (month, state);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_kf_id_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleaseStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateTimeField()),
+                ('state', models.CharField(max_length=50)),
+                ('releases', models.IntegerField()),
+                ('median_publish_seconds', models.FloatField(null=True)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'release_stats',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEW,
+                          'DROP MATERIALIZED VIEW release_stats'),
+    ]
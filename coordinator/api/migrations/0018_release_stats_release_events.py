@@ -0,0 +1,47 @@
+from importlib import import_module
+from django.db import migrations
+
+
+# Tasks record their move from publishing to published against the release
+# too, so only the release's own events, which have no task, are used to
+# time its publishing.
+CREATE_VIEW = """
+CREATE MATERIALIZED VIEW release_stats AS
+SELECT row_number() OVER (ORDER BY month, state) AS id, stats.*, now()
+       AS refreshed_at
+FROM (
+    SELECT date_trunc('month', r.created_at) AS month,
+           r.state AS state,
+           count(*) AS releases,
+           percentile_cont(0.5) WITHIN GROUP (
+               ORDER BY extract(epoch FROM p.published_at - r.created_at)
+           ) AS median_publish_seconds
+    FROM api_release r
+    LEFT JOIN (
+        SELECT release_id, min(created_at) AS published_at
+        FROM api_event
+        WHERE task_id IS NULL
+          AND message LIKE 'release % changed from publishing to published'
+        GROUP BY release_id
+    ) p ON p.release_id = r.kf_id
+    GROUP BY 1, 2
+) stats;
+CREATE UNIQUE INDEX release_stats_month_state_idx
+    ON release_stats (month, state);
+"""
+
+DROP_VIEW = 'DROP MATERIALIZED VIEW release_stats;'
+PREVIOUS_VIEW = import_module(
+    'coordinator.api.migrations.0017_release_stats').CREATE_VIEW
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_release_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_VIEW + CREATE_VIEW,
+                          DROP_VIEW + PREVIOUS_VIEW),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.0.8 on 2026-10-19 00:24
+
+from django.db import migrations
+import semantic_version.django_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_release_stats_release_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='release',
+            name='version',
+            field=semantic_version.django_fields.VersionField(coerce=False, help_text='Semantic version of the release', max_length=200, partial=False),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 2.0.8 on 2026-10-19 00:41
+
+from importlib import import_module
+from django.db import migrations, models
+
+
+# Events recorded before the states were stored only mention them in their
+# message, e.g. 'task TA_00000000 changed from running to staged'
+BACKFILL = r"""
+UPDATE api_event
+SET from_state = substring(message FROM 'changed from (\w+) to \w+$'),
+    to_state = substring(message FROM 'changed from \w+ to (\w+)$')
+WHERE message ~ 'changed from \w+ to \w+$';
+"""
+
+# Tasks record their move from publishing to published against the release
+# too, so only the release's own events, which have no task, are used to
+# time its publishing.
+CREATE_VIEW = """
+CREATE MATERIALIZED VIEW release_stats AS
+SELECT row_number() OVER (ORDER BY month, state) AS id, stats.*, now()
+       AS refreshed_at
+FROM (
+    SELECT date_trunc('month', r.created_at) AS month,
+           r.state AS state,
+           count(*) AS releases,
+           percentile_cont(0.5) WITHIN GROUP (
+               ORDER BY extract(epoch FROM p.published_at - r.created_at)
+           ) AS median_publish_seconds
+    FROM api_release r
+    LEFT JOIN (
+        SELECT release_id, min(created_at) AS published_at
+        FROM api_event
+        WHERE task_id IS NULL
+          AND from_state = 'publishing'
+          AND to_state = 'published'
+        GROUP BY release_id
+    ) p ON p.release_id = r.kf_id
+    GROUP BY 1, 2
+) stats;
+CREATE UNIQUE INDEX release_stats_month_state_idx
+    ON release_stats (month, state);
+"""
+
+DROP_VIEW = 'DROP MATERIALIZED VIEW release_stats;'
+PREVIOUS_VIEW = import_module(
+    'coordinator.api.migrations.0018_release_stats_release_events'
+).CREATE_VIEW
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_release_version_no_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='from_state',
+            field=models.CharField(blank=True, help_text='The state that was left', max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='to_state',
+            field=models.CharField(blank=True, help_text='The state that was entered', max_length=50, null=True),
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+        migrations.RunSQL(DROP_VIEW + CREATE_VIEW,
+                          DROP_VIEW + PREVIOUS_VIEW),
+    ]
@@ -1,17 +1,37 @@
-import boto3
 import json
+import logging
 
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_save,
+                                      m2m_changed)
+from django.utils import timezone
 from django.dispatch import receiver
 from django_fsm.signals import post_transition
 
 from coordinator.api.models.task import Task, task_id
 from coordinator.api.models.taskservice import TaskService, task_service_id
-from coordinator.api.models.release import Release, release_id
+from coordinator.api.models.release import (Release, VersionCounter,
+                                            release_id)
 from coordinator.api.models.event import Event, event_id
-from coordinator.api.models.study import Study
+from coordinator.api.models.study import Study, StudySync
 from coordinator.api.models.release_note import ReleaseNote
+from coordinator.api.models.release_stat import ReleaseStat
+from coordinator import cache, metrics
+from coordinator.utils import lazy_import
+
+boto3 = lazy_import('boto3')
+
+logger = logging.getLogger(__name__)
+
+
+def invalidate_releases(*kf_ids):
+    """
+    Drop the cached documents of releases now, and again once the current
+    transaction has committed in case they were re-cached from the old rows
+    """
+    cache.invalidate('release', *kf_ids)
+    transaction.on_commit(lambda: cache.invalidate('release', *kf_ids))
 
 
 @receiver(post_transition, sender=Release)
@@ -21,42 +41,141 @@ def create_release_event(sender, instance, name, source, target, **kwargs):
                message='release {}, version {} changed from {} to {}'
                        .format(instance.kf_id, instance.version,
                                source, target),
+               from_state=source,
+               to_state=target,
                release=instance)
     ev.save()
 
 
+@receiver(post_transition)
+def count_transitions(sender, instance, name, source, target, **kwargs):
+    metrics.count_transition(sender.__name__.lower(), source, target)
+
+
 @receiver(post_transition, sender=Task)
 def create_task_event(sender, instance, name, source, target, **kwargs):
+    task_event(instance, source, target).save()
+
+
+def task_event(task, source, target):
+    """
+    Make the event recording a task's change of state, whether it was made
+    by a transition or reported by the task's service
+    """
     ev_type = 'error' if target in ['failed', 'rejected'] else 'info'
-    ev = Event(event_type=ev_type,
-               message='task {} changed from {} to {}'
-                       .format(instance.kf_id, source, target),
-               release=instance.release,
-               task=instance,
-               task_service=instance.task_service)
-    ev.save()
+    return Event(event_type=ev_type,
+                 message='task {} changed from {} to {}'
+                         .format(task.kf_id, source, target),
+                 from_state=source,
+                 to_state=target,
+                 release_id=task.release_id,
+                 task_id=task.kf_id,
+                 task_service_id=task.task_service_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=ReleaseNote)
+@receiver(post_delete, sender=ReleaseNote)
+def touch_release(sender, instance, **kwargs):
+    """
+    Tasks and notes are rendered inside their release, so mark the release
+    as updated when they change
+    """
+    touch_releases(instance.release_id)
+
+
+def touch_releases(*kf_ids):
+    """ Mark releases as updated and drop their cached documents """
+    (Release.objects.filter(kf_id__in=kf_ids)
+                    .update(updated_at=timezone.now()))
+    invalidate_releases(*kf_ids)
+
+
+@receiver(post_transition, sender=Release)
+@receiver(post_save, sender=Release)
+@receiver(post_delete, sender=Release)
+def invalidate_release(sender, instance, **kwargs):
+    invalidate_releases(instance.kf_id)
+
+
+@receiver(post_transition, sender=Task)
+def invalidate_task_release(sender, instance, **kwargs):
+    invalidate_releases(instance.release_id)
+
+
+@receiver(m2m_changed, sender=Release.studies.through)
+def invalidate_release_studies(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Release):
+        invalidate_releases(instance.kf_id)
+    elif pk_set:
+        invalidate_releases(*pk_set)
+
+
+@receiver(pre_save, sender=TaskService)
+def load_service_name(sender, instance, update_fields=None, **kwargs):
+    """ Remember the stored name so a rename can be told from other saves """
+    if update_fields is not None and 'name' not in update_fields:
+        instance._stored_name = instance.name
+        return
+    instance._stored_name = (TaskService.objects.filter(pk=instance.pk)
+                                                .values_list('name', flat=True)
+                                                .first())
+
+
+@receiver(post_save, sender=TaskService)
+def invalidate_service_releases(sender, instance, created, **kwargs):
+    """
+    Task services are named in the tasks of their releases, so only a
+    rename changes the release documents
+    """
+    if created or instance.name == getattr(instance, '_stored_name', None):
+        return
+    releases = (Task.objects.filter(task_service=instance)
+                            .order_by()
+                            .values_list('release_id', flat=True)
+                            .distinct())
+    invalidate_releases(*releases)
+
+
+def publish_events(events):
+    """
+    Send the SNS messages of events inserted without `post_save` once the
+    current transaction commits, so nothing is published for events that
+    are rolled back and no network call is made while rows are locked.
+
+    The events are already saved by then, so a failure to publish is
+    logged rather than raised.
+    """
+    if settings.SNS_ARN is None or not events:
+        return
+
+    def publish():
+        for event in events:
+            try:
+                send_sns(sender=Event, instance=event)
+            except Exception:
+                logger.exception(f'could not publish event {event.kf_id}')
+
+    transaction.on_commit(publish)
 
 
 @receiver(post_save, sender=Event)
 def send_sns(sender, instance, **kwargs):
     if settings.SNS_ARN is not None:
         client = boto3.client('sns')
+        # Ids are read from the event so related objects are never loaded
         message = {
             'default': {
                 'event_type': instance.event_type,
                 'message': instance.message,
-                'task_service': None,
-                'task': None,
-                'release': None
+                'task_service': instance.task_service_id,
+                'task': instance.task_id,
+                'release': instance.release_id
             }
         }
-        if instance.task_service:
-            message['default']['task_service'] = instance.task_service.kf_id
-        if instance.task:
-            message['default']['task'] = instance.task.kf_id
-        if instance.release:
-            message['default']['release'] = instance.release.kf_id
-
         message['default'] = json.dumps(message['default'])
 
         client.publish(TopicArn=settings.SNS_ARN,
@@ -3,7 +3,7 @@ import uuid
 from django.db import models
 
 from coordinator.utils import kf_id_generator
-from coordinator.api.models.task import Task, task_id
+from coordinator.api.models.task import Task
 from coordinator.api.models.release import Release
 from coordinator.api.models.taskservice import TaskService
 
@@ -27,10 +27,20 @@ class Event(models.Model):
     :param kf_id: The kf_id of the event
     :param uuid: The uuid of the event
     :param event_type: The type of event, warning, info, or error.
+    :param from_state: The state a release or task changed from, if the
+        event records a change of state
+    :param to_state: The state it changed to
     :param created_at: The time the event occurred
+    :param updated_at: The time the event was last updated
     """
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'kf_id'],
+                         name='event_created_kf_id_idx'),
+        ]
+
     kf_id = models.CharField(max_length=11, primary_key=True,
-                             default=task_id)
+                             default=event_id)
     uuid = models.UUIDField(default=uuid.uuid4,
                             help_text='UUID used internally')
     event_type = models.CharField(max_length=20,
@@ -39,8 +49,15 @@ class Event(models.Model):
                                   help_text='The type of event')
     message = models.CharField(max_length=200,
                                help_text='The message describing the event')
+    from_state = models.CharField(max_length=50, null=True, blank=True,
+                                  help_text='The state that was left')
+    to_state = models.CharField(max_length=50, null=True, blank=True,
+                                help_text='The state that was entered')
     created_at = models.DateTimeField(auto_now_add=True,
                                       help_text='Time the event was created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True,
+                                      help_text='Time the event was last'
+                                      ' updated')
     release = models.ForeignKey(Release,
                                 on_delete=models.SET_NULL,
                                 null=True,
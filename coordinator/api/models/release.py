@@ -1,14 +1,15 @@
 import datetime
 import uuid
-import django_rq
 import logging
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models.expressions import RawSQL
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django_fsm import FSMField, transition
 from semantic_version import Version
 from semantic_version.django_fields import VersionField
 
+from coordinator.queues import enqueue
 from coordinator.utils import kf_id_generator
 from coordinator.api.models.study import Study
 
@@ -20,29 +21,93 @@ FAIL_SOURCES = CANCEL_SOURCES+['canceling']
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Orders versions by their major, minor, and patch numbers rather than as text
+VERSION_ORDER = RawSQL(
+    "string_to_array(substring(version from '^[0-9.]+'), '.')::int[]", ())
+
 
 def release_id():
     return kf_id_generator('RE')()
 
 
-def next_version(major=False, minor=False, patch=True):
+def bump(version, major=False, minor=False):
     """
-    Assign the next version by taking the version of the last release and
-    bumping the patch number by one
+    Bump a version's major, minor, or patch number, starting at 0.0.0
     """
-    try:
-        r = Release.objects.latest()
-    except Release.DoesNotExist:
+    if version is None:
         return Version('0.0.0')
-
-    v = r.version
     if major:
-        v = v.next_major()
+        return version.next_major()
     elif minor:
-        v = v.next_minor()
-    else:
-        v = v.next_patch()
-    return v
+        return version.next_minor()
+    return version.next_patch()
+
+
+def next_version(major=False, minor=False, patch=True):
+    """
+    Get the version the next release would be assigned without assigning it
+    """
+    return bump(VersionCounter.current(), major, minor)
+
+
+def allocate_version():
+    """
+    Assign the next version by bumping the patch number of the last version
+    assigned
+    """
+    return VersionCounter.allocate()
+
+
+class VersionCounter(models.Model):
+    """
+    Holds the last version assigned to a release in a single row so that
+    versions may be handed out atomically without searching the releases
+    """
+    version = VersionField(partial=False, coerce=False, null=True,
+                           help_text='The last version assigned')
+
+    @classmethod
+    def current(cls):
+        """ The last version assigned, without locking """
+        counter = cls.objects.filter(pk=1).first()
+        if counter is None:
+            return cls.latest_release_version()
+        return counter.version
+
+    @classmethod
+    def allocate(cls, major=False, minor=False):
+        """
+        Bump the last version assigned and return it. The counter row stays
+        locked until the current transaction ends so that no two releases
+        may be assigned the same version.
+        """
+        with transaction.atomic():
+            counter = cls.objects.select_for_update().filter(pk=1).first()
+            if counter is None:
+                counter = cls.start()
+            counter.version = bump(counter.version, major, minor)
+            counter.save(update_fields=['version'])
+        return counter.version
+
+    @classmethod
+    def start(cls):
+        """
+        Create the counter from the releases that already exist, or lock the
+        one created by someone else in the meantime
+        """
+        try:
+            with transaction.atomic():
+                return cls.objects.create(pk=1,
+                                          version=cls.latest_release_version())
+        except IntegrityError:
+            return cls.objects.select_for_update().get(pk=1)
+
+    @staticmethod
+    def latest_release_version():
+        """ The highest version of any release """
+        return (Release.objects.order_by(VERSION_ORDER.desc())
+                               .values_list('version', flat=True)
+                               .first())
 
 
 class Release(models.Model):
@@ -52,6 +117,12 @@ class Release(models.Model):
     """
     class Meta:
         get_latest_by = 'created_at'
+        indexes = [
+            models.Index(fields=['created_at', 'kf_id'],
+                         name='release_created_kf_id_idx'),
+            models.Index(fields=['state', 'created_at'],
+                         name='release_state_created_idx'),
+        ]
 
     kf_id = models.CharField(max_length=11, primary_key=True,
                              default=release_id,
@@ -74,13 +145,22 @@ class Release(models.Model):
                                      help_text='kf_ids of the studies '
                                      'in this release')
     version = VersionField(partial=False, coerce=False,
-                           default=next_version,
                            help_text='Semantic version of the release')
     is_major = models.BooleanField(default=False,
                                    help_text='Whether the release is a major '
                                    ' version change or not')
     created_at = models.DateTimeField(auto_now_add=True,
                                       help_text='Date created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True,
+                                      help_text='Time the release was last'
+                                      ' updated')
+
+    def save(self, *args, **kwargs):
+        # Versions are only handed out once a release is first saved so that
+        # releases that are never saved do not use one up
+        if self._state.adding and not self.version:
+            self.version = VersionCounter.allocate()
+        super().save(*args, **kwargs)
 
     @transition(field=state, source='waiting', target='initializing')
     def initialize(self):
@@ -105,10 +185,8 @@ class Release(models.Model):
     @transition(field=state, source='publishing', target='published')
     def complete(self):
         """ Complete publishing """
-        if self.is_major:
-            self.version = self.version.next_major()
-        else:
-            self.version = self.version.next_minor()
+        self.version = VersionCounter.allocate(major=self.is_major,
+                                               minor=not self.is_major)
         self.save()
         return
 
@@ -144,7 +222,7 @@ class Release(models.Model):
             logger.error(f'canceling release {self.kf_id} for time out.')
             self.cancel()
             self.save()
-            django_rq.enqueue(cancel_release, self.kf_id)
+            enqueue(cancel_release, self.kf_id)
             return
 
         # Check if any contained tasks have failed/canceled
@@ -156,5 +234,5 @@ class Release(models.Model):
                              f'{task.state}')
                 self.cancel()
                 self.save()
-                django_rq.enqueue(cancel_release, self.kf_id)
+                enqueue(cancel_release, self.kf_id)
                 return
@@ -20,9 +20,16 @@ class ReleaseNote(models.Model):
     :param author: The author of the note
     :param description: The content of the note
     :param created_at: The time the note was created
+    :param updated_at: The time the note was last updated
     :param study: The study that the note describes
     :param release: The release that the study being described is in
     """
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'kf_id'],
+                         name='note_created_kf_id_idx'),
+        ]
+
     kf_id = models.CharField(max_length=11, primary_key=True,
                              default=release_note_id)
     uuid = models.UUIDField(default=uuid.uuid4,
@@ -33,6 +40,9 @@ class ReleaseNote(models.Model):
                                    help_text='The content of the note')
     created_at = models.DateTimeField(auto_now_add=True,
                                       help_text='Time the note was created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True,
+                                      help_text='Time the note was last'
+                                      ' updated')
     release = models.ForeignKey(Release,
                                 on_delete=models.CASCADE,
                                 null=False,
@@ -0,0 +1,33 @@
+from django.db import connection, models
+
+
+class ReleaseStat(models.Model):
+    """
+    The number of releases created in a month that are in a given state,
+    read from the `release_stats` materialized view.
+
+    :param month: The first day of the month the releases were created in
+    :param state: The state the releases are in
+    :param releases: The number of releases
+    :param median_publish_seconds: The median time from creation to being
+        published of the releases that were published
+    :param refreshed_at: The time the view was last refreshed
+    """
+    class Meta:
+        managed = False
+        db_table = 'release_stats'
+
+    month = models.DateTimeField()
+    state = models.CharField(max_length=50)
+    releases = models.IntegerField()
+    median_publish_seconds = models.FloatField(null=True)
+    refreshed_at = models.DateTimeField()
+
+    @classmethod
+    def refresh(cls):
+        """
+        Recompute the view without blocking reads of the current stats
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY '
+                           f'{cls._meta.db_table}')
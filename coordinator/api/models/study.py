@@ -1,4 +1,31 @@
+import json
+import hashlib
 from django.db import models
+from django.contrib.postgres.fields import JSONField
+
+
+class StudyQuerySet(models.QuerySet):
+
+    def with_versions(self):
+        """
+        Annotate each study with the version of the last release it was in
+        and the version and date of the last published release it was in so
+        that they may be read without a query per study.
+        """
+        from coordinator.api.models.release import Release
+        releases = (Release.objects.filter(studies=models.OuterRef('pk'))
+                                   .order_by('-created_at'))
+        published = releases.filter(state='published')
+        version = Release._meta.get_field('version')
+        created_at = Release._meta.get_field('created_at')
+        return self.annotate(
+            latest_release_version=models.Subquery(
+                releases.values('version')[:1], output_field=version),
+            last_published_release_version=models.Subquery(
+                published.values('version')[:1], output_field=version),
+            last_published_release_date=models.Subquery(
+                published.values('created_at')[:1], output_field=created_at),
+        )
 
 
 class Study(models.Model):
@@ -12,6 +39,9 @@ class Study(models.Model):
     :param deleted: Whether the study was deleted from the dataservice
     :param created_at: The time that the task was registered with the
         coordinator.
+    :param updated_at: The time that the study was last updated
+    :param sync_hash: A hash of the study's synchronized fields as last seen
+        in the dataservice
     """
     kf_id = models.CharField(max_length=11, primary_key=True,
                              null=False)
@@ -21,12 +51,34 @@ class Study(models.Model):
     created_at = models.DateTimeField(auto_now_add=False,
                                       null=True,
                                       help_text='Time the task was created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True,
+                                      help_text='Time the study was last'
+                                      ' updated')
+    sync_hash = models.CharField(max_length=40, null=True, blank=True,
+                                 help_text='Hash of the synchronized fields')
+
+    objects = StudyQuerySet.as_manager()
+
+    @staticmethod
+    def content_hash(name, visible):
+        """
+        Hash the fields that are synchronized from the dataservice so that a
+        changed study may be found by comparing a single column
+        """
+        content = json.dumps([name, visible]).encode()
+        return hashlib.sha1(content).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.sync_hash = self.content_hash(self.name, self.visible)
+        super(Study, self).save(*args, **kwargs)
 
     def latest_version(self):
         """
         Gets the latest version from the last release this study was in.
         """
         from coordinator.api.models.release import Release
+        if hasattr(self, 'latest_release_version'):
+            return self.latest_release_version
         try:
             return self.release_set.latest('created_at').version
         except Release.DoesNotExist:
@@ -60,10 +112,61 @@ class Study(models.Model):
         Gets the version number of the last published release that this
         study was in.
         """
+        if hasattr(self, 'last_published_release_version'):
+            return self.last_published_release_version
         return getattr(self.last_published_release, 'version', None)
 
     def last_published_date(self):
         """
         Gets the date of the last published release that this study was in.
         """
+        if hasattr(self, 'last_published_release_date'):
+            return self.last_published_release_date
         return getattr(self.last_published_release, 'created_at', None)
+
+
+class StudySync(models.Model):
+    """
+    A synchronization of studies with the dataservice.
+
+    :param state: Whether the sync is running, succeeded, or failed
+    :param job: The id of the job that ran the sync, if any
+    :param pages: The validators and studies of each page of studies read,
+        used to make conditional requests in the next sync
+    :param message: The error that the sync failed with
+    :param started_at: The time that the sync started
+    :param finished_at: The time that the sync finished
+    """
+    STATES = (
+        ('running', 'running'),
+        ('succeeded', 'succeeded'),
+        ('failed', 'failed'),
+    )
+    state = models.CharField(max_length=20, choices=STATES,
+                             default='running', db_index=True)
+    job = models.CharField(max_length=64, null=True, blank=True,
+                           help_text='Id of the job that ran the sync')
+    studies = models.IntegerField(default=0,
+                                  help_text='Number of studies read')
+    new = models.IntegerField(default=0,
+                              help_text='Number of studies created')
+    updated = models.IntegerField(default=0,
+                                  help_text='Number of studies changed')
+    deleted = models.IntegerField(default=0,
+                                  help_text='Number of studies deleted')
+    unchanged_pages = models.IntegerField(default=0,
+                                          help_text='Number of pages that '
+                                          'were not modified')
+    pages = JSONField(default=dict, blank=True,
+                      help_text='Validators and studies of each page')
+    message = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(auto_now_add=True,
+                                      help_text='Time the sync started')
+    finished_at = models.DateTimeField(null=True, blank=True,
+                                       help_text='Time the sync finished')
+
+    @classmethod
+    def last_success(cls):
+        """ The last sync that succeeded, or None """
+        return (cls.objects.filter(state='succeeded')
+                           .order_by('-finished_at').first())
@@ -1,17 +1,18 @@
 import datetime
 import uuid
-import requests
-from requests.exceptions import ConnectionError, HTTPError
-
-import django_rq
 from django.db import models
 from django.conf import settings
 from django_fsm import FSMField, transition
 
-from coordinator.utils import kf_id_generator
+from coordinator.metrics import service_request
+from coordinator.queues import enqueue
+from coordinator.utils import kf_id_generator, lazy_import
 from coordinator.api.models.release import Release
 from coordinator.api.models.taskservice import TaskService
 
+requests = lazy_import('requests')
+exceptions = lazy_import('requests.exceptions')
+
 
 def task_id():
     return kf_id_generator('TA')()
@@ -26,7 +27,14 @@ class Task(models.Model):
     :param state: The state of the task
     :param created_at: The time that the task was registered with the
         coordinator.
+    :param updated_at: The time that the task was last updated
     """
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'kf_id'],
+                         name='task_created_kf_id_idx'),
+        ]
+
     kf_id = models.CharField(max_length=11, primary_key=True,
                              default=task_id)
     uuid = models.UUIDField(default=uuid.uuid4,
@@ -48,6 +56,9 @@ class Task(models.Model):
                                      related_name='tasks')
     created_at = models.DateTimeField(auto_now_add=True,
                                       help_text='Time the task was created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True,
+                                      help_text='Time the task was last'
+                                      ' updated')
 
     @transition(field=state, source='waiting', target='initialized')
     def initialize(self):
@@ -92,18 +103,18 @@ class Task(models.Model):
             'action': 'get_status'
         }
         try:
-            resp = requests.post(self.task_service.url+'/tasks',
-                                 headers=settings.EGO_JWT.header,
-                                 json=body,
-                                 timeout=settings.REQUEST_TIMEOUT)
-            resp.raise_for_status()
-        except (ConnectionError, HTTPError):
+            with service_request(self.task_service_id, 'get_status'):
+                resp = requests.post(self.task_service.url+'/tasks',
+                                     headers=settings.EGO_JWT.header,
+                                     json=body,
+                                     timeout=settings.REQUEST_TIMEOUT)
+                resp.raise_for_status()
+        except (exceptions.ConnectionError, exceptions.HTTPError):
             # Cancel release if there is a problem
             if self.release.state not in ['canceling', 'canceled']:
                 self.release.cancel()
                 self.release.save()
-                django_rq.enqueue(cancel_release, self.release.kf_id,
-                                  fail=True)
+                enqueue(cancel_release, self.release.kf_id, fail=True)
             self.failed()
             self.save()
             return
@@ -115,14 +126,14 @@ class Task(models.Model):
                 self.cancel()
                 self.release.cancel()
                 self.release.save()
-                django_rq.enqueue(cancel_release, self.release.kf_id)
+                enqueue(cancel_release, self.release.kf_id)
                 return
             elif resp['state'] == 'failed':
                 from coordinator.tasks import cancel_release
                 self.failed()
                 self.release.cancel()
                 self.release.save()
-                django_rq.enqueue(cancel_release, self.release.kf_id)
+                enqueue(cancel_release, self.release.kf_id)
                 return
             elif resp['state'] == 'staged' and self.state != 'staged':
                 self.stage()
@@ -152,9 +163,10 @@ class Task(models.Model):
             if diff.total_seconds() > settings.TASK_TIMEOUT:
                 self.release.cancel()
                 self.release.save()
-                django_rq.enqueue(cancel_release, self.kf_id)
+                enqueue(cancel_release, self.kf_id)
                 return
 
+        before = self.progress
         if 'progress' in resp and resp['progress'] != self.progress:
             if isinstance(resp['progress'], str):
                 resp['progress'] = int(resp['progress'].replace('%', ''))
@@ -162,4 +174,8 @@ class Task(models.Model):
         if not self.progress:
             self.progress = 0
 
-        self.save()
+        # Saving marks the release as updated, so only save a change
+        if self.progress != before:
+            from coordinator import progress
+            self.save()
+            progress.discard(self.kf_id)
@@ -1,12 +1,13 @@
 import uuid
-import requests
-from requests.exceptions import RequestException
-
 from django.db import models
 from django.conf import settings
-from coordinator.utils import kf_id_generator
+from coordinator.metrics import service_request
+from coordinator.utils import kf_id_generator, lazy_import
 from coordinator.api.validators import validate_endpoint
 
+requests = lazy_import('requests')
+exceptions = lazy_import('requests.exceptions')
+
 
 def task_service_id():
     return kf_id_generator('TS')()
@@ -29,6 +30,7 @@ class TaskService(models.Model):
     :param enabled: Only enabled tasks will be run in a release
     :param created_at: The time that the task service was registered with the
         coordinator.
+    :param updated_at: The time that the task service was last updated
     """
     kf_id = models.CharField(max_length=11, primary_key=True,
                              default=task_service_id,
@@ -53,6 +55,9 @@ class TaskService(models.Model):
                                   'of a release.')
     created_at = models.DateTimeField(auto_now_add=True,
                                       help_text='Time the task was created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True,
+                                      help_text='Time the service was last'
+                                      ' updated')
 
     @property
     def health_status(self):
@@ -64,11 +69,12 @@ class TaskService(models.Model):
         healthy.
         """
         try:
-            resp = requests.get(self.url+'/status',
-                                headers=settings.EGO_JWT.header,
-                                timeout=settings.REQUEST_TIMEOUT)
-            resp.raise_for_status()
-        except RequestException:
+            with service_request(self.kf_id, 'status'):
+                resp = requests.get(self.url+'/status',
+                                    headers=settings.EGO_JWT.header,
+                                    timeout=settings.REQUEST_TIMEOUT)
+                resp.raise_for_status()
+        except exceptions.RequestException:
             self.last_ok_status += 1
             self.save()
             return
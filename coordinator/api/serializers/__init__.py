@@ -1,6 +1,6 @@
 from .release import ReleaseSerializer
-from .task import TaskSerializer
+from .task import TaskSerializer, TaskReportSerializer
 from .task_service import TaskServiceSerializer
-from .study import StudySerializer
+from .study import StudySerializer, StudySyncSerializer
 from .release_note import ReleaseNoteSerializer
 from .event import EventSerializer
@@ -1,8 +1,19 @@
 from rest_framework import serializers
 from coordinator.api.models import Event
+from .fields import KfIdHyperlinkedRelatedField
+from .mixins import DynamicFieldsMixin
+from .task import TaskSerializer
+from .task_service import TaskServiceSerializer
 
 
-class EventSerializer(serializers.HyperlinkedModelSerializer):
+class EventSerializer(DynamicFieldsMixin,
+                      serializers.HyperlinkedModelSerializer):
+    serializer_related_field = KfIdHyperlinkedRelatedField
+    expandable_fields = {
+        'task': (TaskSerializer, ['task__task_service']),
+        'task_service': (TaskServiceSerializer, ['task_service']),
+    }
+
     class Meta:
         model = Event
         fields = ('kf_id', 'event_type', 'message', 'release', 'task_service',
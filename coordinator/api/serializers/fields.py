@@ -0,0 +1,43 @@
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework import serializers
+
+
+class KfIdHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """
+    Hyperlinks to a related object looked up by its `kf_id`.
+
+    The `kf_id` is the primary key of every model, so the url can be built
+    from the foreign key column alone without loading the related object.
+
+    Objects that were loaded ahead of time into the `related_objects`
+    context, keyed by field name, are used instead of querying for each one.
+    """
+
+    def use_pk_only_optimization(self):
+        return self.lookup_field in ['pk', 'kf_id']
+
+    def get_url(self, obj, view_name, request, format):
+        # Unsaved objects will not yet have a valid URL.
+        if obj.pk in (None, ''):
+            return None
+
+        kwargs = {self.lookup_url_kwarg: obj.pk}
+        return self.reverse(view_name, kwargs=kwargs, request=request,
+                            format=format)
+
+    def get_object(self, view_name, view_args, view_kwargs):
+        related = self.context.get('related_objects', {})
+        if self.field_name not in related:
+            return super(KfIdHyperlinkedRelatedField,
+                         self).get_object(view_name, view_args, view_kwargs)
+        kf_id = view_kwargs[self.lookup_url_kwarg]
+        try:
+            return related[self.field_name][kf_id]
+        except KeyError:
+            raise ObjectDoesNotExist()
+
+    def kf_id_from_url(self, url):
+        """ Get the kf_id that a hyperlink refers to without resolving it """
+        if not isinstance(url, str):
+            return None
+        return url.rstrip('/').rsplit('/', 1)[-1]
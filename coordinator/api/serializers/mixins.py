@@ -0,0 +1,108 @@
+from django_fsm import FSMField
+from rest_framework import permissions
+from coordinator.timing import request_timer
+
+
+def _split(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+class DynamicFieldsMixin(object):
+    """
+    Lets clients choose which fields are rendered on reads.
+
+    `?fields=kf_id,state` renders only the listed fields.
+    `?expand=task_service` nests the related object in place of its link.
+
+    Only the serializer at the top of the response is affected. Viewsets
+    should pass their querysets through `setup_eager_loading` so that
+    columns and relations that won't be rendered are never loaded.
+    """
+    # Related objects to join for a field when it is rendered
+    select_related_fields = {}
+    # Related objects to prefetch for a field when it is rendered
+    prefetch_related_fields = {}
+    # Columns that a field, which is not itself a column, is computed from
+    field_dependencies = {}
+    # Fields that may be expanded, mapped to the serializer to expand them
+    # with and the related objects to join for it
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super(DynamicFieldsMixin, self).__init__(*args, **kwargs)
+        fields, expand = self.get_field_selection(self._context.get('request'))
+
+        for name in expand:
+            serializer_class, _ = self.expandable_fields[name]
+            self.fields[name] = serializer_class(read_only=True)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        # Time serializing separately from the rest of the view
+        timer = request_timer(self._context.get('request'))
+        if timer is None:
+            return super(DynamicFieldsMixin, self).to_representation(instance)
+        with timer.phase('serialize'):
+            return super(DynamicFieldsMixin, self).to_representation(instance)
+
+    @classmethod
+    def get_field_selection(cls, request):
+        """
+        Parse the fields and expansions requested by a read request
+
+        :returns: A tuple of the list of field names to render, or None if
+            all fields should be rendered, and the list of fields to expand
+        """
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return None, []
+        params = getattr(request, 'query_params', request.GET)
+
+        fields = params.get('fields', None)
+        fields = _split(fields) if fields else None
+        expand = [f for f in _split(params.get('expand', ''))
+                  if f in cls.expandable_fields]
+        return fields, expand
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """
+        Load only the columns and related objects needed to render the fields
+        selected by the request.
+        """
+        fields, expand = cls.get_field_selection(request)
+        selected = set(cls.Meta.fields if fields is None else fields)
+        selected |= set(expand)
+
+        select = []
+        prefetch = []
+        for name in cls.Meta.fields:
+            if name not in selected:
+                continue
+            select.extend(cls.select_related_fields.get(name, []))
+            prefetch.extend(cls.prefetch_related_fields.get(name, []))
+        for name in expand:
+            select.extend(cls.expandable_fields[name][1])
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if fields is None:
+            return queryset
+
+        # Defer any columns that are not going to be rendered
+        columns = set(lookup.split('__')[0] for lookup in select)
+        for name in selected:
+            columns.add(name)
+            columns.update(cls.field_dependencies.get(name, []))
+        only = []
+        for field in queryset.model._meta.concrete_fields:
+            # The primary key and creation time are needed for lookups and
+            # pagination, and django-fsm cannot read a deferred state
+            if (field.primary_key or field.name == 'created_at' or
+                    isinstance(field, FSMField) or field.name in columns):
+                only.append(field.name)
+        return queryset.only(*only)
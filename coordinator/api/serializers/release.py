@@ -1,10 +1,20 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from coordinator.api.models import Release, Study
+from coordinator.api.models import Release, Study, Task
 from .task import TaskSerializer
 from .release_note import ReleaseNoteSerializer
+from .mixins import DynamicFieldsMixin
 
 
-class ReleaseSerializer(serializers.HyperlinkedModelSerializer):
+class ReleaseSerializer(DynamicFieldsMixin,
+                        serializers.HyperlinkedModelSerializer):
+    prefetch_related_fields = {
+        'studies': ['studies'],
+        'tasks': [Prefetch('tasks', queryset=TaskSerializer
+                           .setup_eager_loading(Task.objects.all()))],
+        'notes': ['notes'],
+    }
+
     tags = serializers.ListField(
                 child=serializers.CharField(max_length=50, allow_blank=False,
                                             validators=[]))
@@ -1,8 +1,12 @@
 from rest_framework import serializers
 from coordinator.api.models import ReleaseNote
+from .fields import KfIdHyperlinkedRelatedField
+from .mixins import DynamicFieldsMixin
 
 
-class ReleaseNoteSerializer(serializers.HyperlinkedModelSerializer):
+class ReleaseNoteSerializer(DynamicFieldsMixin,
+                            serializers.HyperlinkedModelSerializer):
+    serializer_related_field = KfIdHyperlinkedRelatedField
 
     class Meta:
         model = ReleaseNote
@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from coordinator.api.models import Study
+from coordinator.api.models import Study, StudySync
+from .mixins import DynamicFieldsMixin
 
 
-class StudySerializer(serializers.HyperlinkedModelSerializer):
+class StudySerializer(DynamicFieldsMixin,
+                      serializers.HyperlinkedModelSerializer):
 
     version = serializers.CharField(source='latest_version', allow_blank=True)
 
@@ -14,3 +16,19 @@ class StudySerializer(serializers.HyperlinkedModelSerializer):
         model = Study
         fields = ('kf_id', 'name', 'version', 'visible', 'last_pub_version',
                   'last_pub_date', 'deleted', 'created_at')
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """ Annotate release versions instead of looking them up per study """
+        queryset = super(StudySerializer, cls).setup_eager_loading(queryset,
+                                                                   request)
+        return queryset.with_versions()
+
+
+class StudySyncSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = StudySync
+        fields = ('id', 'state', 'job', 'studies', 'new', 'updated',
+                  'deleted', 'unchanged_pages', 'message', 'started_at',
+                  'finished_at')
@@ -1,8 +1,20 @@
 from rest_framework import serializers
 from coordinator.api.models import Task
+from .fields import KfIdHyperlinkedRelatedField
+from .mixins import DynamicFieldsMixin
+from .task_service import TaskServiceSerializer
 
 
-class TaskSerializer(serializers.HyperlinkedModelSerializer):
+class TaskSerializer(DynamicFieldsMixin,
+                     serializers.HyperlinkedModelSerializer):
+    serializer_related_field = KfIdHyperlinkedRelatedField
+    select_related_fields = {
+        'service_name': ['task_service'],
+    }
+    expandable_fields = {
+        'task_service': (TaskServiceSerializer, ['task_service']),
+    }
+
     service_name = serializers.CharField(read_only=True,
                                          source='task_service.name')
 
@@ -15,3 +27,18 @@ class TaskSerializer(serializers.HyperlinkedModelSerializer):
             'release': {'allow_null': False, 'lookup_field': 'kf_id'},
             'task_service': {'allow_null': False, 'lookup_field': 'kf_id'},
         }
+
+
+class TaskReportSerializer(serializers.Serializer):
+    """
+    A task service's report of a task's state and/or progress
+    """
+    kf_id = serializers.CharField(max_length=11)
+    state = serializers.CharField(max_length=50, required=False)
+    progress = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if 'state' not in data and 'progress' not in data:
+            raise serializers.ValidationError('A state or progress is '
+                                              'required')
+        return data
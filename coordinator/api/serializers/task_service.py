@@ -1,8 +1,13 @@
 from rest_framework import serializers
 from coordinator.api.models import TaskService
+from .mixins import DynamicFieldsMixin
 
 
-class TaskServiceSerializer(serializers.HyperlinkedModelSerializer):
+class TaskServiceSerializer(DynamicFieldsMixin,
+                            serializers.HyperlinkedModelSerializer):
+    field_dependencies = {
+        'health_status': ['last_ok_status'],
+    }
 
     class Meta:
         model = TaskService
@@ -1,7 +1,9 @@
-import requests
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from coordinator.utils import lazy_import
+
+requests = lazy_import('requests')
 
 
 def validate_study(study):
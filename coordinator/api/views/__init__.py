@@ -1,4 +1,3 @@
-from drf_yasg.generators import OpenAPISchemaGenerator
 from coordinator.api.views.task import TaskViewSet
 from coordinator.api.views.release import ReleaseViewSet
 from coordinator.api.views.task_service import TaskServiceViewSet
@@ -6,13 +5,4 @@ from coordinator.api.views.event import EventViewSet
 from coordinator.api.views.studies import StudiesViewSet
 from coordinator.api.views.studies import StudyReleasesViewSet
 from coordinator.api.views.release_note import ReleaseNoteViewSet
-
-
-class SwaggerSchema(OpenAPISchemaGenerator):
-    """ Custom schema generator to inject x-logo and remove security """
-    def get_schema(self, request=None, public=False):
-        schema = super(SwaggerSchema, self).get_schema(request, public)
-        schema['info']['x-logo'] = {'url': '/static/kf_releasecoordinator.png'}
-        del schema['security']
-        del schema['securityDefinitions']
-        return schema
+from coordinator.api.views.metrics import metrics_view
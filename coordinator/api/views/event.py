@@ -1,16 +1,21 @@
 from rest_framework import viewsets
-from drf_yasg.generators import OpenAPISchemaGenerator
-from coordinator.api.models import Event
+from coordinator import progress
+from coordinator.api.models import Event, Task, TaskService, publish_events
 from coordinator.api.serializers import EventSerializer
+from coordinator.api.views.mixins import (ConditionalGetMixin,
+                                          BulkCreateMixin,
+                                          ProgressOverlayMixin, service_names)
+from coordinator.pagination import CoordinatorPagination
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ProgressOverlayMixin, ConditionalGetMixin,
+                   BulkCreateMixin, viewsets.ModelViewSet):
     """
     retrieve:
     Get an event by `kf_id`
 
     create:
-    Register a new event
+    Register a new event, or many events at once by posting a list of them
 
     list:
     Return a page of events
@@ -25,7 +30,25 @@ class EventViewSet(viewsets.ModelViewSet):
     Completely remove the event from the coordinator.
     """
     lookup_field = 'kf_id'
+    kf_id_prefix = 'EV'
     serializer_class = EventSerializer
+    pagination_class = CoordinatorPagination
+
+    @property
+    def etag_dependencies(self):
+        _, expand = (self.get_serializer_class()
+                         .get_field_selection(self.request))
+        # Expanded services show their health as well as their names
+        return (Task, TaskService) if 'task_service' in expand else (Task,)
+
+    def etag_state(self):
+        _, expand = (self.get_serializer_class()
+                         .get_field_selection(self.request))
+        # Expanded tasks show progress buffered outside the database and
+        # the names of their services
+        if 'task' in expand:
+            return [progress.version(), service_names()]
+        return []
 
     def get_queryset(self):
         """
@@ -39,14 +62,8 @@ class EventViewSet(viewsets.ModelViewSet):
                 kwargs = {field_name: field}
                 queryset = queryset.filter(**kwargs)
 
-        return queryset
-
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
 
-class SwaggerSchema(OpenAPISchemaGenerator):
-    """ Custom schema generator to inject x-logo and remove security """
-    def get_schema(self, request=None, public=False):
-        schema = super(SwaggerSchema, self).get_schema(request, public)
-        schema['info']['x-logo'] = {'url': '/static/kf_releasecoordinator.png'}
-        del schema['security']
-        del schema['securityDefinitions']
-        return schema
+    def perform_bulk_create(self, instances):
+        publish_events(instances)
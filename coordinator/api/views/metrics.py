@@ -0,0 +1,10 @@
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from coordinator.metrics import exposition
+
+
+def metrics_view(request):
+    """
+    Expose the coordinator's metrics to prometheus
+    """
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE_LATEST)
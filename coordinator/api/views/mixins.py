@@ -0,0 +1,245 @@
+import hashlib
+import logging
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from coordinator import cache, progress
+from coordinator.utils import kf_ids
+from coordinator.api.models import TaskService
+from coordinator.api.serializers.fields import KfIdHyperlinkedRelatedField
+
+
+logger = logging.getLogger(__name__)
+
+
+def service_names():
+    """
+    The names of all task services, for the ETags of resources that render
+    tasks. Health checks save services too, so depending on their
+    `updated_at` would change the ETags of every release with each ping.
+    """
+    return list(TaskService.objects.order_by('kf_id')
+                                   .values_list('kf_id', 'name'))
+
+
+class ConditionalGetMixin(object):
+    """
+    Adds `ETag` and `Last-Modified` headers to list and detail responses and
+    responds with `304 Not Modified` when the client's copy is current.
+
+    Validators are computed from the `updated_at` column without rendering
+    the response, so a request for an unchanged resource costs one
+    aggregate query.
+
+    Lists are only given an `ETag`: removing an object does not move the
+    latest `updated_at`, so `Last-Modified` could not tell that a list has
+    lost objects, while the `ETag` includes the count.
+    """
+    # Other models whose changes show up in this resource's representation
+    etag_dependencies = ()
+
+    def etag_state(self):
+        """
+        Anything besides the database that the representation depends on
+        """
+        return []
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        state = (queryset.order_by().values('pk')
+                                    .aggregate(last=Max('updated_at'),
+                                               count=Count('pk')))
+        return (self.not_modified(request, state['last'], state['count'],
+                                  dated=False) or
+                self.with_validators(
+                    super(ConditionalGetMixin, self).list(request, *args,
+                                                          **kwargs)))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        last = (self.get_queryset().order_by().filter(**lookup)
+                                   .values_list('updated_at', flat=True)
+                                   .first())
+        # Let the usual lookup raise the 404
+        if last is None:
+            return super(ConditionalGetMixin, self).retrieve(request, *args,
+                                                             **kwargs)
+        return (self.not_modified(request, last) or
+                self.with_validators(
+                    super(ConditionalGetMixin, self).retrieve(request, *args,
+                                                              **kwargs)))
+
+    def not_modified(self, request, last_modified, *state, dated=True):
+        """
+        Compute the validators for the current state of the resource and
+        return a `304 Not Modified` response if they match the request's
+        conditional headers.
+
+        :param dated: Whether to send `Last-Modified` and honor
+            `If-Modified-Since`, or only validate by `ETag`
+        """
+        dates = [last_modified] + [
+            model.objects.aggregate(last=Max('updated_at'))['last']
+            for model in self.etag_dependencies
+        ]
+        dates = [d for d in dates if d is not None]
+        last_modified = max(dates) if dates else None
+
+        key = [request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+        state = list(state) + self.etag_state()
+        key += [d.isoformat() for d in dates] + [str(s) for s in state]
+        self._etag = 'W/"{}"'.format(
+            hashlib.md5('|'.join(key).encode()).hexdigest())
+        self._last_modified = (int(last_modified.timestamp())
+                               if last_modified and dated else None)
+
+        response = get_conditional_response(request, etag=self._etag,
+                                            last_modified=self._last_modified)
+        if response is not None:
+            return self.with_validators(response)
+
+    def with_validators(self, response):
+        if response.status_code not in [200, 304]:
+            return response
+        response['ETag'] = self._etag
+        if self._last_modified is not None:
+            response['Last-Modified'] = http_date(self._last_modified)
+        return response
+
+
+class ProgressOverlayMixin(object):
+    """
+    Renders the progress buffered for tasks in place of their stored
+    progress, wherever tasks appear in a response.
+
+    The tasks of a whole response, including documents read from the cache,
+    are looked up in the buffer together once the response is rendered.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (isinstance(response, Response) and
+                status.is_success(response.status_code)):
+            progress.overlay(progress.rendered_tasks(response.data))
+        return super(ProgressOverlayMixin, self).finalize_response(
+            request, response, *args, **kwargs)
+
+
+class CachedRetrieveMixin(object):
+    """
+    Serves the default representation of an object from the document cache.
+
+    Requests that select fields or expand relations are rendered as usual.
+    Models rendered by the view must invalidate the cache when they change.
+    """
+    # Name of the cached document type
+    cache_name = None
+
+    def retrieve(self, request, *args, **kwargs):
+        fields, expand = (self.get_serializer_class()
+                              .get_field_selection(request))
+        if (request.method not in permissions.SAFE_METHODS or
+                fields is not None or expand):
+            return super(CachedRetrieveMixin, self).retrieve(request, *args,
+                                                             **kwargs)
+
+        def render():
+            instance = self.get_object()
+            return self.get_serializer(instance).data
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        # Links are rendered with the request's host
+        data = cache.get_or_render(self.cache_name,
+                                   self.kwargs[lookup_url_kwarg],
+                                   request.build_absolute_uri('/'),
+                                   render)
+        return Response(data)
+
+
+class BulkCreateMixin(object):
+    """
+    Creates many objects from a list posted to the list endpoint.
+
+    Every item is validated and the valid ones are inserted with a single
+    `bulk_create`. Related objects are loaded with one query per field
+    rather than one per item, and kf_ids are allocated together. The
+    response lists the created object, or null, and the errors, or null, of
+    each item in the order given. If the insert is refused by the database,
+    nothing is created and the response is a `409 Conflict`.
+
+    `bulk_create` does not send `post_save`, so viewsets should do anything
+    their models' receivers would in `perform_bulk_create`.
+    """
+    # The most items that may be created in one request
+    bulk_create_limit = 1000
+    # The prefix of the kf_ids of the objects created
+    kf_id_prefix = None
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super(BulkCreateMixin, self).create(request, *args,
+                                                       **kwargs)
+
+        if len(request.data) > self.bulk_create_limit:
+            return Response({'detail': 'No more than {} items may be '
+                             'created at once'
+                             .format(self.bulk_create_limit)},
+                            status.HTTP_400_BAD_REQUEST)
+
+        context = self.get_serializer_context()
+        context['related_objects'] = self.get_related_objects(request.data)
+
+        serializers = [self.get_serializer_class()(data=item, context=context)
+                       for item in request.data]
+        valid = [s.is_valid() for s in serializers]
+        model = self.get_serializer_class().Meta.model
+        data = [s.validated_data for s, ok in zip(serializers, valid) if ok]
+        instances = [model(kf_id=kf_id, **d) for kf_id, d in
+                     zip(kf_ids(self.kf_id_prefix, len(data)), data)]
+
+        if instances:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(instances)
+                    self.perform_bulk_create(instances)
+            except IntegrityError as err:
+                logger.warning(f'could not create {model.__name__}s: {err}')
+                return Response({'detail': 'The items conflict with '
+                                 'existing objects and none were created'},
+                                status.HTTP_409_CONFLICT)
+
+        created = iter(self.get_serializer(instances, many=True).data)
+        results = [next(created) if ok else None for ok in valid]
+        errors = [None if ok else s.errors
+                  for s, ok in zip(serializers, valid)]
+
+        if not instances and serializers:
+            code = status.HTTP_400_BAD_REQUEST
+        elif len(instances) < len(serializers):
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_201_CREATED
+        return Response({'results': results, 'errors': errors}, code)
+
+    def get_related_objects(self, items):
+        """
+        Load the objects that the items link to with one query per field
+        """
+        related = {}
+        fields = self.get_serializer_class()().fields
+        for name, field in fields.items():
+            if (field.read_only or
+                    not isinstance(field, KfIdHyperlinkedRelatedField)):
+                continue
+            kf_ids = {field.kf_id_from_url(item.get(name))
+                      for item in items if isinstance(item, dict)}
+            kf_ids.discard(None)
+            related[name] = field.get_queryset().in_bulk(list(kf_ids))
+        return related
+
+    def perform_bulk_create(self, instances):
+        """ Called with the new objects once they have been inserted """
+        pass
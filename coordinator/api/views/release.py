@@ -1,5 +1,5 @@
-import django_rq
 import django_fsm
+from collections import OrderedDict
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import viewsets
 from rest_framework.mixins import UpdateModelMixin
@@ -13,9 +13,19 @@ from coordinator.tasks import (
     cancel_release,
     release_status_check
 )
+from coordinator import cache, progress
+from coordinator.queues import enqueue
+from coordinator.timeline import TERMINAL_STATES, release_timeline
 from coordinator.permissions import GroupPermission
-from coordinator.api.models import Release
+from coordinator.api.models import Release, ReleaseStat
 from coordinator.api.serializers import ReleaseSerializer
+from coordinator.api.views.mixins import (
+    ConditionalGetMixin,
+    CachedRetrieveMixin,
+    ProgressOverlayMixin,
+    service_names
+)
+from coordinator.pagination import CoordinatorPagination
 
 
 class ReleaseFilter(django_filters.FilterSet):
@@ -25,7 +35,9 @@ class ReleaseFilter(django_filters.FilterSet):
         fields = ('state',)
 
 
-class ReleaseViewSet(viewsets.ModelViewSet, UpdateModelMixin):
+class ReleaseViewSet(ProgressOverlayMixin, ConditionalGetMixin,
+                     CachedRetrieveMixin, viewsets.ModelViewSet,
+                     UpdateModelMixin):
     """
     retrieve:
     Get a release by `kf_id`
@@ -44,8 +56,19 @@ class ReleaseViewSet(viewsets.ModelViewSet, UpdateModelMixin):
     lookup_field = 'kf_id'
     queryset = Release.objects.order_by('-created_at').all()
     serializer_class = ReleaseSerializer
+    pagination_class = CoordinatorPagination
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filter_class = ReleaseFilter
+    cache_name = 'release'
+
+    def get_queryset(self):
+        queryset = super(ReleaseViewSet, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
+
+    def etag_state(self):
+        # Tasks are rendered with the names of their services
+        return [progress.version(), service_names()]
 
     def create(self, *args, **kwargs):
         """
@@ -55,7 +78,7 @@ class ReleaseViewSet(viewsets.ModelViewSet, UpdateModelMixin):
         res = super(ReleaseViewSet, self).create(*args, **kwargs)
         if res.status_code == 201:
             kf_id = res.data['kf_id']
-            django_rq.enqueue(init_release, kf_id)
+            enqueue(init_release, kf_id)
         return res
 
     def destroy(self, request, kf_id=None):
@@ -74,7 +97,7 @@ class ReleaseViewSet(viewsets.ModelViewSet, UpdateModelMixin):
         try:
             release.cancel()
             release.save()
-            django_rq.enqueue(cancel_release, release.kf_id)
+            enqueue(cancel_release, release.kf_id)
         except django_fsm.TransitionNotAllowed:
             # Release must already be canceled or is canceling
             pass
@@ -88,7 +111,7 @@ class ReleaseViewSet(viewsets.ModelViewSet, UpdateModelMixin):
         Release must be in the `staged` state to begin publishing.
         """
         release = Release.objects.get(kf_id=kf_id)
-        django_rq.enqueue(publish_release, release.kf_id)
+        enqueue(publish_release, release.kf_id)
         return Response({'message': 'publishing'})
 
     @action(methods=['post'], detail=False)
@@ -100,7 +123,76 @@ class ReleaseViewSet(viewsets.ModelViewSet, UpdateModelMixin):
         to_check = ['initializing', 'running', 'publishing', 'canceling']
         releases = Release.objects.filter(state__in=to_check)
         for release in releases:
-            django_rq.enqueue(release_status_check, release.kf_id)
+            enqueue(release_status_check, release.kf_id)
 
         return Response({'status': 'ok',
                          'message': f'{len(releases)} releases to check'}, 200)
+
+    @action(methods=['get'], detail=True)
+    def timeline(self, request, kf_id=None):
+        """
+        Get when each phase of a release and of each of its tasks started
+        and finished, and which task service each phase waited on last.
+
+        The timeline of a release that has finished is cached.
+        """
+        release = (Release.objects.filter(kf_id=kf_id)
+                                  .values('kf_id', 'state', 'created_at')
+                                  .first())
+        if release is None:
+            return Response({'detail': 'Not found.'}, 404)
+
+        if release['state'] not in TERMINAL_STATES:
+            return Response(release_timeline(release))
+        return Response(cache.get_or_render(
+            'timeline', kf_id, 'json', lambda: release_timeline(release)))
+
+    @action(methods=['get'], detail=False)
+    def stats(self, request):
+        """
+        Get the number of releases in each state, the rate at which they
+        are published or fail, and the median time taken to publish them,
+        overall and for each month that releases were created in.
+
+        Stats are computed periodically, as of `refreshed_at`.
+        """
+        months = OrderedDict()
+        refreshed_at = None
+        for stat in ReleaseStat.objects.order_by('month', 'state'):
+            refreshed_at = stat.refreshed_at
+            month = months.setdefault(stat.month.strftime('%Y-%m'), {
+                'month': stat.month.strftime('%Y-%m'),
+                'states': {},
+                'median_time_to_publish': None,
+            })
+            month['states'][stat.state] = stat.releases
+            if stat.state == 'published':
+                month['median_time_to_publish'] = stat.median_publish_seconds
+
+        states = {}
+        for month in months.values():
+            month.update(self.rates(month['states']))
+            for state, count in month['states'].items():
+                states[state] = states.get(state, 0) + count
+
+        body = {'refreshed_at': refreshed_at,
+                'states': states,
+                'months': list(months.values())}
+        body.update(self.rates(states))
+        return Response(body, 200)
+
+    @staticmethod
+    def rates(states):
+        """
+        The fraction of finished releases that were published and that
+        failed
+        """
+        finished = sum(states.get(s, 0)
+                       for s in ['published', 'failed', 'canceled'])
+        return {
+            'releases': sum(states.values()),
+            'success_rate': (states.get('published', 0) / finished
+                             if finished else None),
+            'failure_rate': (states.get('failed', 0) / finished
+                             if finished else None),
+        }
@@ -1,7 +1,10 @@
 from rest_framework import viewsets
 import django_filters.rest_framework
 from coordinator.api.serializers import ReleaseNoteSerializer
-from coordinator.api.models import ReleaseNote
+from coordinator.api.models import ReleaseNote, touch_releases
+from coordinator.api.views.mixins import (ConditionalGetMixin,
+                                          BulkCreateMixin)
+from coordinator.pagination import CoordinatorPagination
 
 
 class ReleaseNoteFilter(django_filters.FilterSet):
@@ -11,13 +14,14 @@ class ReleaseNoteFilter(django_filters.FilterSet):
         fields = ('author', 'study', 'release')
 
 
-class ReleaseNoteViewSet(viewsets.ModelViewSet):
+class ReleaseNoteViewSet(ConditionalGetMixin, BulkCreateMixin,
+                         viewsets.ModelViewSet):
     """
     retrieve:
     Get a note by `kf_id`
 
     create:
-    Register a new note
+    Register a new note, or many notes at once by posting a list of them
 
     list:
     Return a page of notes
@@ -32,7 +36,17 @@ class ReleaseNoteViewSet(viewsets.ModelViewSet):
     Completely remove the note from the coordinator.
     """
     lookup_field = 'kf_id'
+    kf_id_prefix = 'RN'
     queryset = ReleaseNote.objects.order_by('-created_at').all()
     serializer_class = ReleaseNoteSerializer
+    pagination_class = CoordinatorPagination
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filter_class = ReleaseNoteFilter
+
+    def get_queryset(self):
+        queryset = super(ReleaseNoteViewSet, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
+
+    def perform_bulk_create(self, instances):
+        touch_releases(*{note.release_id for note in instances})
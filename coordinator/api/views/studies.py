@@ -1,14 +1,24 @@
-import requests
+import django_rq
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
 from django.conf import settings
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 
-from coordinator.api.models import Study, Release
-from coordinator.api.serializers import StudySerializer, ReleaseSerializer
+from coordinator.api.models import Study, StudySync, Release
+from coordinator.api.serializers import (StudySerializer,
+                                         StudySyncSerializer,
+                                         ReleaseSerializer)
+from coordinator.api.views.mixins import (ConditionalGetMixin,
+                                          ProgressOverlayMixin)
+from coordinator.pagination import CoordinatorPagination
+from coordinator.queues import enqueue
+from coordinator.tasks import SYNC_TIMEOUT, sync_studies
 
 
-class StudiesViewSet(viewsets.ReadOnlyModelViewSet):
+class StudiesViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Only read studies or sync studies with the dataservice.
 
@@ -18,76 +28,74 @@ class StudiesViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'kf_id'
     queryset = Study.objects.order_by('-created_at').all()
     serializer_class = StudySerializer
+    etag_dependencies = (Release,)
 
-    @action(methods=['post'], detail=False)
+    def get_queryset(self):
+        queryset = super(StudiesViewSet, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
+
+    @action(methods=['get', 'post'], detail=False)
     def sync(self, request):
         """
-        Synchronize studies with the dataservice
+        get:
+        Get the last successful sync with the dataservice
 
-        Currently done within a request with the intent that the user sync
-        manually from the ui and recieve fresh studies on the response
+        post:
+        Start synchronizing studies with the dataservice
 
-        If the process for syncing studies becomes automated, then this
-        may be moved to a task
+        Studies are synchronized in the background. The progress of the sync
+        may be followed at `/studies/sync/{job}`
         """
-        if not settings.DATASERVICE_URL:
-            return
+        if request.method == 'GET':
+            last = StudySync.last_success()
+            if last is None:
+                raise NotFound('Studies have not been synchronized')
+            return Response(StudySyncSerializer(last).data, 200)
 
-        resp = requests.get(settings.DATASERVICE_URL+'/studies?limit=100')
-        if resp.status_code != 200:
-            message = 'There was an error getting studies from the dataservice'
-            if resp.json() and 'message' in resp.json():
-                message = resp.json()['message']
+        if not settings.DATASERVICE_URL:
             return Response({'status': 'error',
-                             'message': f'{message}'}, resp.status_code)
-
-        studies = Study.objects.all()
-        new = 0
-        deleted = 0
-
-        for study in resp.json()['results']:
-            try:
-                s = Study.objects.get(kf_id=study['kf_id'])
-            # We don't know about the study, create it
-            except Study.DoesNotExist:
-                s = Study(kf_id=study['kf_id'],
-                          name=study['name'],
-                          visible=study['visible'],
-                          created_at=study['created_at'])
-                s.save()
-                new += 1
-                continue
+                             'message': 'No dataservice is configured'}, 400)
 
-            # Check for updated fields
-            for field in ['name', 'visible']:
-                if getattr(s, field) != study[field]:
-                    setattr(s, field, study[field])
-            s.save()
+        job = enqueue(sync_studies, timeout=SYNC_TIMEOUT)
+        return Response({'status': 'queued',
+                         'job': job.id,
+                         'message': 'Synchronizing with dataservice'}, 202)
 
-        # Check if any studies were deleted from the dataservice
-        coord_studies = set(s.kf_id for s in studies)
-        ds_studies = set(s['kf_id'] for s in resp.json()['results'])
-        missing_studies = coord_studies - ds_studies
-        deleted = len(missing_studies)
-        for study in missing_studies:
-            s = Study.objects.get(kf_id=study)
-            s.deleted = True
-            s.save()
-
-        return Response({'status': 'ok',
-                         'new': new,
-                         'deleted': deleted,
-                         'message': f'Synchronized with dataservice'}, 200)
-
-
-class StudyReleasesViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(methods=['get'], detail=False,
+            url_path=r'sync/(?P<job_id>[^/.]+)')
+    def sync_status(self, request, job_id=None):
+        """
+        Get the progress of a study sync
+        """
+        try:
+            job = Job.fetch(job_id, connection=django_rq.get_connection())
+        except NoSuchJobError:
+            raise NotFound('No sync with that id')
+        # Other jobs are not studies' business
+        if job.func_name != f'{sync_studies.__module__}.sync_studies':
+            raise NotFound('No sync with that id')
+
+        status = job.get_status()
+        body = {'status': status, 'job': job.id}
+        body.update(job.meta.get('progress', {}))
+        if 'message' in job.meta:
+            body['message'] = job.meta['message']
+        return Response(body, 200)
+
+
+class StudyReleasesViewSet(ProgressOverlayMixin, ConditionalGetMixin,
+                           viewsets.ReadOnlyModelViewSet):
     """
     list:
     Returns a page of releases related to a given study
     """
     lookup_field = 'kf_id'
     serializer_class = ReleaseSerializer
+    pagination_class = CoordinatorPagination
 
     def get_queryset(self):
-        return Study.objects.get(kf_id=self.kwargs['study_kf_id']) \
-                            .release_set.order_by('-created_at')
+        queryset = (Study.objects.get(kf_id=self.kwargs['study_kf_id'])
+                                 .release_set.order_by('-created_at'))
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
@@ -1,11 +1,23 @@
-import django_rq
-from rest_framework import viewsets
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+from django.utils import timezone
+from django_fsm import can_proceed
+from rest_framework import status, viewsets
 import django_filters.rest_framework
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from coordinator import metrics, progress
+from coordinator.queues import enqueue
 from coordinator.tasks import status_check, cancel_release
-from coordinator.api.models import Task
-from coordinator.api.serializers import TaskSerializer
+from coordinator.api.models import (Event, Release, Task, TaskService,
+                                    publish_events, task_event,
+                                    touch_releases)
+from coordinator.api.serializers import TaskSerializer, TaskReportSerializer
+from coordinator.api.views.mixins import (ConditionalGetMixin,
+                                          ProgressOverlayMixin,
+                                          service_names)
+from coordinator.pagination import CoordinatorPagination
 
 
 class TaskFilter(django_filters.FilterSet):
@@ -15,7 +27,8 @@ class TaskFilter(django_filters.FilterSet):
         fields = ('release', 'task_service', 'state')
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ProgressOverlayMixin, ConditionalGetMixin,
+                  viewsets.ModelViewSet):
     """
     retrieve:
     Return a task given its `kf_id`
@@ -35,28 +48,55 @@ class TaskViewSet(viewsets.ModelViewSet):
     lookup_field = 'kf_id'
     queryset = Task.objects.order_by('-created_at').all()
     serializer_class = TaskSerializer
+    pagination_class = CoordinatorPagination
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filter_class = TaskFilter
 
+    @property
+    def etag_dependencies(self):
+        _, expand = (self.get_serializer_class()
+                         .get_field_selection(self.request))
+        # Expanded services show their health as well as their names
+        return (TaskService,) if 'task_service' in expand else ()
+
+    def etag_state(self):
+        # Tasks are rendered with the names of their services
+        return [progress.version(), service_names()]
+
+    def get_queryset(self):
+        queryset = super(TaskViewSet, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
+
     def partial_update(self, request, kf_id=None):
         """
         Partial update of the task.
         A task service may call this endpoint to report new progress or
         that it has reached a new state.
+
+        Reports of progress alone are buffered and written to the database
+        in batches. Changes of state are written immediately.
         """
+        if set(request.data) == {'progress'}:
+            resp = self.buffer_progress(request)
+            if resp is not None:
+                return resp
+
         resp = super(TaskViewSet, self).partial_update(request, kf_id)
+        if 'progress' in request.data:
+            progress.discard(kf_id)
         # If the task is failed
         if resp.data['state'] == 'failed':
             release = Task.objects.get(kf_id=kf_id).release
             release.failed()
             release.save()
-            django_rq.enqueue(cancel_release, release.kf_id, True)
+            enqueue(cancel_release, release.kf_id, True)
         # If the task is canceled
         if resp.data['state'] == 'canceled':
             release = Task.objects.get(kf_id=kf_id).release
             release.cancel()
             release.save()
-            django_rq.enqueue(cancel_release, release.kf_id, False)
+            enqueue(cancel_release, release.kf_id, False)
         # If the task is being updated to staged
         if resp.data['state'] == 'staged':
             kf_id = resp.data['kf_id']
@@ -78,6 +118,30 @@ class TaskViewSet(viewsets.ModelViewSet):
                 release.save()
         return resp
 
+    def perform_update(self, serializer):
+        """ Record the change when a service reports a new state """
+        previous = serializer.instance.state
+        task = serializer.save()
+        if task.state != previous:
+            task_event(task, previous, task.state).save()
+            metrics.count_transition('task', previous, task.state)
+
+    def buffer_progress(self, request):
+        """
+        Buffer a task's new progress instead of saving the task
+
+        :returns: The response, or None if the progress could not be
+            buffered and should be saved as usual
+        """
+        task = self.get_object()
+        serializer = self.get_serializer(task, data=request.data,
+                                         partial=True)
+        serializer.is_valid(raise_exception=True)
+        reported = serializer.validated_data['progress']
+        if not progress.record({task.kf_id: reported}):
+            return None
+        return Response(self.get_serializer(task).data)
+
     @action(methods=['post'], detail=False)
     def status_checks(self, request):
         """
@@ -85,7 +149,138 @@ class TaskViewSet(viewsets.ModelViewSet):
         """
         tasks = Task.objects.filter(state__in=['running', 'publishing'])
         for task in tasks:
-            django_rq.enqueue(status_check, task.kf_id)
+            enqueue(status_check, task.kf_id)
 
         return Response({'status': 'ok',
                          'message': f'{len(tasks)} task to check'}, 200)
+
+    @action(methods=['post'], detail=False)
+    def report(self, request):
+        """
+        Report the state and/or progress of many tasks at once.
+
+        A task service may post a list of `{"kf_id", "state", "progress"}`
+        instead of patching each task. The tasks are updated together and
+        each affected release is then moved on, failed, or canceled the same
+        way it would be by reporting its tasks one at a time. Reports of
+        progress alone are buffered like those made by patching a task.
+        """
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Expected a list of task reports'},
+                            status.HTTP_400_BAD_REQUEST)
+
+        serializers = [TaskReportSerializer(data=item)
+                       for item in request.data]
+        reports = {s.validated_data['kf_id']: s.validated_data
+                   for s in serializers if s.is_valid()}
+        errors = [s.errors or None for s in serializers]
+
+        with transaction.atomic():
+            current = {t.kf_id: t for t in
+                       Task.objects.select_for_update()
+                                   .filter(kf_id__in=list(reports))
+                                   .only('kf_id', 'state', 'release_id',
+                                         'task_service_id')}
+            releases = {k: t.release_id for k, t in current.items()}
+            for i, s in enumerate(serializers):
+                if errors[i] or s.validated_data['kf_id'] in releases:
+                    continue
+                errors[i] = {'kf_id': ['No task with that kf_id']}
+            reports = {k: r for k, r in reports.items() if k in releases}
+
+            # Progress alone is buffered, changes of state are written now
+            buffered = {k: r['progress'] for k, r in reports.items()
+                        if 'state' not in r}
+            written = reports
+            if progress.record(buffered):
+                written = {k: r for k, r in reports.items()
+                           if 'state' in r}
+
+            if written:
+                self.apply_reports(written)
+                self.record_transitions(written, current)
+                touch_releases(*{releases[k] for k in written})
+                self.update_releases(written, releases)
+
+        progress.discard(*[k for k, r in written.items() if 'progress' in r])
+        tasks = {t['kf_id']: t for t in
+                 Task.objects.filter(kf_id__in=list(reports))
+                             .values('kf_id', 'state', 'progress')}
+        results = [None if e else tasks[s.validated_data['kf_id']]
+                   for s, e in zip(serializers, errors)]
+
+        if not reports and serializers:
+            code = status.HTTP_400_BAD_REQUEST
+        elif any(errors):
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_200_OK
+        return Response({'results': results, 'errors': errors}, code)
+
+    def apply_reports(self, reports):
+        """ Update the state and progress of every task in one statement """
+        def case(field, output_field):
+            return Case(*[When(kf_id=kf_id, then=Value(r[field]))
+                          for kf_id, r in reports.items() if field in r],
+                        default=F(field), output_field=output_field)
+
+        (Task.objects.filter(kf_id__in=list(reports))
+                     .update(state=case('state', CharField()),
+                             progress=case('progress', IntegerField()),
+                             updated_at=timezone.now()))
+
+    def record_transitions(self, reports, tasks):
+        """ Record an event for each task that reported a new state """
+        events = []
+        for kf_id, report in reports.items():
+            task = tasks[kf_id]
+            if report.get('state', task.state) == task.state:
+                continue
+            events.append(task_event(task, task.state, report['state']))
+            metrics.count_transition('task', task.state, report['state'])
+        Event.objects.bulk_create(events)
+        publish_events(events)
+
+    def update_releases(self, reports, releases):
+        """
+        Fail, cancel, stage, or complete each release that had a task
+        reported, checking the states of its tasks only once
+        """
+        reported = defaultdict(set)
+        for kf_id, report in reports.items():
+            if 'state' in report:
+                reported[releases[kf_id]].add(report['state'])
+        if not reported:
+            return
+
+        states = defaultdict(set)
+        for release_id, state in (Task.objects
+                                      .filter(release_id__in=list(reported))
+                                      .values_list('release_id', 'state')):
+            states[release_id].add(state)
+
+        for release in Release.objects.filter(kf_id__in=list(reported)):
+            task_states = reported[release.kf_id]
+            if 'failed' in task_states and can_proceed(release.failed):
+                release.failed()
+                release.save()
+                self.enqueue_cancel(release.kf_id, True)
+            elif 'canceled' in task_states and can_proceed(release.cancel):
+                release.cancel()
+                release.save()
+                self.enqueue_cancel(release.kf_id, False)
+            elif ('staged' in task_states and
+                    states[release.kf_id] == {'staged'} and
+                    can_proceed(release.staged)):
+                release.staged()
+                release.save()
+            elif ('published' in task_states and
+                    states[release.kf_id] == {'published'} and
+                    can_proceed(release.complete)):
+                release.complete()
+                release.save()
+
+    def enqueue_cancel(self, release_id, fail):
+        # Don't let the worker see the release before it has been committed
+        transaction.on_commit(
+            lambda: enqueue(cancel_release, release_id, fail))
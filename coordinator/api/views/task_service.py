@@ -1,13 +1,15 @@
-import django_rq
 from rest_framework import viewsets
 import django_filters.rest_framework
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from coordinator.authentication import EgoAuthentication
 from coordinator.permissions import DevPermission
+from coordinator.queues import enqueue
 from coordinator.tasks import health_check
 from coordinator.api.models import TaskService
 from coordinator.api.serializers import TaskServiceSerializer
+from coordinator.api.views.mixins import (ConditionalGetMixin,
+                                          BulkCreateMixin)
 
 
 class TaskServiceFilter(django_filters.FilterSet):
@@ -17,7 +19,8 @@ class TaskServiceFilter(django_filters.FilterSet):
         fields = ('enabled',)
 
 
-class TaskServiceViewSet(viewsets.ModelViewSet):
+class TaskServiceViewSet(ConditionalGetMixin, BulkCreateMixin,
+                         viewsets.ModelViewSet):
     """
     retrieve:
     Get a task service by `kf_id`
@@ -26,6 +29,7 @@ class TaskServiceViewSet(viewsets.ModelViewSet):
     Register a new task service by providing the url it is reachable at.
     The coordinator will check the provided url's /status endpoint to confirm
     that the service is reachable from the coordinator.
+    Many services may be registered at once by posting a list of them.
 
     list:
     Return a page of task services
@@ -42,11 +46,17 @@ class TaskServiceViewSet(viewsets.ModelViewSet):
     authentication_classes = (EgoAuthentication,)
     permission_classes = (DevPermission,)
     lookup_field = 'kf_id'
+    kf_id_prefix = 'TS'
     queryset = TaskService.objects.order_by('-created_at').all()
     serializer_class = TaskServiceSerializer
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filter_class = TaskServiceFilter
 
+    def get_queryset(self):
+        queryset = super(TaskServiceViewSet, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(queryset, self.request)
+
     @action(methods=['post'], detail=False)
     def health_checks(self, request):
         """
@@ -54,6 +64,6 @@ class TaskServiceViewSet(viewsets.ModelViewSet):
         """
         task_services = TaskService.objects.all()
         for service in task_services:
-            django_rq.enqueue(health_check, service.kf_id)
+            enqueue(health_check, service.kf_id)
 
         return Response({'status': 'ok'}, 200)
@@ -1,10 +1,22 @@
+import time
+import uuid
 import datetime
+import hashlib
+import threading
+import json
 import jwt
-import requests
+import django_rq
 import logging
+from collections import OrderedDict
+from jwt.algorithms import RSAAlgorithm
+from redis.exceptions import RedisError
 from django.conf import settings
 from rest_framework import authentication
 from rest_framework import exceptions
+from coordinator import cache, timing
+from coordinator.utils import lazy_import
+
+requests = lazy_import('requests')
 
 
 logger = logging.getLogger()
@@ -39,46 +51,301 @@ class EgoAuthentication(authentication.BaseAuthentication):
         if 'Bearer ' not in token:
             return ({}, None)
 
+        token = token.split('Bearer ')[-1]
+        user = VERIFIED_TOKENS.get(token)
+        if user is not None:
+            return (user, None)
+
         try:
-            token = token.split('Bearer ')[-1]
             decoded = jwt.decode(token, verify=False)
             context = decoded['context']
             user = context['user']
         except (KeyError, jwt.exceptions.DecodeError):
             raise exceptions.AuthenticationFailed('Not a valid JWT')
 
-        # Check that this is a valid JWT from ego
+        with timing.phase(request, 'auth'):
+            self.verify(token)
+
+        if 'exp' in decoded:
+            VERIFIED_TOKENS.set(token, user, decoded['exp'])
+
+        return (user, None)
+
+    def verify(self, token):
+        """
+        Check that the token was signed by ego.
+
+        The signature is checked against ego's public key if it can be
+        retrieved, otherwise ego is asked to verify the token.
+
+        :raises: AuthenticationFailed if the token is not valid
+        """
+        key = EGO_PUBLIC_KEY.get()
+        if key is None:
+            return self.verify_remote(token)
+
+        try:
+            self.decode(token, key)
+        except jwt.exceptions.InvalidSignatureError:
+            # The key may have been rotated
+            new_key = EGO_PUBLIC_KEY.get(refresh=True)
+            if new_key is None or new_key == key:
+                raise exceptions.AuthenticationFailed('Not a valid JWT')
+            self.decode(token, new_key)
+
+    def decode(self, token, key):
+        try:
+            return jwt.decode(token, key, algorithms=['RS256'],
+                              options={'verify_aud': False})
+        except jwt.exceptions.InvalidSignatureError:
+            raise
+        except jwt.exceptions.ExpiredSignatureError:
+            raise exceptions.AuthenticationFailed('Token has expired')
+        except jwt.exceptions.InvalidTokenError:
+            raise exceptions.AuthenticationFailed('Not a valid JWT')
+
+    def verify_remote(self, token):
+        """ Check with ego that the token is valid """
         verify_url = settings.EGO_API + '/oauth/token/verify'
-        resp = requests.get(verify_url, headers={'token': token})
+        try:
+            resp = requests.get(verify_url, headers={'token': token},
+                                timeout=settings.REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as err:
+            logger.error(f'Could not verify token with ego: {err}')
+            raise exceptions.AuthenticationFailed('Auth service unavailable')
         if resp.status_code != 200 or resp.json() is False:
             raise exceptions.AuthenticationFailed('Auth service unavailable')
 
-        return (user, None)
+
+class EgoPublicKey():
+    """
+    Fetches and holds ego's public key for verifying tokens locally.
+
+    The key is fetched again when asked to refresh, such as when a token
+    fails to verify after the key was rotated. Fetches are made at most once
+    every `RETRY_AFTER` seconds so that bad tokens do not flood ego.
+    """
+    RETRY_AFTER = 60
+
+    def __init__(self):
+        self._key = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def get(self, refresh=False):
+        """
+        :param refresh: Fetch the key again even if one is held
+        :returns: The public key or None if it could not be retrieved
+        """
+        if self._key is not None and not refresh:
+            return self._key
+
+        with self._lock:
+            if (self._fetched_at is not None and
+                    time.monotonic() - self._fetched_at < self.RETRY_AFTER):
+                return self._key
+            self._fetched_at = time.monotonic()
+            key = self.fetch()
+            if key is not None:
+                self._key = key
+        return self._key
+
+    def fetch(self):
+        """ Get the public key from ego """
+        url = f'{settings.EGO_API}/oauth/token/public_key'
+        try:
+            resp = requests.get(url, timeout=settings.REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as err:
+            logger.error(f'Could not retrieve public key from ego: {err}')
+            return
+
+        if resp.status_code != 200:
+            logger.error(f'Problem retrieving public key from ego: '
+                         f'{resp.status_code}')
+            return
+
+        pem = resp.text
+        if isinstance(pem, str) and not pem.startswith('-----BEGIN'):
+            pem = ('-----BEGIN PUBLIC KEY-----\n' + pem.strip() +
+                   '\n-----END PUBLIC KEY-----')
+        try:
+            return RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(pem)
+        except (ValueError, TypeError):
+            logger.error(f'Ego public key malformed: {resp.text}')
+
+
+class VerifiedTokenCache():
+    """
+    A bounded, least recently used cache of tokens that have already been
+    verified, held until they expire
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        """ :returns: The token's user if it is verified, None otherwise """
+        key = self._key(token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            user, exp = entry
+            if exp <= time.time():
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return user
+
+    def set(self, token, user, exp):
+        if exp <= time.time():
+            return
+        with self._lock:
+            self._tokens[self._key(token)] = (user, exp)
+            while len(self._tokens) > self.size:
+                self._tokens.popitem(last=False)
+
+
+EGO_PUBLIC_KEY = EgoPublicKey()
+VERIFIED_TOKENS = VerifiedTokenCache()
 
 
 class EgoJWTStore():
     """
     Stores the coordinator's application JWT to be sent to verify the
     coordinator's identity.
+
+    The token is shared by all processes through redis. Once it is within
+    `REFRESH_BEFORE` seconds of expiring it is renewed in the background,
+    and a lock ensures only one process asks ego for it. Callers only wait
+    on ego when there is no usable token at all.
     """
+    KEY = 'coordinator:ego:token'
+    LOCK_KEY = KEY + ':lock'
+    # Longer than ego is given to answer, so the lock outlives the request
+    LOCK_TIMEOUT = 30
+    # Seconds before expiry to start renewing the token in the background
+    REFRESH_BEFORE = 300
+    # Seconds before expiry that a token is no longer used
+    EXPIRY_MARGIN = 60
+    # Seconds to wait for another process to fetch a token
+    WAIT = 5
 
     def __init__(self):
         self.expiration = 0
         self._token = None
+        self._refreshing = threading.Lock()
+
+    def _remaining(self):
+        return self.expiration - datetime.datetime.utcnow().timestamp()
+
+    def _usable(self):
+        return (self._token is not None and
+                self._remaining() > self.EXPIRY_MARGIN)
+
+    def _fresh(self):
+        return (self._token is not None and
+                self._remaining() > self.REFRESH_BEFORE)
 
     @property
     def token(self):
+        if self._fresh():
+            return self._token
 
-        # Check if we've fetched a token yet
-        if self._token is None:
-            self.get_new_token()
+        # Another process may have already renewed the token
+        self.load()
+        if self._fresh():
+            return self._token
 
-        # Check if we need to get a fresh token
-        if datetime.datetime.utcnow().timestamp() > self.expiration - 60:
-            self.get_new_token()
+        if self._usable():
+            self.refresh_in_background()
+        else:
+            self.refresh(wait=True)
 
         return self._token
 
+    def load(self):
+        """ Take the shared token if it is newer than the one held """
+        try:
+            stored = django_rq.get_connection().get(self.KEY)
+        except RedisError as err:
+            logger.warning(f'Could not load ego token from redis: {err}')
+            return
+        if stored is None:
+            return
+        stored = json.loads(stored)
+        if stored['expiration'] > self.expiration:
+            self._token = stored['token']
+            self.expiration = stored['expiration']
+
+    def refresh(self, wait=False):
+        """
+        Get a new token from ego and share it, unless another process is
+        already doing so.
+
+        :param wait: Wait for another process's new token instead of
+            returning immediately
+        """
+        lock = uuid.uuid4().hex
+        try:
+            conn = django_rq.get_connection()
+            locked = conn.set(self.LOCK_KEY, lock, ex=self.LOCK_TIMEOUT,
+                              nx=True)
+        except RedisError as err:
+            logger.warning(f'Could not lock ego token in redis: {err}')
+            return self.get_new_token()
+
+        if not locked:
+            if not wait:
+                return
+            deadline = time.monotonic() + self.WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                self.load()
+                if self._usable():
+                    return self._token
+            return self.get_new_token()
+
+        try:
+            self.load()
+            if self._fresh():
+                return self._token
+            token = self.get_new_token()
+            if token is not None:
+                self.store(conn)
+            return token
+        finally:
+            cache.unlock(conn, self.LOCK_KEY, lock)
+
+    def store(self, conn):
+        """ Share the held token with other processes until it expires """
+        stored = json.dumps({'token': self._token,
+                             'expiration': self.expiration})
+        try:
+            conn.set(self.KEY, stored, ex=max(int(self._remaining()), 1))
+        except RedisError as err:
+            logger.warning(f'Could not store ego token in redis: {err}')
+
+    def refresh_in_background(self):
+        """ Renew the token in a thread, one at a time per process """
+        if not self._refreshing.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Problem renewing ego token')
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, daemon=True).start()
+
     @property
     def header(self):
         """
@@ -92,7 +359,11 @@ class EgoJWTStore():
         }
 
     def get_new_token(self):
-        """ Get a new token from ego """
+        """
+        Get a new token from ego
+
+        :returns: The new token, or None if ego could not provide one
+        """
         url = f'{settings.EGO_API}/oauth/token'
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded'
@@ -100,7 +371,12 @@ class EgoJWTStore():
         data = (f"grant_type=client_credentials&" +
                 f"client_id={settings.EGO['default']['CLIENT_ID']}&" +
                 f"client_secret={settings.EGO['default']['SECRET']}")
-        resp = requests.post(url, headers=headers, data=data)
+        try:
+            resp = requests.post(url, headers=headers, data=data,
+                                 timeout=settings.REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as err:
+            logger.error(f'Could not retrieve JWT from ego: {err}')
+            return
 
         if resp.status_code != 200:
             logger.error(f'Problem retrieving JWT from ego: {resp.content}')
@@ -0,0 +1,150 @@
+import json
+import time
+import uuid
+import logging
+import django_rq
+from django.conf import settings
+from redis.exceptions import RedisError, WatchError
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'coordinator:document'
+# How long a render may hold the lock before another request may take over
+LOCK_TIMEOUT = 30
+# How long a request waits for another's render before rendering itself.
+# Releases take well under a second to render, so this need only cover a
+# slow one without tying up the waiting request's thread.
+WAIT_TIMEOUT = 2
+# How often requests waiting on another render check for its result
+POLL_INTERVAL = 0.05
+# Deletes a lock only if it still holds the token it was taken with, so a
+# request never releases a lock that has since passed to another
+UNLOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _keys(name, key):
+    base = f'{PREFIX}:{name}:{key}'
+    return base, base + ':generation'
+
+
+def get_or_render(name, key, variant, render):
+    """
+    Return a document from the cache, rendering and storing it on a miss.
+
+    Concurrent misses for the same document are collapsed: one request takes
+    a lock and renders while the rest wait for its result, falling back to
+    rendering themselves only if the lock holder takes longer than
+    `WAIT_TIMEOUT`.
+
+    :param name: The type of document, eg: `release`
+    :param key: The id of the object the document describes
+    :param variant: Distinguishes representations of the same object, such
+        as those with links built for a different host
+    :param render: A function returning the document as json-able data
+    """
+    timeout = settings.RELEASE_CACHE_TIMEOUT
+    if not timeout:
+        return render()
+
+    doc_key, gen_key = _keys(name, key)
+    lock_key = f'{doc_key}:{variant}:lock'
+    # Only set when this request holds the lock
+    token = None
+    try:
+        conn = django_rq.get_connection()
+        cached = conn.hget(doc_key, variant)
+        if cached is not None:
+            return json.loads(cached)
+
+        generation = conn.get(gen_key)
+        taken = uuid.uuid4().hex
+        if conn.set(lock_key, taken, ex=LOCK_TIMEOUT, nx=True):
+            token = taken
+        else:
+            doc = _wait(conn, doc_key, variant, lock_key)
+            if doc is not None:
+                return doc
+    except RedisError as err:
+        logger.warning(f'document cache unavailable: {err}')
+        return render()
+
+    try:
+        doc = render()
+        _store(conn, doc_key, gen_key, generation, variant, doc, timeout)
+        return doc
+    finally:
+        if token is not None:
+            unlock(conn, lock_key, token)
+
+
+def unlock(conn, lock_key, token):
+    """ Release a lock taken with the given token if it is still held """
+    try:
+        conn.eval(UNLOCK, 1, lock_key, token)
+    except RedisError:
+        pass
+
+
+def _wait(conn, doc_key, variant, lock_key):
+    """ Wait for the lock holder to store the document """
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        cached = conn.hget(doc_key, variant)
+        if cached is not None:
+            return json.loads(cached)
+        # The holder failed or the document was invalidated while rendering
+        if not conn.exists(lock_key):
+            return None
+
+
+def _store(conn, doc_key, gen_key, generation, variant, doc, timeout):
+    """
+    Store a document unless it was invalidated while it was being rendered
+    """
+    try:
+        with conn.pipeline() as pipe:
+            pipe.watch(gen_key)
+            if pipe.get(gen_key) != generation:
+                return
+            pipe.multi()
+            pipe.hset(doc_key, variant, json.dumps(doc))
+            pipe.expire(doc_key, timeout)
+            pipe.execute()
+    except (WatchError, RedisError):
+        pass
+
+
+def invalidate(name, *keys):
+    """
+    Drop all cached variants of the given documents.
+
+    Renders that are in progress when a document is invalidated will not be
+    stored.
+    """
+    if not settings.RELEASE_CACHE_TIMEOUT or not keys:
+        return
+    try:
+        with django_rq.get_connection().pipeline(transaction=False) as pipe:
+            for key in keys:
+                doc_key, gen_key = _keys(name, key)
+                pipe.incr(gen_key)
+                pipe.expire(gen_key, settings.RELEASE_CACHE_TIMEOUT)
+                pipe.delete(doc_key)
+            pipe.execute()
+    except RedisError as err:
+        logger.warning(f'could not invalidate {name} {keys}: {err}')
+
+
+def clear():
+    """ Drop every cached document """
+    conn = django_rq.get_connection()
+    keys = list(conn.scan_iter(f'{PREFIX}:*'))
+    if keys:
+        conn.delete(*keys)
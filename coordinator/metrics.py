@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+import django_rq
+from django.conf import settings
+from prometheus_client import (CollectorRegistry, Counter, Histogram,
+                               REGISTRY, generate_latest)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client import multiprocess
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+# Task services are given a few seconds at most to answer
+SERVICE_BUCKETS = (.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+# Jobs may run for as long as a study sync
+JOB_BUCKETS = (.05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+REQUEST_LATENCY = Histogram(
+    'coordinator_request_seconds',
+    'Time taken to respond to API requests',
+    ['method', 'view', 'status'])
+SERVICE_LATENCY = Histogram(
+    'coordinator_task_service_request_seconds',
+    'Time taken by task services to answer requests',
+    ['task_service', 'action', 'outcome'],
+    buckets=SERVICE_BUCKETS)
+JOB_RUNTIME = Histogram(
+    'coordinator_job_seconds',
+    'Time taken by workers to run jobs',
+    ['queue', 'job', 'status'],
+    buckets=JOB_BUCKETS)
+TRANSITIONS = Counter(
+    'coordinator_transitions_total',
+    'Changes of state of releases, tasks, and task services',
+    ['model', 'source', 'target'])
+
+
+def multiprocess_mode():
+    """
+    Whether metrics are written to files shared by every process, set by
+    pointing `prometheus_multiproc_dir` at an empty directory
+    """
+    return bool(os.environ.get('prometheus_multiproc_dir'))
+
+
+@contextmanager
+def service_request(task_service_id, action):
+    """
+    Time a request to a task service
+
+    Ex:
+    with service_request(service.kf_id, 'start'):
+        requests.post(...)
+    """
+    started = time.monotonic()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        (SERVICE_LATENCY.labels(task_service_id, action, outcome)
+                        .observe(time.monotonic() - started))
+
+
+def count_transition(model, source, target):
+    TRANSITIONS.labels(model, source, target).inc()
+
+
+class QueueCollector:
+    """
+    Reads the number of jobs waiting in each queue from redis when metrics
+    are scraped
+    """
+
+    def collect(self):
+        queued = GaugeMetricFamily('coordinator_queue_jobs',
+                                   'Jobs waiting in each queue',
+                                   labels=['queue'])
+        failed = GaugeMetricFamily('coordinator_failed_jobs',
+                                   'Jobs in the failed queue')
+        try:
+            for name in settings.RQ_QUEUES:
+                queued.add_metric([name], django_rq.get_queue(name).count)
+            failed.add_metric([], django_rq.get_failed_queue().count)
+        except RedisError as err:
+            logger.warning(f'could not count queued jobs: {err}')
+            return []
+        return [queued, failed]
+
+
+def exposition():
+    """
+    :returns: The text of every metric collected by this and, in
+        multiprocess mode, every other process
+    """
+    if multiprocess_mode():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    queues = CollectorRegistry()
+    queues.register(QueueCollector())
+    return generate_latest(registry) + generate_latest(queues)
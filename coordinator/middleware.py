@@ -0,0 +1,67 @@
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from coordinator.metrics import REQUEST_LATENCY
+from coordinator.timing import RequestTimer, log_slow
+
+
+class MetricsMiddleware:
+    """
+    Time each request, labeled by the view that handled it
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.monotonic()
+        response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        (REQUEST_LATENCY.labels(request.method, view, response.status_code)
+                        .observe(time.monotonic() - started))
+        return response
+
+
+class TimingMiddleware:
+    """
+    Time the database, view, and rendering of each request, report them in
+    a `Server-Timing` header, and log requests slower than
+    `SLOW_REQUEST_MS`.
+
+    Serializing, which happens within the view, is also reported on its own
+    as `serialize`, and rendering the serialized data as `render`.
+
+    Only used when `REQUEST_TIMING` is enabled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = request.timer = RequestTimer()
+        try:
+            with connection.execute_wrapper(timer.query):
+                with timer.phase('total'):
+                    response = self.get_response(request)
+                    # Other responses are finished when the view returns
+                    timer.stop('view')
+        finally:
+            timer.finish()
+        response['Server-Timing'] = timer.header()
+        log_slow(request, response, timer, settings.SLOW_REQUEST_MS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timer.start('view')
+
+    def process_template_response(self, request, response):
+        # Responses from rest framework views are rendered after this
+        request.timer.stop('view')
+        request.timer.start('render')
+        response.add_post_render_callback(
+            lambda response: request.timer.stop('render'))
+        return response
@@ -0,0 +1,151 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows in a queryset from the query planner's
+    statistics instead of running a `COUNT(*)` over the table.
+
+    :param queryset: The queryset to estimate
+    :returns: The number of rows the planner expects the query to return
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CoordinatorPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with two opt-in modes for large collections.
+
+    `?cursor=` switches to keyset pagination over `(created_at, kf_id)`.
+    An empty cursor returns the first page, and each page's `next` link
+    carries the cursor for the following page. Pages are found by an index
+    range scan instead of an `OFFSET` and no `COUNT(*)` is made.
+
+    `?count=estimate` replaces the exact `count` with the planner's row
+    estimate. It may also be combined with `?cursor=`.
+    """
+    cursor_query_param = 'cursor'
+    cursor_query_description = ('Cursor for keyset pagination. Pass an empty'
+                                ' value to start from the first page.')
+    count_query_param = 'count'
+    count_query_description = ('Use `estimate` to return an estimated count'
+                               ' instead of an exact one.')
+    ordering = ('-created_at', '-kf_id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = self.cursor_query_param in request.query_params
+        if self.keyset:
+            return self.paginate_keyset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_keyset(self, queryset, request):
+        self.count = None
+        if self.estimate_requested(request):
+            self.count = estimate_count(queryset)
+        self.limit = self.get_limit(request)
+        self.cursor = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            created_at, kf_id = self.cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) |
+                                       Q(created_at=created_at,
+                                         kf_id__lt=kf_id))
+
+        # Fetch one extra row to find out if there is another page
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        content = OrderedDict()
+        if self.count is not None:
+            content['count'] = self.count
+        content['next'] = self.get_next_cursor_link()
+        content['results'] = data
+        return Response(content)
+
+    def get_count(self, queryset):
+        if self.estimate_requested(self.request):
+            return estimate_count(queryset)
+        return super().get_count(queryset)
+
+    def estimate_requested(self, request):
+        return request.query_params.get(self.count_query_param) == 'estimate'
+
+    def get_next_cursor_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        cursor = self.encode_cursor(self.last.created_at, self.last.kf_id)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, created_at, kf_id):
+        position = '{}|{}'.format(created_at.isoformat(), kf_id)
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        """
+        Decode a cursor into a `(created_at, kf_id)` position.
+        An empty cursor starts at the first page.
+        """
+        if not encoded:
+            return None
+        try:
+            position = base64.urlsafe_b64decode(encoded.encode()).decode()
+            created_at, kf_id = position.split('|', 1)
+            created_at = parse_datetime(created_at)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+        if created_at is None or not kf_id:
+            raise NotFound('Invalid cursor')
+        return created_at, kf_id
+
+    def get_schema_fields(self, view):
+        fields = super().get_schema_fields(view)
+        return fields + [
+            coreapi.Field(
+                name=self.cursor_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Cursor',
+                    description=self.cursor_query_description
+                )
+            ),
+            coreapi.Field(
+                name=self.count_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Count',
+                    description=self.count_query_description
+                )
+            ),
+        ]
@@ -0,0 +1,173 @@
+import uuid
+import logging
+from datetime import datetime, timezone as tz
+import django_rq
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+from redis.exceptions import RedisError, ResponseError
+from coordinator import cache
+from coordinator.api.models import Task, touch_releases
+
+
+logger = logging.getLogger(__name__)
+
+# Latest reported progress of each task, keyed by the task's kf_id
+KEY = 'coordinator:progress'
+# Progress that is being written to the database by a flush
+FLUSHING_KEY = KEY + ':flushing'
+# When the progress being flushed was taken from the buffer
+SNAPSHOT_KEY = KEY + ':snapshot'
+# Bumped on every report so that conditional reads see the change
+VERSION_KEY = KEY + ':version'
+LOCK_KEY = KEY + ':lock'
+# How long a flush may hold the lock before another may take over
+LOCK_TIMEOUT = 60
+
+
+def record(progress):
+    """
+    Buffer the progress of tasks in redis to be written to the database by
+    the next flush. A later report replaces an earlier one.
+
+    :param progress: A dict of task kf_ids to their progress
+    :returns: Whether the progress was buffered. If not, the caller should
+        write it to the database itself.
+    """
+    if not settings.PROGRESS_WRITE_BEHIND or not progress:
+        return False
+    try:
+        pipe = django_rq.get_connection().pipeline()
+        pipe.hmset(KEY, progress)
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+        return True
+    except RedisError as err:
+        logger.warning(f'progress buffer unavailable: {err}')
+        return False
+
+
+def discard(*kf_ids):
+    """
+    Drop buffered progress for tasks whose progress was just written to the
+    database so that it is not overwritten by an older report
+    """
+    if not kf_ids:
+        return
+    try:
+        pipe = django_rq.get_connection().pipeline()
+        pipe.hdel(KEY, *kf_ids)
+        pipe.hdel(FLUSHING_KEY, *kf_ids)
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+    except RedisError as err:
+        logger.warning(f'progress buffer unavailable: {err}')
+
+
+def pending(kf_ids):
+    """
+    :returns: A dict of the buffered progress of any of the tasks that has
+        not yet been written to the database
+    """
+    kf_ids = list(kf_ids)
+    if not kf_ids:
+        return {}
+    try:
+        pipe = django_rq.get_connection().pipeline()
+        pipe.hmget(FLUSHING_KEY, kf_ids)
+        pipe.hmget(KEY, kf_ids)
+        flushing, latest = pipe.execute()
+    except RedisError as err:
+        logger.warning(f'progress buffer unavailable: {err}')
+        return {}
+
+    progress = {}
+    for values in [flushing, latest]:
+        progress.update({kf_id: int(value)
+                         for kf_id, value in zip(kf_ids, values)
+                         if value is not None})
+    return progress
+
+
+def rendered_tasks(data):
+    """
+    Find the rendered tasks in response data, wherever they are nested,
+    such as in a page of releases or in events with their tasks expanded
+    """
+    if isinstance(data, dict):
+        if str(data.get('kf_id', '')).startswith('TA_'):
+            yield data
+        else:
+            for value in data.values():
+                yield from rendered_tasks(value)
+    elif isinstance(data, list):
+        for item in data:
+            yield from rendered_tasks(item)
+
+
+def overlay(tasks):
+    """
+    Replace the progress of rendered tasks with any buffered progress
+    """
+    tasks = [t for t in tasks if 'kf_id' in t and 'progress' in t]
+    progress = pending(t['kf_id'] for t in tasks)
+    for task in tasks:
+        task['progress'] = progress.get(task['kf_id'], task['progress'])
+
+
+def version():
+    """ Changes whenever progress is reported """
+    try:
+        return int(django_rq.get_connection().get(VERSION_KEY) or 0)
+    except RedisError:
+        return 0
+
+
+def flush():
+    """
+    Write all buffered progress to the database in a single update
+
+    Tasks saved since the progress was taken from the buffer, such as by a
+    change of state written through, already have newer progress and are
+    left as they are.
+
+    :returns: The number of tasks whose buffered progress was flushed
+    """
+    conn = django_rq.get_connection()
+    lock = uuid.uuid4().hex
+    if not conn.set(LOCK_KEY, lock, ex=LOCK_TIMEOUT, nx=True):
+        return 0
+    try:
+        # Progress left by a flush that failed is written first
+        if not conn.exists(FLUSHING_KEY):
+            snapshot = timezone.now()
+            try:
+                conn.rename(KEY, FLUSHING_KEY)
+            except ResponseError:
+                # Nothing has been reported
+                return 0
+            conn.set(SNAPSHOT_KEY, snapshot.timestamp())
+        else:
+            stored = conn.get(SNAPSHOT_KEY)
+            snapshot = (datetime.fromtimestamp(float(stored), tz.utc)
+                        if stored is not None else timezone.now())
+
+        progress = {kf_id.decode(): int(value) for kf_id, value
+                    in conn.hgetall(FLUSHING_KEY).items()}
+        if progress:
+            with transaction.atomic():
+                tasks = Task.objects.filter(kf_id__in=list(progress))
+                (tasks.filter(updated_at__lt=snapshot).update(
+                    progress=Case(*[When(kf_id=kf_id, then=Value(value))
+                                    for kf_id, value in progress.items()],
+                                  output_field=IntegerField()),
+                    updated_at=timezone.now()))
+                releases = (tasks.order_by()
+                                 .values_list('release_id', flat=True)
+                                 .distinct())
+                touch_releases(*releases)
+        conn.delete(FLUSHING_KEY, SNAPSHOT_KEY)
+        return len(progress)
+    finally:
+        cache.unlock(conn, LOCK_KEY, lock)
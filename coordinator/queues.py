@@ -0,0 +1,36 @@
+import django_rq
+from django.conf import settings
+
+
+def queue_for(func):
+    """ :returns: The name of the queue that a job is routed to """
+    return settings.JOB_QUEUES.get(func.__name__, 'default')
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Queue a job on the queue it is routed to by `settings.JOB_QUEUES`
+
+    Ex:
+    enqueue(cancel_release, release.kf_id, True)
+    """
+    return django_rq.get_queue(queue_for(func)).enqueue(func, *args, **kwargs)
+
+
+def worker_config(pools):
+    """
+    :param pools: The worker pools, as in `settings.WORKER_POOLS`
+    :returns: Supervisor programs running the workers of each pool
+    """
+    programs = []
+    for name, pool in pools.items():
+        if not pool['workers']:
+            continue
+        programs.append(
+            f'[program:rqworker_{name}]\n'
+            f'process_name=%(program_name)s_%(process_num)02d\n'
+            f'numprocs={pool["workers"]}\n'
+            f'command=python manage.py rqworker {" ".join(pool["queues"])}\n'
+            f'stderr_logfile=/dev/stdout\n'
+            f'stderr_logfile_maxbytes=0\n')
+    return '\n'.join(programs)
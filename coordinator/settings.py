@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/2.0/ref/settings/
 
 import os
 import uuid
+from collections import OrderedDict
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -51,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'coordinator.middleware.MetricsMiddleware',
+    'coordinator.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -105,6 +108,11 @@ REST_FRAMEWORK = {
 WSGI_APPLICATION = 'coordinator.wsgi.application'
 
 
+# Secrets for the database, redis, and ego, if they are stored in vault
+from coordinator.vault import load_secrets
+VAULT_SECRETS = load_secrets()
+
+
 # Database
 # https://docs.djangoproject.com/en/2.0/ref/settings/#databases
 
@@ -120,21 +128,13 @@ def get_databases():
             'PORT': os.environ.get('PG_PORT', '5432'),
         }
     }
-    vault_url = os.environ.get('VAULT_URL', None)
-    vault_role = os.environ.get('VAULT_ROLE', None)
-    pg_secret = os.environ.get('PG_SECRET', None)
-    # Default to the above config if the required vault vars are not present
-    if not vault_url or not vault_role or not pg_secret:
+    pg_secrets = VAULT_SECRETS.get('database')
+    # Default to the above config if the secret is not in vault
+    if pg_secrets is None:
         return db
 
-    import hvac
-    client = hvac.Client(url=vault_url)
-    client.auth_iam(vault_role)
-    pg_secrets = client.read(pg_secret)
-    client.logout()
-
-    db['default']['USER'] = pg_secrets['data']['user']
-    db['default']['PASSWORD'] = pg_secrets['data']['password']
+    db['default']['USER'] = pg_secrets['user']
+    db['default']['PASSWORD'] = pg_secrets['password']
 
     return db
 
@@ -143,41 +143,85 @@ DATABASES = get_databases()
 
 
 # Redis
+# Job queues in order of priority. A worker listening to several queues
+# takes jobs from the first that has any.
+QUEUES = ['lifecycle', 'polling', 'health_checks', 'notifications',
+          'default']
+
+
 def get_queues():
     """ Will try to load from vault or default to environmet """
-    rq = {
-        'default': {
-            'HOST': os.environ.get('REDIS_HOST', 'localhost'),
-            'PORT': os.environ.get('REDIS_PORT', 6379),
-            'DB': 0,
-            'DEFAULT_TIMEOUT': 30,
-        },
-        'health_checks': {
-            'HOST': os.environ.get('REDIS_HOST', 'localhost'),
-            'PORT': os.environ.get('REDIS_PORT', 6379),
-            'DB': 0,
-            'DEFAULT_TIMEOUT': 30,
-        },
+    queue = {
+        'HOST': os.environ.get('REDIS_HOST', 'localhost'),
+        'PORT': os.environ.get('REDIS_PORT', 6379),
+        'DB': 0,
+        'DEFAULT_TIMEOUT': 30,
     }
-    vault_url = os.environ.get('VAULT_URL', None)
-    vault_role = os.environ.get('VAULT_ROLE', None)
-    redis_secret = os.environ.get('REDIS_SECRET', None)
-    # Default to the above config if the required vault vars are not present
-    if not vault_url or not vault_role or not redis_secret:
-        return rq
+    redis_secrets = VAULT_SECRETS.get('redis')
+    # Default to the above config if the secret is not in vault
+    if redis_secrets is not None:
+        queue['PASSWORD'] = redis_secrets['password']
 
-    import hvac
-    client = hvac.Client(url=vault_url)
-    client.auth_iam(vault_role)
-    redis_secrets = client.read(redis_secret)
-    client.logout()
+    return OrderedDict((name, dict(queue)) for name in QUEUES)
 
-    rq['default']['PASSWORD'] = redis_secrets['data']['password']
 
-    return rq
+RQ_QUEUES = get_queues()
 
+# The queue each job is sent to by `coordinator.queues.enqueue`. Jobs that
+# are not listed go to `default`.
+JOB_QUEUES = {
+    'init_release': 'lifecycle',
+    'init_task': 'lifecycle',
+    'start_release': 'lifecycle',
+    'publish_release': 'lifecycle',
+    'cancel_release': 'lifecycle',
+    'status_check': 'polling',
+    'release_status_check': 'polling',
+    'health_check': 'health_checks',
+}
 
-RQ_QUEUES = get_queues()
+# Pools of rq workers run by supervisor, see `manage.py worker_config`.
+# Lifecycle actions have workers of their own and are taken first by the
+# polling workers, so a burst of polls never holds up a release. Events
+# are published to SNS as they are saved, so no jobs are sent to the
+# notifications queue yet and it has no workers by default.
+WORKER_POOLS = OrderedDict([
+    ('lifecycle', {
+        'queues': ['lifecycle'],
+        'workers': int(os.environ.get('LIFECYCLE_WORKERS', 2)),
+    }),
+    ('polling', {
+        'queues': ['lifecycle', 'polling', 'default'],
+        'workers': int(os.environ.get('POLLING_WORKERS', 2)),
+    }),
+    ('health', {
+        'queues': ['health_checks'],
+        'workers': int(os.environ.get('HEALTH_WORKERS', 1)),
+    }),
+    ('notifications', {
+        'queues': ['notifications'],
+        'workers': int(os.environ.get('NOTIFICATION_WORKERS', 0)),
+    }),
+])
+
+RQ = {
+    # Load the modules used by jobs before forking for each job
+    'WORKER_CLASS': 'coordinator.worker.PreloadWorker',
+}
+
+# Seconds to keep rendered release documents in redis, 0 disables caching
+RELEASE_CACHE_TIMEOUT = int(os.environ.get('RELEASE_CACHE_TIMEOUT', 3600))
+
+# Buffer task progress reports in redis and write them to the database in
+# batches with `manage.py flush_progress`
+PROGRESS_WRITE_BEHIND = (os.environ.get('PROGRESS_WRITE_BEHIND', 'true')
+                         .lower() == 'true')
+
+# Time the queries and phases of each request, returning them in a
+# Server-Timing header and logging requests slower than SLOW_REQUEST_MS
+REQUEST_TIMING = (os.environ.get('REQUEST_TIMING', 'false')
+                  .lower() == 'true')
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
 
 
 # EGO oauth creds
@@ -189,21 +233,13 @@ def get_ego_secrets():
             'SECRET': os.environ.get('EGO_SECRET', None),
         }
     }
-    vault_url = os.environ.get('VAULT_URL', None)
-    vault_role = os.environ.get('VAULT_ROLE', None)
-    ego_secret = os.environ.get('EGO_SECRET', None)
-    # Default to the above config if the required vault vars are not present
-    if not vault_url or not vault_role or not ego_secret:
+    ego_secrets = VAULT_SECRETS.get('ego')
+    # Default to the above config if the secret is not in vault
+    if ego_secrets is None:
         return ego
 
-    import hvac
-    client = hvac.Client(url=vault_url)
-    client.auth_iam(vault_role)
-    ego_secrets = client.read(ego_secret)
-    client.logout()
-
-    ego['default']['CLIENT_ID'] = ego_secrets['data']['client_id']
-    ego['default']['SECRET'] = ego_secrets['data']['client_secret']
+    ego['default']['CLIENT_ID'] = ego_secrets['client_id']
+    ego['default']['SECRET'] = ego_secrets['client_secret']
 
     return ego
 
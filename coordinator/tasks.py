@@ -1,13 +1,25 @@
 import django_rq
-import requests
 import logging
+from rq import get_current_job
 from django.conf import settings
-from coordinator.api.models import Task, TaskService, Release
+from django.db import transaction
+from django.db.models import BooleanField, Case, CharField, Value, When
+from django.utils import timezone
+from coordinator.api.models import (Task, TaskService, Release, Study,
+                                    StudySync, ReleaseStat)
+from coordinator.metrics import service_request
+from coordinator.queues import enqueue
+from coordinator.utils import lazy_import
+
+requests = lazy_import('requests')
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Seconds a study sync may run for, which must be given when it is queued
+SYNC_TIMEOUT = 3600
+
 
 @django_rq.job
 def health_check(task_service_id):
@@ -72,10 +84,10 @@ def init_release(release_id):
         task = Task(task_service=service, release=release)
         task.save()
 
-        django_rq.enqueue(init_task,
-                          release.kf_id,
-                          service.kf_id,
-                          task.kf_id)
+        enqueue(init_task,
+                release.kf_id,
+                service.kf_id,
+                task.kf_id)
 
 
 @django_rq.job
@@ -95,10 +107,11 @@ def init_task(release_id, task_service_id, task_id):
     failed = False
     resp = None
     try:
-        resp = requests.post(service.url+'/tasks',
-                             headers=settings.EGO_JWT.header,
-                             json=body,
-                             timeout=settings.REQUEST_TIMEOUT)
+        with service_request(service.kf_id, 'initialize'):
+            resp = requests.post(service.url+'/tasks',
+                                 headers=settings.EGO_JWT.header,
+                                 json=body,
+                                 timeout=settings.REQUEST_TIMEOUT)
     except requests.exceptions.RequestException:
         failed = True
         logger.error(f'problem requesting task for init: {resp.content}')
@@ -112,7 +125,7 @@ def init_task(release_id, task_service_id, task_id):
         release.save()
         task.reject()
         task.save()
-        django_rq.enqueue(cancel_release, release.kf_id, True)
+        enqueue(cancel_release, release.kf_id, True)
         return
     else:
         task.initialize()
@@ -120,7 +133,7 @@ def init_task(release_id, task_service_id, task_id):
 
     # Check if we're ready to start running tasks
     if all([t.state == 'initialized' for t in release.tasks.all()]):
-        django_rq.enqueue(start_release, release_id)
+        enqueue(start_release, release_id)
 
 
 @django_rq.job
@@ -142,11 +155,12 @@ def start_release(release_id):
         failed = False
         resp = None
         try:
-            resp = requests.post(task.task_service.url+'/tasks',
-                                 headers=settings.EGO_JWT.header,
-                                 json=body,
-                                 timeout=settings.REQUEST_TIMEOUT)
-            resp.raise_for_status()
+            with service_request(task.task_service_id, 'start'):
+                resp = requests.post(task.task_service.url+'/tasks',
+                                     headers=settings.EGO_JWT.header,
+                                     json=body,
+                                     timeout=settings.REQUEST_TIMEOUT)
+                resp.raise_for_status()
         except requests.exceptions.RequestException:
             logger.error(f'problem requesting task for start: {resp.content}')
             failed = True
@@ -168,7 +182,7 @@ def start_release(release_id):
             release.save()
             task.failed()
             task.save()
-            django_rq.enqueue(cancel_release, release_id, True)
+            enqueue(cancel_release, release_id, True)
             break
         else:
             task.start()
@@ -200,11 +214,12 @@ def publish_release(release_id):
         failed = False
         resp = None
         try:
-            resp = requests.post(task.task_service.url+'/tasks',
-                                 headers=settings.EGO_JWT.header,
-                                 json=body,
-                                 timeout=settings.REQUEST_TIMEOUT)
-            resp.raise_for_status()
+            with service_request(task.task_service_id, 'publish'):
+                resp = requests.post(task.task_service.url+'/tasks',
+                                     headers=settings.EGO_JWT.header,
+                                     json=body,
+                                     timeout=settings.REQUEST_TIMEOUT)
+                resp.raise_for_status()
         except requests.exceptions.RequestException:
             logger.error(f'problem requesting task for publish: ' +
                          f'{resp.content}')
@@ -227,7 +242,7 @@ def publish_release(release_id):
             release.save()
             task.failed()
             task.save()
-            django_rq.enqueue(cancel_release, release.kf_id, True)
+            enqueue(cancel_release, release.kf_id, True)
             break
 
         task.publish()
@@ -253,10 +268,11 @@ def cancel_release(release_id, fail=False):
             'release_id': release.kf_id
         }
         try:
-            requests.post(task.task_service.url+'/tasks',
-                          headers=settings.EGO_JWT.header,
-                          json=body,
-                          timeout=settings.REQUEST_TIMEOUT)
+            with service_request(task.task_service_id, 'cancel'):
+                requests.post(task.task_service.url+'/tasks',
+                              headers=settings.EGO_JWT.header,
+                              json=body,
+                              timeout=settings.REQUEST_TIMEOUT)
         except requests.exceptions.RequestException:
             pass
 
@@ -268,3 +284,179 @@ def cancel_release(release_id, fail=False):
     else:
         release.canceled()
     release.save()
+
+
+class SyncError(Exception):
+    pass
+
+
+def study_pages(previous=None):
+    """
+    Fetch studies from the dataservice a page at a time, following its
+    pagination to the end
+
+    Pages are requested conditionally using the validators that were
+    returned for them in the last sync so that the dataservice may skip
+    sending pages that have not changed.
+
+    :param previous: The pages recorded by the last successful sync
+    :returns: A generator of (url, record, content) for each page, where
+        content is None if the page was not modified since the last sync
+    :raises: SyncError if the dataservice returns an error
+    """
+    previous = previous or {}
+    url = '/studies?limit=100'
+    visited = set()
+    while url and url not in visited:
+        visited.add(url)
+        last = previous.get(url, {})
+        headers = {}
+        if last.get('etag'):
+            headers['If-None-Match'] = last['etag']
+        if last.get('last_modified'):
+            headers['If-Modified-Since'] = last['last_modified']
+
+        resp = requests.get(settings.DATASERVICE_URL+url, headers=headers,
+                            timeout=settings.REQUEST_TIMEOUT)
+        if resp.status_code == 304 and last:
+            yield url, last, None
+            url = last.get('next')
+            continue
+
+        if resp.status_code != 200:
+            message = 'There was an error getting studies from the dataservice'
+            try:
+                if resp.json() and 'message' in resp.json():
+                    message = resp.json()['message']
+            except (TypeError, ValueError):
+                pass
+            raise SyncError(message)
+
+        content = resp.json()
+        record = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'studies': [s['kf_id'] for s in content['results']],
+            'next': content.get('_links', {}).get('next'),
+        }
+        yield url, record, content
+        url = record['next']
+
+
+def apply_studies(studies):
+    """
+    Create new studies and update changed ones from a page of dataservice
+    studies in a constant number of queries
+
+    Studies are compared by the hash of their synchronized fields so that
+    only those whose name or visibility changed, or that had been deleted
+    and are back in the dataservice, are written.
+
+    :returns: The number of new and updated studies
+    """
+    hashes = {s['kf_id']: Study.content_hash(s['name'], s['visible'])
+              for s in studies}
+    existing = {kf_id: (sync_hash, deleted) for kf_id, sync_hash, deleted
+                in Study.objects.filter(kf_id__in=list(hashes))
+                                .values_list('kf_id', 'sync_hash', 'deleted')}
+
+    new = [Study(kf_id=s['kf_id'], name=s['name'], visible=s['visible'],
+                 created_at=s['created_at'], sync_hash=hashes[s['kf_id']])
+           for s in studies if s['kf_id'] not in existing]
+    changed = [s for s in studies if s['kf_id'] in existing and
+               existing[s['kf_id']] != (hashes[s['kf_id']], False)]
+
+    Study.objects.bulk_create(new)
+    if changed:
+        # Update every changed study in one statement
+        def case(value, output_field):
+            return Case(*[When(kf_id=s['kf_id'], then=Value(value(s)))
+                          for s in changed],
+                        output_field=output_field)
+
+        (Study.objects.filter(kf_id__in=[s['kf_id'] for s in changed])
+                      .update(name=case(lambda s: s['name'], CharField()),
+                              visible=case(lambda s: s['visible'],
+                                           BooleanField()),
+                              sync_hash=case(lambda s: hashes[s['kf_id']],
+                                             CharField()),
+                              deleted=False,
+                              updated_at=timezone.now()))
+    return len(new), len(changed)
+
+
+@django_rq.job('default', timeout=SYNC_TIMEOUT)
+def sync_studies():
+    """
+    Synchronize studies with the dataservice
+
+    Each page of studies is applied as it is fetched, skipping pages that
+    have not changed since the last successful sync, then any studies the
+    dataservice no longer has are marked as deleted. Progress is reported in
+    the job's meta and the outcome is recorded as a StudySync.
+
+    :returns: The counts of studies synchronized
+    """
+    job = get_current_job()
+    last = StudySync.last_success()
+    sync = StudySync.objects.create(job=job.id if job else None)
+    progress = {'sync': sync.id, 'pages': 0, 'unchanged_pages': 0,
+                'studies': 0, 'total': None,
+                'new': 0, 'updated': 0, 'deleted': 0}
+    pages = {}
+    seen = set()
+
+    def report():
+        if job:
+            job.meta['progress'] = progress
+            job.save_meta()
+
+    try:
+        for url, record, content in study_pages(last.pages if last else None):
+            pages[url] = record
+            seen.update(record['studies'])
+            progress['pages'] += 1
+            progress['studies'] += len(record['studies'])
+
+            if content is None:
+                progress['unchanged_pages'] += 1
+            else:
+                with transaction.atomic():
+                    new, updated = apply_studies(content['results'])
+                progress['total'] = content.get('total', progress['total'])
+                progress['new'] += new
+                progress['updated'] += updated
+            report()
+
+        # Check if any studies were deleted from the dataservice
+        progress['deleted'] = (Study.objects.filter(deleted=False)
+                                            .exclude(kf_id__in=seen)
+                                            .update(deleted=True,
+                                                    updated_at=timezone.now()))
+    except Exception as err:
+        logger.error(f'Problem syncing studies: {err}')
+        if job:
+            job.meta['message'] = str(err)
+        report()
+        sync.state = 'failed'
+        sync.message = str(err)
+        sync.finished_at = timezone.now()
+        sync.save()
+        raise
+
+    report()
+    for field in ['studies', 'new', 'updated', 'deleted', 'unchanged_pages']:
+        setattr(sync, field, progress[field])
+    sync.pages = pages
+    sync.state = 'succeeded'
+    sync.finished_at = timezone.now()
+    sync.save()
+    return progress
+
+
+@django_rq.job
+def refresh_release_stats():
+    """
+    Recompute release statistics
+    """
+    ReleaseStat.refresh()
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from coordinator.api.models import Event
+
+
+# The phases of a release, in order
+PHASES = ['initializing', 'running', 'staged', 'publishing']
+# The states a task enters to begin and end each phase. Tasks begin
+# initializing when their release does.
+TASK_PHASES = {
+    'initializing': (None, 'initialized'),
+    'running': ('running', 'staged'),
+    'staged': ('staged', 'publishing'),
+    'publishing': ('publishing', 'published'),
+}
+# Phases that wait on the release's tasks. A staged release waits on a
+# user to publish it instead.
+TASK_BOUND_PHASES = ['initializing', 'running', 'publishing']
+# A release's timeline will not change once it is in one of these states
+TERMINAL_STATES = ['published', 'canceled', 'failed']
+
+
+def _span(phase, start, end):
+    return {
+        'phase': phase,
+        'started_at': start.isoformat() if start else None,
+        'finished_at': end.isoformat() if end else None,
+        'duration': (end - start).total_seconds() if start and end else None,
+    }
+
+
+def release_timeline(release):
+    """
+    Build the timeline of a release from the events recorded for each
+    change of state of it and its tasks.
+
+    Each phase of the release is given the time it started and finished and
+    the task that it waited on last, which is the release's critical path.
+
+    :param release: A dict with the release's `kf_id`, `state`, and
+        `created_at`
+    :returns: The timeline as json-able data
+    """
+    entered = {}
+    left = {}
+    tasks = OrderedDict()
+    events = (Event.objects.filter(release_id=release['kf_id'],
+                                   to_state__isnull=False)
+                           .order_by('created_at')
+                           .values_list('created_at', 'from_state',
+                                        'to_state', 'task_id',
+                                        'task_service_id',
+                                        'task_service__name'))
+    for created_at, source, target, task_id, service_id, name in events:
+        if task_id is None:
+            left.setdefault(source, created_at)
+            entered.setdefault(target, created_at)
+            continue
+
+        task = tasks.setdefault(task_id, {
+            'kf_id': task_id,
+            'task_service': service_id,
+            'name': name,
+            'entered': {},
+        })
+        task['entered'].setdefault(target, created_at)
+
+    phases = []
+    for phase in PHASES:
+        span = _span(phase, entered.get(phase), left.get(phase))
+        span['critical_task'] = None
+        span['critical_service'] = None
+        phases.append(span)
+
+    # When each task finished each phase
+    ends = {}
+    for kf_id, task in tasks.items():
+        task['phases'] = []
+        ends[kf_id] = []
+        for phase in PHASES:
+            start, end = TASK_PHASES[phase]
+            start = (task['entered'].get(start) if start
+                     else entered.get(phase))
+            end = task['entered'].get(end)
+            span = _span(phase, start, end)
+            span['critical'] = False
+            task['phases'].append(span)
+            ends[kf_id].append(end)
+        del task['entered']
+
+    # The task to finish a phase last is the one the release waited on
+    critical_path = []
+    for i, span in enumerate(phases):
+        if span['phase'] not in TASK_BOUND_PHASES:
+            continue
+        finished = [k for k in tasks if ends[k][i]]
+        if not finished:
+            continue
+        task = tasks[max(finished, key=lambda k: ends[k][i])]
+        task['phases'][i]['critical'] = True
+        span['critical_task'] = task['kf_id']
+        span['critical_service'] = task['task_service']
+        critical_path.append({
+            'phase': span['phase'],
+            'task': task['kf_id'],
+            'task_service': task['task_service'],
+            'name': task['name'],
+            'duration': task['phases'][i]['duration'],
+        })
+
+    finished_at = min([entered[s] for s in TERMINAL_STATES if s in entered],
+                      default=None)
+    timeline = _span(None, release['created_at'], finished_at)
+    del timeline['phase']
+    timeline.update({
+        'kf_id': release['kf_id'],
+        'state': release['state'],
+        'phases': phases,
+        'tasks': list(tasks.values()),
+        'critical_path': critical_path,
+    })
+    return timeline
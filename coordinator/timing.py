@@ -0,0 +1,117 @@
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# How many of a slow request's queries to log
+SLOW_QUERIES = 5
+
+
+class RequestTimer:
+    """
+    Times the phases of a request and each query it makes
+
+    A phase started again while it is running, such as by a nested
+    serializer, is timed once from its outermost start to its outermost
+    stop.
+    """
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self.started = {}
+        self.depth = {}
+        self.queries = []
+
+    def start(self, name):
+        self.depth[name] = self.depth.get(name, 0) + 1
+        if self.depth[name] == 1:
+            self.started[name] = time.monotonic()
+
+    def stop(self, name):
+        depth = self.depth.pop(name, 0)
+        if depth > 1:
+            self.depth[name] = depth - 1
+            return
+        started = self.started.pop(name, None)
+        if started is not None:
+            self.phases[name] = (self.phases.get(name, 0) +
+                                 time.monotonic() - started)
+
+    @contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def query(self, execute, sql, params, many, context):
+        """ A database execute wrapper that times each query """
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.monotonic() - started, sql))
+
+    def finish(self):
+        """ Stop any phases left running, such as by an exception """
+        for name in list(self.started):
+            self.depth.pop(name, None)
+            self.stop(name)
+
+    @property
+    def db(self):
+        return sum(duration for duration, _ in self.queries)
+
+    def header(self):
+        """ :returns: The phases as a `Server-Timing` header """
+        metrics = [f'db;dur={self.db * 1000:.1f};'
+                   f'desc="{len(self.queries)} queries"']
+        metrics += [f'{name};dur={duration * 1000:.1f}'
+                    for name, duration in self.phases.items()]
+        return ', '.join(metrics)
+
+    def slowest(self, count=SLOW_QUERIES):
+        return sorted(self.queries, key=lambda q: q[0], reverse=True)[:count]
+
+
+def request_timer(request):
+    """ :returns: The request's timer, or None if it is not being timed """
+    timer = getattr(request, 'timer', None)
+    return timer if isinstance(timer, RequestTimer) else None
+
+
+@contextmanager
+def phase(request, name):
+    """
+    Time part of handling a request if the request is being timed
+
+    Ex:
+    with phase(request, 'auth'):
+        verify(token)
+    """
+    timer = request_timer(request)
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+def log_slow(request, response, timer, threshold):
+    """
+    Log a request that took longer than the threshold along with the
+    queries that took longest
+    """
+    total = timer.phases.get('total', 0)
+    if total * 1000 < threshold:
+        return
+    queries = ''.join(f'\n  {duration * 1000:.1f}ms {sql}'
+                      for duration, sql in timer.slowest())
+    logger.warning(f'slow request {request.method} {request.path} '
+                   f'{response.status_code} took {total * 1000:.1f}ms, '
+                   f'{len(timer.queries)} queries took '
+                   f'{timer.db * 1000:.1f}ms{queries}')
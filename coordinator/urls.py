@@ -1,27 +1,46 @@
 import os
+import functools
 from django.conf.urls import url, include
 from rest_framework import routers
 from rest_framework_nested import routers
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from coordinator.api import views
 
 
-dir_path = os.path.dirname(os.path.realpath(__file__))
-with open(os.path.join(dir_path, 'README.md'), 'r') as f:
-    description = f.read()
+@functools.lru_cache()
+def get_schema_view():
+    """
+    Build the schema view on the first request for the docs rather than
+    when the urls are loaded
+    """
+    from drf_yasg.views import get_schema_view
+    from drf_yasg import openapi
+    from coordinator.api.schema import SwaggerSchema
 
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    with open(os.path.join(dir_path, 'README.md'), 'r') as f:
+        description = f.read()
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Release Coordinator API",
-      default_version='1.4.0',
-      description=description,
-      license=openapi.License(name="Apache 2.0"),
-   ),
-   generator_class=views.SwaggerSchema,
-   public=True,
-)
+    return get_schema_view(
+       openapi.Info(
+          title="Release Coordinator API",
+          default_version='1.4.0',
+          description=description,
+          license=openapi.License(name="Apache 2.0"),
+       ),
+       generator_class=SwaggerSchema,
+       public=True,
+    )
+
+
+def schema_view(renderer, *args, **kwargs):
+    """ Returns a view that renders the schema with the given renderer """
+    @functools.lru_cache()
+    def get_view():
+        return getattr(get_schema_view(), renderer)(*args, **kwargs)
+
+    def view(request, *view_args, **view_kwargs):
+        return get_view()(request, *view_args, **view_kwargs)
+    return view
 
 
 router = routers.DefaultRouter(trailing_slash=False)
@@ -42,10 +61,11 @@ urlpatterns = [
     url(r'^', include(router.urls)),
     url(r'^', include(study_router.urls)),
     url(r'^django-rq/', include('django_rq.urls')),
+    url(r'^metrics$', views.metrics_view, name='metrics'),
     url(r'^swagger(?P<format>\.json|\.yaml)$',
-        schema_view.without_ui(cache_timeout=None), name='schema-json'),
-    url(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=None),
+        schema_view('without_ui', cache_timeout=None), name='schema-json'),
+    url(r'^swagger/$', schema_view('with_ui', 'swagger', cache_timeout=None),
         name='schema-swagger-ui'),
-    url(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=None),
+    url(r'^redoc/$', schema_view('with_ui', 'redoc', cache_timeout=None),
         name='schema-redoc'),
 ]
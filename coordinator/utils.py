@@ -1,7 +1,112 @@
-import random
+import os
+import importlib
+import threading
+import types
 import base32_crockford as b32
 
 
+# The sequence kf_ids are drawn from and the number of ids a process takes
+# from it at a time. The sequence increments by the block size.
+KF_ID_SEQUENCE = 'coordinator_kf_id_seq'
+KF_ID_BLOCK_SIZE = 100
+# kf_ids are 8 base 32 characters, or 40 bits
+KF_ID_SPACE = 32**8
+# Multiplying by an odd number modulo a power of two is a permutation, so
+# sequential numbers map to distinct ids that don't look sequential
+KF_ID_MULTIPLIER = 0x5DEECE66D
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stands in for a module until one of its attributes is used, at which
+    point the module is imported.
+
+    Attributes set on the stand-in, such as by `mock.patch`, take precedence
+    over the module's own.
+    """
+
+    def __getattr__(self, name):
+        # Only called for attributes not set on the stand-in itself
+        return getattr(importlib.import_module(self.__name__), name)
+
+
+def lazy_import(name):
+    """
+    Defer importing a heavy module until it is first used
+    Ex:
+    boto3 = lazy_import('boto3')
+    """
+    return LazyModule(name)
+
+
+class KFIdBlocks:
+    """
+    Hands out unique numbers for kf_ids from blocks reserved from a database
+    sequence so that only one query is made per block of ids.
+
+    A block is only used by the process that reserved it. A forked process
+    reserves its own.
+    """
+
+    def __init__(self, block_size=KF_ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.pid = None
+        self.next = 0
+        self.end = 0
+
+    def take(self, count=1):
+        """
+        :returns: A list of count unique numbers
+        """
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.next = self.end = 0
+
+            numbers = list(range(self.next, min(self.end,
+                                                self.next + count)))
+            missing = count - len(numbers)
+            if missing > 0:
+                blocks = self.reserve(-(-missing // self.block_size))
+                numbers.extend(n for start in blocks
+                               for n in range(start, start + self.block_size))
+                self.next = numbers[count - 1] + 1
+                self.end = blocks[-1] + self.block_size
+                numbers = numbers[:count]
+            else:
+                self.next += count
+            return numbers
+
+    def reserve(self, blocks):
+        """ Reserve the start of one or more blocks from the sequence """
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT nextval('{KF_ID_SEQUENCE}') "
+                           "FROM generate_series(1, %s)", [blocks])
+            return [row[0] for row in cursor.fetchall()]
+
+
+KF_ID_BLOCKS = KFIdBlocks()
+
+
+def encode_kf_id(prefix, number):
+    """
+    Encode a unique number as a kf_id, scattering sequential numbers across
+    the id space
+    """
+    number = (number * KF_ID_MULTIPLIER) % KF_ID_SPACE
+    return '{0}_{1:0>8}'.format(prefix, b32.encode(number))
+
+
+def kf_ids(prefix, count):
+    """
+    Generate many kf_ids at once, such as for a bulk insert
+    """
+    prefix = prefix.upper()
+    return [encode_kf_id(prefix, n) for n in KF_ID_BLOCKS.take(count)]
+
+
 def kf_id_generator(prefix):
     """
     Returns a function to generator
@@ -14,12 +119,14 @@ def kf_id_generator(prefix):
     'SA_D167JSHP'
     'DM_ZZZZZZZZ'
     'ST_00000000'
+
+    The numbers are drawn from a database sequence so that no two ids are
+    ever the same.
     """
     assert len(prefix) == 2, 'Prefix must be two characters'
     prefix = prefix.upper()
 
     def generator():
-        return '{0}_{1:0>8}'.format(prefix,
-                                    b32.encode(random.randint(0, 32**8-1)))
+        return kf_ids(prefix, 1)[0]
 
     return generator
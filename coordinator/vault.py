@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import fcntl
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# Environment variables holding the vault path of each secret
+SECRET_PATHS = {
+    'database': 'PG_SECRET',
+    'redis': 'REDIS_SECRET',
+    'ego': 'EGO_SECRET',
+}
+# The cache should be on tmpfs so that secrets never reach disk
+CACHE_PATH = os.environ.get('VAULT_CACHE_PATH',
+                            '/dev/shm/coordinator-secrets.json')
+CACHE_TTL = int(os.environ.get('VAULT_CACHE_TTL', 300))
+
+
+def configured_paths():
+    """
+    Get the vault paths of the secrets that are configured
+
+    :returns: A dict of secret names to vault paths, empty if vault is not
+        configured
+    """
+    if not os.environ.get('VAULT_URL') or not os.environ.get('VAULT_ROLE'):
+        return {}
+    paths = {name: os.environ.get(var) for name, var in SECRET_PATHS.items()}
+    return {name: path for name, path in paths.items() if path}
+
+
+def load_secrets(paths=None, use_cache=True):
+    """
+    Load secrets from vault.
+
+    Secrets are read from the local cache if it is current. Otherwise one
+    process logs in to vault once and reads every secret concurrently while
+    any others starting at the same time wait to read its results from the
+    cache.
+
+    :param paths: A dict of secret names to vault paths, defaults to those
+        in the environment
+    :param use_cache: Whether to use the local cache
+    :returns: A dict of secret names to the secret's data
+    """
+    paths = configured_paths() if paths is None else paths
+    if not paths:
+        return {}
+    if not use_cache:
+        return read_vault(paths)
+
+    secrets = read_cache(paths)
+    if secrets is not None:
+        return secrets
+
+    try:
+        lock = open(CACHE_PATH + '.lock', 'a')
+    except OSError as err:
+        logger.warning(f'Could not cache secrets in {CACHE_PATH}: {err}')
+        return read_vault(paths)
+
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # Another process may have loaded the secrets while we waited
+        secrets = read_cache(paths)
+        if secrets is None:
+            secrets = read_vault(paths)
+            write_cache(paths, secrets)
+    return secrets
+
+
+def read_vault(paths):
+    """ Log in to vault once and read all the secrets at the same time """
+    import hvac
+    client = hvac.Client(url=os.environ.get('VAULT_URL'))
+    client.auth_iam(os.environ.get('VAULT_ROLE'))
+    try:
+        with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+            reads = {name: executor.submit(client.read, path)
+                     for name, path in paths.items()}
+            return {name: read.result()['data']
+                    for name, read in reads.items()}
+    finally:
+        client.logout()
+
+
+def read_cache(paths):
+    """
+    :returns: The cached secrets if they are current and for the same paths,
+        otherwise None
+    """
+    try:
+        with open(CACHE_PATH) as f:
+            stat = os.fstat(f.fileno())
+            # Don't trust a cache that someone else could have written
+            if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+                return None
+            if time.time() - stat.st_mtime > CACHE_TTL:
+                return None
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('paths') != paths:
+        return None
+    return cached['secrets']
+
+
+def write_cache(paths, secrets):
+    """ Write the secrets to a file only readable by the current user """
+    tmp = f'{CACHE_PATH}.{os.getpid()}'
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'paths': paths, 'secrets': secrets}, f)
+        os.replace(tmp, CACHE_PATH)
+    except OSError as err:
+        logger.warning(f'Could not cache secrets in {CACHE_PATH}: {err}')
+
+
+def clear_cache():
+    try:
+        os.remove(CACHE_PATH)
+    except FileNotFoundError:
+        pass
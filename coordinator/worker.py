@@ -0,0 +1,30 @@
+import time
+import importlib
+from rq import Worker
+from coordinator.metrics import JOB_RUNTIME
+
+
+class PreloadWorker(Worker):
+    """
+    Imports the modules that jobs use before the worker starts forking so
+    that each job does not import them again
+    """
+    preload = ('requests', 'boto3', 'coordinator.tasks')
+
+    def work(self, *args, **kwargs):
+        for name in self.preload:
+            importlib.import_module(name)
+        return super(PreloadWorker, self).work(*args, **kwargs)
+
+    def execute_job(self, job, queue):
+        """
+        Time each job from the worker rather than the forked work horse so
+        that metrics are kept by one long lived process
+        """
+        started = time.monotonic()
+        try:
+            return super(PreloadWorker, self).execute_job(job, queue)
+        finally:
+            status = job.get_status() or 'expired'
+            (JOB_RUNTIME.labels(queue.name, job.func_name, status)
+                        .observe(time.monotonic() - started))
@@ -0,0 +1,37 @@
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from coordinator.api.models import (Release, ReleaseNote, Study, Task,
+                                    TaskService)
+
+
+@pytest.fixture
+def api_request():
+    """ A read request for serializers to build links with """
+    return Request(APIRequestFactory().get('/'))
+
+
+@pytest.fixture
+def studies_500(db):
+    studies = [Study(kf_id=f'SD_{i:08d}', name=f'Study {i}', visible=True)
+               for i in range(500)]
+    Study.objects.bulk_create(studies)
+    return studies
+
+
+@pytest.fixture
+def large_release(db, studies_500):
+    """ A release with 20 tasks and 50 notes """
+    release = Release(name='benchmark')
+    release.save()
+    release.studies.set(studies_500[:50])
+    services = [TaskService(name=f'service {i}', url='http://ts',
+                            author='bench') for i in range(20)]
+    TaskService.objects.bulk_create(services)
+    Task.objects.bulk_create([Task(release=release, task_service=s)
+                              for s in services])
+    ReleaseNote.objects.bulk_create([
+        ReleaseNote(release=release, study=s, author='bench',
+                    description='lorem ipsum ' * 20)
+        for s in studies_500[:50]])
+    return release
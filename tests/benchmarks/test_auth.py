@@ -0,0 +1,53 @@
+import pytest
+from mock import Mock
+from coordinator import authentication
+from coordinator.authentication import EgoAuthentication, VerifiedTokenCache
+from coordinator.permissions import GroupPermission
+from tests.test_auth import make_key, make_token
+
+
+@pytest.fixture
+def token(mocker):
+    """ A token signed with ego's public key, which is already fetched """
+    key, public = make_key()
+    mocker.patch.object(authentication.EGO_PUBLIC_KEY, '_key', public)
+    return make_token(key)
+
+
+def request_with(token):
+    request = Mock()
+    request.META = {'HTTP_AUTHORIZATION': 'Bearer ' + token}
+    return request
+
+
+def test_authenticate_cached(benchmark, token):
+    """ Authenticate a token that has been verified before """
+    request = request_with(token)
+    EgoAuthentication().authenticate(request)
+
+    user, _ = benchmark(EgoAuthentication().authenticate, request)
+    assert 'roles' in user
+
+
+def test_authenticate_verify(benchmark, token, mocker):
+    """ Verify a token's signature with ego's public key """
+    request = request_with(token)
+
+    def setup():
+        mocker.patch('coordinator.authentication.VERIFIED_TOKENS',
+                     VerifiedTokenCache())
+        return (request,), {}
+
+    user, _ = benchmark.pedantic(EgoAuthentication().authenticate,
+                                 setup=setup, rounds=100)
+    assert 'roles' in user
+
+
+def test_group_permission(benchmark):
+    """ Check that a user may create a release of 50 of their studies """
+    groups = [f'SD_{i:08d}' for i in range(100)]
+    request = Mock(method='POST', path='/releases',
+                   user={'roles': ['USER'], 'groups': groups},
+                   data={'studies': groups[50:]})
+
+    assert benchmark(GroupPermission().has_permission, request, None)
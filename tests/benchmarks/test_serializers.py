@@ -0,0 +1,26 @@
+from coordinator.api.models import Release, Study
+from coordinator.api.serializers import ReleaseSerializer, StudySerializer
+
+
+def test_render_release(benchmark, large_release, api_request):
+    """ Render a release with 20 tasks and 50 notes """
+    def render():
+        queryset = ReleaseSerializer.setup_eager_loading(
+            Release.objects.filter(kf_id=large_release.kf_id), api_request)
+        return ReleaseSerializer(queryset.get(),
+                                 context={'request': api_request}).data
+
+    data = benchmark(render)
+    assert len(data['tasks']) == 20
+    assert len(data['notes']) == 50
+
+
+def test_render_studies(benchmark, studies_500, api_request):
+    """ Render a list of 500 studies """
+    def render():
+        queryset = StudySerializer.setup_eager_loading(Study.objects.all(),
+                                                       api_request)
+        return StudySerializer(queryset, many=True,
+                               context={'request': api_request}).data
+
+    assert len(benchmark(render)) == 500
@@ -0,0 +1,33 @@
+from mock import Mock, patch
+from coordinator.api.models import Release, Task
+
+
+def test_status_check(benchmark, large_release):
+    """ Poll a running task whose service reports new progress """
+    task = large_release.tasks.first()
+    task.initialize()
+    task.start()
+    task.save()
+    resp = Mock(status_code=200)
+    resp.json.return_value = {'state': 'running', 'progress': 50}
+
+    with patch('coordinator.api.models.task.requests') as requests:
+        requests.post.return_value = resp
+        benchmark(task.status_check)
+
+    assert requests.post.called
+
+
+def test_transition_pipeline(benchmark, db):
+    """ Change the state of a release, recording and publishing its event """
+    def setup():
+        release = Release(name='transition')
+        release.save()
+        return (release,), {}
+
+    def transition(release):
+        release.initialize()
+        release.save()
+
+    benchmark.pedantic(transition, setup=setup, rounds=100)
+    assert Release.objects.filter(state='initializing').count() == 100
@@ -2,9 +2,16 @@ import os
 import pytest
 import random
 import django_rq
+import requests
 from datetime import datetime, timezone
+from django.conf import settings
 from mock import Mock, patch
 from coordinator.api.models import Release, TaskService, Study, Task
+from coordinator.authentication import (
+    EgoJWTStore,
+    EgoPublicKey,
+    VerifiedTokenCache
+)
 from rest_framework.test import APIClient
 
 
@@ -21,17 +28,32 @@ def mock_ego(mocker):
     """
     Mocks requests to ego
 
-    GET requests are assumed to go to /oauth/token/verify and will respond
-      'true' indicating the token is valid
+    GET requests to /oauth/token/public_key will respond 404 so that tokens
+      are verified by ego
+
+    Other GET requests are assumed to go to /oauth/token/verify and will
+      respond 'true' indicating the token is valid
 
     POST requests are assumed to go to /oauth/token and will respond
       with a new access_token
     """
+    mocker.patch('coordinator.authentication.EGO_PUBLIC_KEY', EgoPublicKey())
+    mocker.patch('coordinator.authentication.VERIFIED_TOKENS',
+                 VerifiedTokenCache())
     mock_auth_requests = mocker.patch('coordinator.authentication.requests')
+    mock_auth_requests.exceptions = requests.exceptions
     mock_get_resp = Mock()
     mock_get_resp.status_code = 200
     mock_get_resp.json.return_value = True
 
+    mock_key_resp = Mock()
+    mock_key_resp.status_code = 404
+
+    def get(url, *args, **kwargs):
+        if url.endswith('/public_key'):
+            return mock_key_resp
+        return mock_auth_requests.get.return_value
+
     mock_post_resp = Mock()
     mock_post_resp.status_code = 200
     mock_post_resp.json.return_value = {
@@ -40,9 +62,19 @@ def mock_ego(mocker):
     }
 
     mock_auth_requests.get.return_value = mock_get_resp
+    mock_auth_requests.get.side_effect = get
     mock_auth_requests.post.return_value = mock_post_resp
 
 
+@pytest.yield_fixture
+def ego_token_store():
+    """ Clears the coordinator's token shared in redis """
+    conn = django_rq.get_connection()
+    conn.delete(EgoJWTStore.KEY, EgoJWTStore.KEY + ':lock')
+    yield
+    conn.delete(EgoJWTStore.KEY, EgoJWTStore.KEY + ':lock')
+
+
 @pytest.yield_fixture
 def admin_client():
     """ Injects admin JWT into each request """
@@ -53,11 +85,11 @@ def admin_client():
 
 @pytest.yield_fixture
 def worker():
-    # Clear queue
-    q = django_rq.get_queue()
-    q.empty()
+    # Clear queues
+    for name in settings.RQ_QUEUES:
+        django_rq.get_queue(name).empty()
 
-    worker = django_rq.get_worker()
+    worker = django_rq.get_worker(*settings.RQ_QUEUES)
     return worker
 
 
@@ -4,6 +4,7 @@ Test settings
 
 import os
 import uuid
+from collections import OrderedDict
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'coordinator.middleware.MetricsMiddleware',
+    'coordinator.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -93,9 +96,41 @@ RQ_QUEUES = {
     },
 }
 
+for name in ['lifecycle', 'polling', 'notifications']:
+    RQ_QUEUES[name] = dict(RQ_QUEUES['default'])
+
 if DEBUG or TESTING:
     RQ_QUEUES['default']['ASYNC'] = True
 
+JOB_QUEUES = {
+    'init_release': 'lifecycle',
+    'init_task': 'lifecycle',
+    'start_release': 'lifecycle',
+    'publish_release': 'lifecycle',
+    'cancel_release': 'lifecycle',
+    'status_check': 'polling',
+    'release_status_check': 'polling',
+    'health_check': 'health_checks',
+}
+
+WORKER_POOLS = OrderedDict([
+    ('lifecycle', {'queues': ['lifecycle'], 'workers': 2}),
+    ('polling', {'queues': ['lifecycle', 'polling', 'default'],
+                 'workers': 2}),
+    ('health', {'queues': ['health_checks'], 'workers': 1}),
+    ('notifications', {'queues': ['notifications'], 'workers': 0}),
+])
+
+# Seconds to keep rendered release documents in redis, 0 disables caching
+RELEASE_CACHE_TIMEOUT = 60
+
+# Buffer task progress reports in redis
+PROGRESS_WRITE_BEHIND = True
+
+# Time the queries and phases of each request
+REQUEST_TIMING = False
+SLOW_REQUEST_MS = 1000
+
 EGO = {
     'default': {
         'CLIENT_ID': os.environ.get('EGO_CLIENT_ID', 'test-client'),
@@ -1,7 +1,20 @@
 import os
+import jwt
+import time
 import pytest
+import requests
 from mock import Mock, patch
 from django.conf import settings
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from rest_framework.exceptions import AuthenticationFailed
+from coordinator import authentication
+from coordinator.authentication import (
+    EgoAuthentication,
+    EgoPublicKey,
+    VerifiedTokenCache
+)
 
 
 BASE_URL = 'http://testserver'
@@ -109,3 +122,122 @@ def test_health_checks(client, db, fakes, token, response_code):
     resp = client.post(BASE_URL+'/task-services/health_checks',
                        headers={'Authorization': 'Bearer '+token})
     assert resp.status_code == response_code
+
+
+def make_key():
+    """ Generate a private key and its PEM encoded public key """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048,
+                                   backend=default_backend())
+    public = key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo)
+    return key, public.decode()
+
+
+def make_token(key, expires_in=3600):
+    claims = jwt.decode(ADMIN_TOKEN, verify=False)
+    claims['exp'] = int(time.time()) + expires_in
+    return jwt.encode(claims, key, algorithm='RS256').decode()
+
+
+@pytest.fixture
+def ego_keys(mocker):
+    """
+    Mocks ego's public key endpoint, returning the public key of the first
+    generated key until the key is rotated
+    """
+    keys = [make_key(), make_key()]
+    mock_auth_requests = mocker.patch('coordinator.authentication.requests')
+    mock_auth_requests.exceptions = requests.exceptions
+
+    def get(url, *args, **kwargs):
+        resp = Mock()
+        resp.status_code = 200
+        resp.text = keys[0][1]
+        return resp
+
+    mock_auth_requests.get.side_effect = get
+    return keys, mock_auth_requests
+
+
+def authenticate(token):
+    request = Mock()
+    request.META = {'HTTP_AUTHORIZATION': 'Bearer ' + token}
+    return EgoAuthentication().authenticate(request)
+
+
+def test_local_verification(ego_keys):
+    """ Test that tokens are verified without asking ego """
+    keys, mock_requests = ego_keys
+    token = make_token(keys[0][0])
+
+    user, _ = authenticate(token)
+    assert user['roles'] == ['ADMIN']
+    # Only the public key was requested
+    assert mock_requests.get.call_count == 1
+    assert mock_requests.get.call_args[0][0].endswith('/public_key')
+
+    # Verified tokens are cached
+    assert authenticate(token)[0] == user
+    assert mock_requests.get.call_count == 1
+
+
+def test_local_verification_bad_signature(ego_keys):
+    """ Test that a token signed by another key is rejected """
+    keys, mock_requests = ego_keys
+    authenticate(make_token(keys[0][0]))
+
+    with pytest.raises(AuthenticationFailed):
+        authenticate(make_token(make_key()[0]))
+
+
+def test_local_verification_expired(ego_keys):
+    """ Test that an expired token is rejected """
+    keys, _ = ego_keys
+    with pytest.raises(AuthenticationFailed) as err:
+        authenticate(make_token(keys[0][0], expires_in=-60))
+    assert 'expired' in str(err.value)
+
+
+def test_key_rotation(ego_keys, mocker):
+    """ Test that the key is fetched again when ego rotates it """
+    keys, mock_requests = ego_keys
+    authenticate(make_token(keys[0][0]))
+
+    keys.reverse()
+    mocker.patch.object(EgoPublicKey, 'RETRY_AFTER', 0)
+    user, _ = authenticate(make_token(keys[0][0]))
+    assert user['roles'] == ['ADMIN']
+    assert mock_requests.get.call_count == 2
+
+
+def test_verified_token_cache_bounded():
+    """ Test that the least recently used tokens are dropped """
+    cache = VerifiedTokenCache(size=2)
+    exp = time.time() + 60
+    cache.set('a', {'name': 'a'}, exp)
+    cache.set('b', {'name': 'b'}, exp)
+    cache.get('a')
+    cache.set('c', {'name': 'c'}, exp)
+
+    assert cache.get('a') == {'name': 'a'}
+    assert cache.get('b') is None
+    assert cache.get('c') == {'name': 'c'}
+
+    cache.set('d', {'name': 'd'}, time.time() - 1)
+    assert cache.get('d') is None
+
+
+def test_remote_verification_fallback(mocker):
+    """ Test that ego verifies tokens when its public key is unavailable """
+    mock_requests = authentication.requests
+
+    user, _ = authenticate(ADMIN_TOKEN)
+    assert user['roles'] == ['ADMIN']
+    assert mock_requests.get.call_args[0][0].endswith('/oauth/token/verify')
+    assert 'timeout' in mock_requests.get.call_args[1]
+
+    mock_requests.get.side_effect = requests.exceptions.Timeout
+    with pytest.raises(AuthenticationFailed) as err:
+        authenticate(USER_TOKEN)
+    assert 'unavailable' in str(err.value)
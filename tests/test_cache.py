@@ -0,0 +1,158 @@
+import time
+import pytest
+import threading
+import django_rq
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from coordinator import cache
+from coordinator.api.models import Release, ReleaseNote, TaskService
+
+
+BASE_URL = 'http://testserver'
+
+
+@pytest.fixture
+def release_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    return len(ctx.captured_queries)
+
+
+def test_cached_detail(client, db, fakes, release_cache):
+    """ Test that a release is rendered once and then served from cache """
+    kf_id = list(fakes['releases'].keys())[0]
+    url = BASE_URL+f'/releases/{kf_id}'
+    first = client.get(url).json()
+
+    # Only the ETag lookup is left
+    assert count_queries(client, url) == 1
+    assert client.get(url).json() == first
+
+
+def test_field_selection_not_cached(client, db, fakes, release_cache):
+    """ Test that other representations are rendered as usual """
+    kf_id = list(fakes['releases'].keys())[0]
+    client.get(BASE_URL+f'/releases/{kf_id}')
+
+    resp = client.get(BASE_URL+f'/releases/{kf_id}?fields=kf_id')
+    assert resp.json() == {'kf_id': kf_id}
+
+
+def test_task_invalidates(client, db, fakes, release_cache):
+    """ Test that a release is re-rendered when one of its tasks changes """
+    task = list(fakes['tasks'].values())[0]
+    url = BASE_URL+f'/releases/{task.release_id}'
+    client.get(url)
+
+    task.progress = 50
+    task.save()
+
+    tasks = client.get(url).json()['tasks']
+    assert [t['progress'] for t in tasks if t['kf_id'] == task.kf_id] == [50]
+
+
+def test_transition_invalidates(client, db, fakes, release_cache):
+    """ Test that a release is re-rendered when it changes state """
+    kf_id = list(fakes['releases'].keys())[0]
+    url = BASE_URL+f'/releases/{kf_id}'
+    assert client.get(url).json()['state'] == 'waiting'
+
+    release = Release.objects.get(kf_id=kf_id)
+    release.cancel()
+    release.save()
+
+    assert client.get(url).json()['state'] == 'canceling'
+
+
+def test_note_invalidates(client, db, fakes, studies, release_cache):
+    """ Test that a release is re-rendered when a note is added """
+    kf_id = list(fakes['releases'].keys())[0]
+    url = BASE_URL+f'/releases/{kf_id}'
+    assert client.get(url).json()['notes'] == []
+
+    ReleaseNote(release_id=kf_id, study_id='SD_00000000',
+                description='note').save()
+
+    assert len(client.get(url).json()['notes']) == 1
+
+
+def test_service_invalidates(client, db, fakes, release_cache):
+    """ Test that a release is re-rendered when a task service is renamed """
+    task = list(fakes['tasks'].values())[0]
+    url = BASE_URL+f'/releases/{task.release_id}'
+    client.get(url)
+
+    service = TaskService.objects.get(kf_id=task.task_service_id)
+    service.name = 'Renamed'
+    service.save()
+
+    names = [t['service_name'] for t in client.get(url).json()['tasks']
+             if t['kf_id'] == task.kf_id]
+    assert names == ['Renamed']
+
+
+def test_service_health_keeps_cache(client, db, fakes, release_cache,
+                                    mocker):
+    """ Test that saves which leave a service's name alone keep releases """
+    invalidate = mocker.patch('coordinator.api.models.invalidate_releases')
+    service = list(fakes['tasks'].values())[0].task_service
+    service.last_ok_status += 1
+    service.save()
+    service.save(update_fields=['last_ok_status'])
+
+    assert invalidate.call_count == 0
+
+
+def test_single_flight(release_cache):
+    """ Test that concurrent misses render the document once """
+    renders = []
+
+    def render():
+        renders.append(1)
+        time.sleep(0.2)
+        return {'renders': len(renders)}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+                   cache.get_or_render('release', 'RE_00000000', 'host',
+                                       render)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(renders) == 1
+    assert results == [{'renders': 1}] * 5
+
+
+def test_invalidated_render_not_stored(release_cache):
+    """ Test that a document changed while rendering is not cached """
+    def render():
+        cache.invalidate('release', 'RE_00000000')
+        return {'stale': True}
+
+    assert cache.get_or_render('release', 'RE_00000000', 'host', render)
+    assert cache.get_or_render('release', 'RE_00000000', 'host',
+                               lambda: {'stale': False}) == {'stale': False}
+
+
+def test_waiter_keeps_others_lock(release_cache, monkeypatch):
+    """ Test that a request tired of waiting leaves the holder's lock """
+    monkeypatch.setattr(cache, 'WAIT_TIMEOUT', 0.1)
+    conn = django_rq.get_connection()
+    lock_key = 'coordinator:document:release:RE_00000000:host:lock'
+    conn.set(lock_key, 'holder', ex=cache.LOCK_TIMEOUT)
+
+    doc = cache.get_or_render('release', 'RE_00000000', 'host',
+                              lambda: {'waited': True})
+
+    assert doc == {'waited': True}
+    assert conn.get(lock_key) == b'holder'
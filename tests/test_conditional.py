@@ -0,0 +1,180 @@
+import pytest
+from mock import Mock, patch
+from coordinator.api.models import Event, Task, TaskService, Release
+
+
+BASE_URL = 'http://testserver'
+
+
+@pytest.mark.parametrize('endpoint', [
+    'releases',
+    'tasks',
+    'task-services',
+    'studies',
+    'events',
+    'release-notes',
+])
+def test_validators(client, db, fakes, endpoint):
+    """ Test that reads return ETag and Last-Modified headers """
+    resp = client.get(BASE_URL+f'/{endpoint}')
+    assert resp.status_code == 200
+    assert resp['ETag'].startswith('W/"')
+    assert 'Last-Modified' not in resp
+
+    resp = client.get(BASE_URL+f'/{endpoint}',
+                      HTTP_IF_NONE_MATCH=resp['ETag'])
+    assert resp.status_code == 304
+    assert resp.content == b''
+
+
+def test_list_changes(client, db, fakes):
+    """ Test that the ETag of a list changes when an object is changed """
+    etag = client.get(BASE_URL+'/releases')['ETag']
+
+    resp = client.get(BASE_URL+'/releases', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+
+    release = list(fakes['releases'].values())[0]
+    release.name = 'Updated'
+    release.save()
+
+    resp = client.get(BASE_URL+'/releases', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp['ETag'] != etag
+
+
+def test_list_deletes(client, db, fakes):
+    """ Test that the ETag of a list changes when an object is removed """
+    etag = client.get(BASE_URL+'/tasks')['ETag']
+    Task.objects.order_by('created_at').first().delete()
+
+    resp = client.get(BASE_URL+'/tasks', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+
+
+def test_list_deletes_modified_since(client, db, fakes):
+    """ Test that a list is not revalidated by date after a delete """
+    kf_id = list(fakes['tasks'].keys())[0]
+    last_modified = client.get(BASE_URL+f'/tasks/{kf_id}')['Last-Modified']
+    Task.objects.order_by('created_at').first().delete()
+
+    resp = client.get(BASE_URL+'/tasks', HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert resp.status_code == 200
+
+
+def test_query_params(client, db, fakes):
+    """ Test that different pages have different ETags """
+    first = client.get(BASE_URL+'/tasks?limit=5')['ETag']
+    second = client.get(BASE_URL+'/tasks?limit=5&offset=5')['ETag']
+    assert first != second
+
+    resp = client.get(BASE_URL+'/tasks?limit=5&offset=5',
+                      HTTP_IF_NONE_MATCH=first)
+    assert resp.status_code == 200
+
+
+def test_detail_nested_changes(client, db, fakes):
+    """
+    Test that a release's ETag changes when one of its tasks is updated
+    """
+    task = list(fakes['tasks'].values())[0]
+    url = BASE_URL+f'/releases/{task.release_id}'
+    etag = client.get(url)['ETag']
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+
+    task.progress = 50
+    task.save()
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp['ETag'] != etag
+
+
+def test_dependency_changes(client, db, fakes):
+    """
+    Test that the ETag of tasks changes when a task service is renamed
+    """
+    etag = client.get(BASE_URL+'/tasks')['ETag']
+
+    service = TaskService.objects.first()
+    service.name = 'Renamed'
+    service.save()
+
+    resp = client.get(BASE_URL+'/tasks', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize('endpoint', ['releases', 'events?expand=task'])
+def test_service_changes(client, db, fakes, endpoint):
+    """ Test that renaming a task service changes rendering ETags """
+    task = list(fakes['tasks'].values())[0]
+    Event(release_id=task.release_id, task=task, message='event').save()
+    etag = client.get(BASE_URL+f'/{endpoint}')['ETag']
+
+    service = TaskService.objects.first()
+    service.name = 'Renamed'
+    service.save()
+
+    resp = client.get(BASE_URL+f'/{endpoint}', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize('endpoint', ['releases', 'tasks',
+                                      'events?expand=task'])
+def test_health_check_keeps_etag(client, db, fakes, endpoint):
+    """ Test that a service's health checks leave rendering ETags alone """
+    task = list(fakes['tasks'].values())[0]
+    Event(release_id=task.release_id, task=task, message='event').save()
+    etag = client.get(BASE_URL+f'/{endpoint}')['ETag']
+
+    service = TaskService.objects.first()
+    service.last_ok_status += 1
+    service.save()
+
+    resp = client.get(BASE_URL+f'/{endpoint}', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+
+
+def test_unchanged_status_check(client, db, fakes):
+    """ Test that polling an unchanged task leaves its release current """
+    task = list(fakes['tasks'].values())[0]
+    Task.objects.filter(kf_id=task.kf_id).update(state='staged')
+    task = Task.objects.get(kf_id=task.kf_id)
+    url = BASE_URL+f'/releases/{task.release_id}'
+    etag = client.get(url)['ETag']
+
+    with patch('coordinator.api.models.task.requests') as requests:
+        requests.post.return_value = Mock(json=Mock(return_value={
+            'state': 'staged', 'progress': task.progress}))
+        task.status_check()
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+
+
+def test_if_modified_since(client, db, fakes):
+    """ Test that Last-Modified may be used to revalidate """
+    kf_id = list(fakes['releases'].keys())[0]
+    url = BASE_URL+f'/releases/{kf_id}'
+    last_modified = client.get(url)['Last-Modified']
+
+    resp = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert resp.status_code == 304
+
+
+def test_missing_detail(client, db, fakes):
+    """ Test that a missing object is still not found """
+    resp = client.get(BASE_URL+'/releases/RE_00000000')
+    assert resp.status_code == 404
+    assert 'ETag' not in resp
+
+
+def test_updated_at(db, fakes):
+    """ Test that updated_at is set on save """
+    release = list(fakes['releases'].values())[0]
+    before = Release.objects.get(kf_id=release.kf_id).updated_at
+    release.name = 'Updated'
+    release.save()
+    assert Release.objects.get(kf_id=release.kf_id).updated_at > before
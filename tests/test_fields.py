@@ -0,0 +1,99 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+BASE_URL = 'http://testserver'
+
+
+def test_sparse_fields(client, db, fakes):
+    """ Test that only the requested fields are returned """
+    resp = client.get(BASE_URL+'/releases?fields=kf_id,state,version')
+    assert resp.status_code == 200
+    for release in resp.json()['results']:
+        assert set(release.keys()) == {'kf_id', 'state', 'version'}
+
+
+def test_sparse_fields_detail(client, db, fakes):
+    """ Test that fields may be selected on a single object """
+    kf_id = list(fakes['tasks'].keys())[0]
+    resp = client.get(BASE_URL+f'/tasks/{kf_id}?fields=kf_id,service_name')
+    assert resp.json() == {
+        'kf_id': kf_id,
+        'service_name': fakes['tasks'][kf_id].task_service.name
+    }
+
+
+def test_unknown_fields_ignored(client, db, fakes):
+    """ Test that unknown fields are ignored """
+    resp = client.get(BASE_URL+'/tasks?fields=kf_id,not_a_field')
+    assert resp.status_code == 200
+    assert set(resp.json()['results'][0].keys()) == {'kf_id'}
+
+
+def test_unrequested_relations_not_loaded(client, db, fakes):
+    """
+    Test that nested tasks, notes, and studies are not queried when they
+    are not requested
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(BASE_URL+'/releases?fields=kf_id,state,version')
+    assert resp.status_code == 200
+    # Only the ETag aggregate, the count, and the page of releases
+    assert len(ctx.captured_queries) == 3
+    assert 'description' not in ctx.captured_queries[-1]['sql']
+
+
+def test_nested_fields_unaffected(client, db, fakes):
+    """ Test that nested serializers still render all of their fields """
+    resp = client.get(BASE_URL+'/releases?fields=kf_id,tasks')
+    release = resp.json()['results'][0]
+    assert set(release.keys()) == {'kf_id', 'tasks'}
+    assert 'service_name' in release['tasks'][0]
+
+
+@pytest.mark.parametrize('endpoint,field', [
+    ('tasks', 'task_service'),
+    ('events', 'task'),
+    ('events', 'task_service'),
+])
+def test_expand(client, db, fakes, endpoint, field):
+    """ Test that expanded relations are nested instead of linked """
+    if endpoint == 'events':
+        for task in list(fakes['tasks'].values())[:5]:
+            task.events.create(release=task.release,
+                               task_service=task.task_service,
+                               message='event')
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(BASE_URL+f'/{endpoint}?expand={field}&limit=50')
+    assert resp.status_code == 200
+    # Expanded objects are joined, not fetched one by one
+    assert len(ctx.captured_queries) == (4 if endpoint == 'tasks' else 3)
+
+    result = resp.json()['results'][0]
+    assert isinstance(result[field], dict)
+    assert result[field]['kf_id']
+
+
+def test_expand_with_fields(client, db, fakes):
+    """ Test that an expanded field is rendered along with selected fields """
+    resp = client.get(BASE_URL+'/tasks?fields=kf_id&expand=task_service')
+    task = resp.json()['results'][0]
+    assert set(task.keys()) == {'kf_id', 'task_service'}
+    assert task['task_service']['name'].startswith('TASK SERVICE')
+
+
+def test_unknown_expand_ignored(client, db, fakes):
+    """ Test that fields which may not be expanded are left as links """
+    resp = client.get(BASE_URL+'/tasks?expand=release')
+    assert resp.json()['results'][0]['release'].startswith(BASE_URL)
+
+
+def test_fields_ignored_on_write(admin_client, db, studies):
+    """ Test that field selection does not affect writes """
+    resp = admin_client.post(BASE_URL+'/releases?fields=kf_id',
+                             data={'name': 'test',
+                                   'studies': ['SD_00000001']})
+    assert resp.status_code == 201
+    assert resp.json()['name'] == 'test'
@@ -0,0 +1,30 @@
+import os
+import runpy
+import multiprocessing
+
+
+CONF = os.path.join(os.path.dirname(__file__), '..', 'bin',
+                    'gunicorn.conf.py')
+
+
+def test_sized_from_cpus(monkeypatch):
+    """ Test that workers and threads are sized from the CPU count """
+    monkeypatch.delenv('GUNICORN_WORKERS', raising=False)
+    conf = runpy.run_path(CONF)
+
+    assert conf['worker_class'] == 'gthread'
+    assert conf['workers'] == multiprocessing.cpu_count() * 2 + 1
+    assert conf['threads'] == 4
+    assert conf['preload_app']
+
+
+def test_overrides(monkeypatch):
+    """ Test that the environment may override the config """
+    monkeypatch.setenv('GUNICORN_WORKERS', '3')
+    monkeypatch.setenv('GUNICORN_THREADS', '8')
+    monkeypatch.setenv('GUNICORN_PRELOAD', 'false')
+    conf = runpy.run_path(CONF)
+
+    assert conf['workers'] == 3
+    assert conf['threads'] == 8
+    assert not conf['preload_app']
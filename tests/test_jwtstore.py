@@ -1,10 +1,13 @@
 import json
 import jwt
+import datetime
+import django_rq
 from mock import MagicMock, patch
+from requests.exceptions import ConnectionError, RequestException
 from coordinator.authentication import EgoJWTStore
 
 
-def test_store_token(mocker):
+def test_store_token(mocker, ego_token_store):
     """ Test that the ego store fetches jwts correctly """
 
     mock_ego = mocker.patch('coordinator.authentication.requests')
@@ -27,6 +30,75 @@ def test_store_token(mocker):
     data = ('grant_type=client_credentials&client_id=test-client&' +
             'client_secret=test-secret')
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    mock_ego.post.assert_called_with(url, data=data, headers=headers)
+    mock_ego.post.assert_called_with(url, data=data, headers=headers,
+                                     timeout=0.1)
 
     assert store.header == {'Authorization': f"Bearer {resp['access_token']}"}
+
+
+def mock_ego_token(mocker, token='abc', expires_in=1000):
+    mock_ego = mocker.patch('coordinator.authentication.requests')
+    mock_resp = MagicMock()
+    mock_resp.status_code = 200
+    mock_resp.json.return_value = {'access_token': token,
+                                   'expires_in': expires_in}
+    mock_ego.post.return_value = mock_resp
+    return mock_ego
+
+
+def test_shared_token(mocker, ego_token_store):
+    """ Test that a token fetched by one process is used by the others """
+    mock_ego = mock_ego_token(mocker)
+
+    assert EgoJWTStore().token == 'abc'
+    assert EgoJWTStore().token == 'abc'
+    assert mock_ego.post.call_count == 1
+
+
+def test_background_renewal(mocker, ego_token_store):
+    """ Test that an expiring token is renewed without waiting on ego """
+    mock_ego = mock_ego_token(mocker, token='new')
+
+    store = EgoJWTStore()
+    store._token = 'old'
+    store.expiration = (datetime.datetime.utcnow().timestamp() +
+                        EgoJWTStore.REFRESH_BEFORE - 1)
+
+    thread = MagicMock()
+    mock_thread = mocker.patch('coordinator.authentication.threading.Thread',
+                               return_value=thread)
+    assert store.token == 'old'
+    assert thread.start.call_count == 1
+    assert mock_ego.post.call_count == 0
+
+    # Run the renewal
+    mock_thread.call_args[1]['target']()
+    assert store.token == 'new'
+    assert mock_ego.post.call_count == 1
+
+
+def test_single_flight(mocker, ego_token_store):
+    """ Test that a process waits for another's refresh """
+    mock_ego = mock_ego_token(mocker)
+    conn = django_rq.get_connection()
+    conn.set(EgoJWTStore.LOCK_KEY, 1)
+
+    # Another process finishes its refresh while this one waits
+    other = EgoJWTStore()
+    other._token = 'shared'
+    other.expiration = datetime.datetime.utcnow().timestamp() + 1000
+    mocker.patch('coordinator.authentication.time.sleep',
+                 side_effect=lambda seconds: other.store(conn))
+
+    assert EgoJWTStore().token == 'shared'
+    assert mock_ego.post.call_count == 0
+
+
+def test_ego_unavailable(mocker, ego_token_store):
+    """ Test that a failed request for a token gives up the lock """
+    mock_ego = mocker.patch('coordinator.authentication.requests')
+    mock_ego.exceptions.RequestException = RequestException
+    mock_ego.post.side_effect = ConnectionError
+
+    assert EgoJWTStore().token is None
+    assert django_rq.get_connection().get(EgoJWTStore.LOCK_KEY) is None
@@ -0,0 +1,35 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from coordinator.utils import KFIdBlocks, KF_ID_BLOCK_SIZE, kf_ids
+from coordinator.api.models import Event
+
+
+def test_unique_ids(db):
+    """ Test that ids are never repeated across blocks """
+    ids = kf_ids('EV', KF_ID_BLOCK_SIZE * 3 + 7)
+    ids += [kf_ids('EV', 1)[0] for _ in range(KF_ID_BLOCK_SIZE)]
+    assert len(set(ids)) == len(ids)
+    assert all(i.startswith('EV_') and len(i) == 11 for i in ids)
+
+
+def test_one_query_per_block(db):
+    """ Test that the database is only asked once for a block of ids """
+    blocks = KFIdBlocks()
+    with CaptureQueriesContext(connection) as ctx:
+        blocks.take(KF_ID_BLOCK_SIZE * 2)
+        assert len(ctx.captured_queries) == 1
+        blocks.take(1)
+        assert len(ctx.captured_queries) == 1
+
+
+def test_new_process_new_block(db, mocker):
+    """ Test that a forked process does not reuse its parent's block """
+    blocks = KFIdBlocks()
+    first = blocks.take(1)
+    mocker.patch('os.getpid', return_value=-1)
+    assert blocks.take(1)[0] >= first[0] + KF_ID_BLOCK_SIZE
+
+
+def test_event_prefix(db):
+    """ Test that events are given event ids """
+    assert Event().kf_id.startswith('EV_')
@@ -0,0 +1,54 @@
+import time
+import requests
+from coordinator.api.management.commands.load_releases import (
+    FakeTaskService
+)
+
+
+OPTIONS = {'latency': 0, 'failure_rate': 0, 'run_seconds': 0.05,
+           'publish_seconds': 0.05}
+
+
+def wait_for_reports(service, count, timeout=2):
+    deadline = time.monotonic() + timeout
+    while len(service.reports) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fake_task_service(mocker):
+    """ Test that the fake service follows a task through a release """
+    service = FakeTaskService('fake', 'http://coordinator', {}, OPTIONS)
+    patch = mocker.patch.object(service.session, 'patch')
+    patch.return_value.status_code = 200
+    service.start()
+    try:
+        assert requests.get(service.url+'/status').status_code == 200
+
+        def act(action):
+            resp = requests.post(service.url+'/tasks',
+                                 json={'action': action, 'task_id': 'TA_1',
+                                       'release_id': 'RE_1'})
+            return resp.json()['state']
+
+        assert act('initialize') == 'pending'
+        assert act('start') == 'running'
+        wait_for_reports(service, 1)
+        assert act('get_status') == 'staged'
+        assert act('publish') == 'publishing'
+        wait_for_reports(service, 2)
+        assert act('get_status') == 'published'
+    finally:
+        service.stop()
+
+    assert [c[1]['json']['state'] for c in patch.call_args_list] == [
+        'staged', 'published']
+    patch.assert_called_with('http://coordinator/tasks/TA_1',
+                             json={'state': 'published', 'progress': 100},
+                             timeout=60)
+
+
+def test_fake_task_service_failures():
+    """ Test that actions are rejected at the failure rate """
+    service = FakeTaskService('fake', 'http://coordinator', {},
+                              dict(OPTIONS, failure_rate=1))
+    assert service.act({'action': 'initialize', 'task_id': 'TA_1'})[0] == 503
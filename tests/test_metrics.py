@@ -0,0 +1,60 @@
+import pytest
+import django_rq
+from mock import Mock, patch
+from prometheus_client import REGISTRY
+from requests.exceptions import HTTPError
+from coordinator.api.models import Release, TaskService
+
+
+BASE_URL = 'http://testserver'
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics(client, db):
+    """ Test that metrics are exposed in prometheus' format """
+    django_rq.get_queue('default').empty()
+    resp = client.get(BASE_URL+'/metrics')
+    assert resp.status_code == 200
+    assert resp['Content-Type'].startswith('text/plain')
+    body = resp.content.decode()
+    assert 'coordinator_queue_jobs{queue="default"} 0.0' in body
+    assert 'coordinator_request_seconds' in body
+
+
+def test_request_latency(client, db):
+    """ Test that requests are counted by view """
+    labels = {'method': 'GET', 'view': 'release-list', 'status': '200'}
+    before = sample('coordinator_request_seconds_count', **labels)
+    client.get(BASE_URL+'/releases')
+    assert sample('coordinator_request_seconds_count', **labels) == before + 1
+
+
+def test_transitions_counted(db):
+    """ Test that changes of state are counted by model """
+    labels = {'model': 'release', 'source': 'waiting',
+              'target': 'initializing'}
+    before = sample('coordinator_transitions_total', **labels)
+    release = Release(name='metrics')
+    release.save()
+    release.initialize()
+    release.save()
+    assert sample('coordinator_transitions_total', **labels) == before + 1
+
+
+@pytest.mark.parametrize('error,outcome', [(None, 'ok'),
+                                           (HTTPError, 'error')])
+def test_service_latency(db, error, outcome):
+    """ Test that health checks are timed by service and outcome """
+    service = TaskService(name='metrics', url='http://ts', author='me')
+    service.save()
+    with patch('coordinator.api.models.taskservice.requests') as requests:
+        requests.get.return_value = Mock(
+            raise_for_status=Mock(side_effect=error))
+        service.health_check()
+
+    assert sample('coordinator_task_service_request_seconds_count',
+                  task_service=service.kf_id, action='status',
+                  outcome=outcome) == 1
@@ -1,3 +1,7 @@
+import json
+from mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from coordinator.api.models import ReleaseNote
 
 
@@ -94,3 +98,67 @@ def test_complex_filter(client, db, release, study,
            f"?release={release['kf_id']}&study={study.kf_id}")
     resp = client.get(url)
     assert resp.json()['count'] == 1
+
+
+def test_bulk_notes(client, db, release, study):
+    """ Test that many notes may be made at once """
+    notes = [{'author': 'test',
+              'description': f'Note {i}',
+              'release': 'http://testserver/releases/'+release['kf_id'],
+              'study': 'http://testserver/studies/'+study.kf_id}
+             for i in range(5)]
+    notes[1]['study'] = 'http://testserver/studies/SD_XXXXXXXX'
+    del notes[2]['description']
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.post('http://testserver/release-notes',
+                           json.dumps(notes),
+                           content_type='application/json')
+    queries = len(ctx.captured_queries)
+
+    assert resp.status_code == 207
+    res = resp.json()
+    assert [r is None for r in res['results']] == [False, True, True,
+                                                   False, False]
+    assert res['errors'][0] is None
+    assert 'study' in res['errors'][1]
+    assert 'description' in res['errors'][2]
+    assert ReleaseNote.objects.count() == 3
+
+    resp = client.get('http://testserver/releases/'+release['kf_id'])
+    assert len(resp.json()['notes']) == 3
+
+    # The number of queries does not grow with the number of notes, other
+    # than to reserve a new block of ids
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.post('http://testserver/release-notes',
+                           json.dumps(notes * 4),
+                           content_type='application/json')
+    assert resp.status_code == 207
+    assert len(ctx.captured_queries) <= queries + 1
+
+
+def test_bulk_notes_invalid(client, db, release):
+    """ Test that nothing is made if no note is valid """
+    resp = client.post('http://testserver/release-notes',
+                       json.dumps([{'author': 'test'}]),
+                       content_type='application/json')
+    assert resp.status_code == 400
+    assert ReleaseNote.objects.count() == 0
+
+
+def test_bulk_notes_conflict(client, db, release, study, release_note):
+    """ Test that nothing is made if the database refuses the notes """
+    notes = [{'author': 'test',
+              'description': f'Note {i}',
+              'release': 'http://testserver/releases/'+release['kf_id'],
+              'study': 'http://testserver/studies/'+study.kf_id}
+             for i in range(2)]
+    kf_ids = ['RN_00000002', release_note['kf_id']]
+    with patch('coordinator.api.views.mixins.kf_ids', return_value=kf_ids):
+        resp = client.post('http://testserver/release-notes',
+                           json.dumps(notes),
+                           content_type='application/json')
+
+    assert resp.status_code == 409
+    assert ReleaseNote.objects.count() == 1
@@ -0,0 +1,75 @@
+import pytest
+from coordinator.api.models import Task
+
+
+BASE_URL = 'http://testserver'
+
+
+def test_limit_offset_default(client, db, fakes):
+    """ Test that limit/offset pagination is still the default """
+    resp = client.get(BASE_URL+'/tasks?limit=5&offset=5')
+    assert resp.status_code == 200
+    res = resp.json()
+    assert res['count'] == 50
+    assert len(res['results']) == 5
+    assert 'offset=10' in res['next']
+    assert res['previous'] is not None
+
+
+@pytest.mark.parametrize('endpoint', [
+    'tasks',
+    'releases',
+])
+def test_cursor_walk(client, db, fakes, endpoint):
+    """ Test that following cursors returns every object exactly once """
+    resp = client.get(BASE_URL+f'/{endpoint}?cursor=&limit=7')
+    assert resp.status_code == 200
+    res = resp.json()
+    assert 'count' not in res
+    assert 'previous' not in res
+
+    seen = [r['kf_id'] for r in res['results']]
+    while res['next']:
+        assert 'cursor=' in res['next']
+        res = client.get(res['next']).json()
+        seen.extend(r['kf_id'] for r in res['results'])
+
+    expected = len(fakes[endpoint])
+    assert len(seen) == expected
+    assert len(set(seen)) == expected
+
+
+def test_cursor_ordering(client, db, fakes):
+    """ Test that cursor pages are ordered newest first """
+    res = client.get(BASE_URL+'/tasks?cursor=&limit=100').json()
+    expected = list(Task.objects.order_by('-created_at', '-kf_id')
+                                .values_list('kf_id', flat=True))
+    assert [r['kf_id'] for r in res['results']] == expected
+    assert res['next'] is None
+
+
+def test_cursor_with_filter(client, db, fakes):
+    """ Test that cursors respect filters on the collection """
+    release = list(fakes['releases'].keys())[0]
+    res = client.get(BASE_URL+f'/tasks?cursor=&release={release}').json()
+    assert all(r['release'].endswith(release) for r in res['results'])
+
+
+def test_invalid_cursor(client, db, fakes):
+    """ Test that a malformed cursor is rejected """
+    resp = client.get(BASE_URL+'/tasks?cursor=notacursor')
+    assert resp.status_code == 404
+    assert resp.json()['detail'] == 'Invalid cursor'
+
+
+@pytest.mark.parametrize('query', [
+    'count=estimate',
+    'count=estimate&cursor=',
+])
+def test_estimated_count(client, db, fakes, query):
+    """ Test that an estimated count may be requested instead of COUNT(*) """
+    resp = client.get(BASE_URL+f'/tasks?{query}')
+    assert resp.status_code == 200
+    res = resp.json()
+    assert isinstance(res['count'], int)
+    assert res['count'] >= 0
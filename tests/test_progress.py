@@ -0,0 +1,153 @@
+import json
+import pytest
+import django_rq
+from mock import Mock, patch
+from coordinator import progress
+from coordinator.api.models import Event, Task
+
+
+BASE_URL = 'http://testserver'
+
+
+@pytest.fixture
+def progress_buffer():
+    conn = django_rq.get_connection()
+    keys = [progress.KEY, progress.FLUSHING_KEY, progress.SNAPSHOT_KEY,
+            progress.LOCK_KEY]
+    conn.delete(*keys)
+    yield
+    conn.delete(*keys)
+
+
+def patch_task(client, kf_id, body):
+    return client.patch(BASE_URL+f'/tasks/{kf_id}', json.dumps(body),
+                        content_type='application/json')
+
+
+def test_progress_buffered(client, db, fakes, progress_buffer):
+    """ Test that progress is served from the buffer until it is flushed """
+    task = list(fakes['tasks'].values())[0]
+    resp = patch_task(client, task.kf_id, {'progress': 40})
+    assert resp.status_code == 200
+    assert resp.json()['progress'] == 40
+
+    resp = patch_task(client, task.kf_id, {'progress': 60})
+    assert resp.json()['progress'] == 60
+    assert Task.objects.get(kf_id=task.kf_id).progress == 0
+
+    resp = client.get(BASE_URL+f'/tasks/{task.kf_id}')
+    assert resp.json()['progress'] == 60
+    resp = client.get(BASE_URL+f'/releases/{task.release_id}')
+    assert [t['progress'] for t in resp.json()['tasks']
+            if t['kf_id'] == task.kf_id] == [60]
+
+    assert progress.flush() == 1
+    assert Task.objects.get(kf_id=task.kf_id).progress == 60
+    assert progress.pending([task.kf_id]) == {}
+    assert progress.flush() == 0
+
+
+def test_state_written_through(client, db, fakes, progress_buffer):
+    """ Test that changes of state are saved immediately """
+    task = list(fakes['tasks'].values())[0]
+    patch_task(client, task.kf_id, {'progress': 40})
+
+    resp = patch_task(client, task.kf_id, {'state': 'running',
+                                           'progress': 50})
+    assert resp.status_code == 200
+
+    task = Task.objects.get(kf_id=task.kf_id)
+    assert task.state == 'running'
+    assert task.progress == 50
+    assert progress.pending([task.kf_id]) == {}
+
+
+def test_status_check_discards(client, db, fakes, progress_buffer):
+    """ Test that progress found by polling replaces buffered progress """
+    task = list(fakes['tasks'].values())[0]
+    patch_task(client, task.kf_id, {'progress': 40})
+    Task.objects.filter(kf_id=task.kf_id).update(state='staged')
+    task = Task.objects.get(kf_id=task.kf_id)
+
+    with patch('coordinator.api.models.task.requests') as requests:
+        requests.post.return_value = Mock(json=Mock(return_value={
+            'state': 'staged', 'progress': 80}))
+        task.status_check()
+
+    assert progress.pending([task.kf_id]) == {}
+    resp = client.get(BASE_URL+f'/tasks/{task.kf_id}')
+    assert resp.json()['progress'] == 80
+    progress.flush()
+    assert Task.objects.get(kf_id=task.kf_id).progress == 80
+
+
+def test_buffered_etag(client, db, fakes, progress_buffer):
+    """ Test that buffered progress changes the ETag of tasks """
+    task = list(fakes['tasks'].values())[0]
+    url = BASE_URL+f'/tasks/{task.kf_id}'
+    etag = client.get(url)['ETag']
+
+    patch_task(client, task.kf_id, {'progress': 40})
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp.json()['progress'] == 40
+
+
+def test_invalid_progress(client, db, fakes, progress_buffer):
+    """ Test that buffered progress is still validated """
+    task = list(fakes['tasks'].values())[0]
+    resp = patch_task(client, task.kf_id, {'progress': 'lots'})
+    assert resp.status_code == 400
+    assert progress.pending([task.kf_id]) == {}
+
+
+def test_flush_keeps_others_lock(db, fakes, progress_buffer):
+    """ Test that a flush does not release a lock taken by another """
+    conn = django_rq.get_connection()
+    task = list(fakes['tasks'].values())[0]
+    progress.record({task.kf_id: 40})
+
+    def take_over(*args, **kwargs):
+        # This flush outlived its lock and another flush took it
+        conn.set(progress.LOCK_KEY, 'other')
+        return 1
+    with patch('coordinator.progress.touch_releases', side_effect=take_over):
+        assert progress.flush() == 1
+
+    assert conn.get(progress.LOCK_KEY) == b'other'
+
+
+def test_flush_skips_newer_writes(client, db, fakes, progress_buffer):
+    """ Test that a state written while flushing keeps its progress """
+    task = list(fakes['tasks'].values())[0]
+    patch_task(client, task.kf_id, {'progress': 40})
+
+    def write_through(*args, **kwargs):
+        patch_task(client, task.kf_id, {'state': 'running', 'progress': 70})
+        return {task.kf_id.encode(): b'40'}
+    conn = django_rq.get_connection()
+    with patch.object(conn, 'hgetall', side_effect=write_through), \
+            patch('coordinator.progress.django_rq.get_connection',
+                  return_value=conn):
+        progress.flush()
+
+    assert Task.objects.get(kf_id=task.kf_id).progress == 70
+
+
+@pytest.mark.parametrize('endpoint', ['releases', 'tasks?release={}',
+                                      'events?expand=task'])
+def test_overlay_once(client, db, fakes, progress_buffer, mocker,
+                      endpoint):
+    """ Test that buffered progress is looked up once per response """
+    task = list(fakes['tasks'].values())[0]
+    Event(release_id=task.release_id, task=task, message='event').save()
+    patch_task(client, task.kf_id, {'progress': 30})
+    pending = mocker.patch('coordinator.progress.pending',
+                           wraps=progress.pending)
+
+    resp = client.get(BASE_URL+'/'+endpoint.format(task.release_id))
+    assert resp.status_code == 200
+    assert pending.call_count == 1
+    assert [t['progress'] for t in progress.rendered_tasks(resp.json())
+            if t['kf_id'] == task.kf_id] == [30]
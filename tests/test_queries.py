@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from coordinator.api.models import Event, ReleaseNote
+
+
+BASE_URL = 'http://testserver'
+
+
+@pytest.fixture
+def notes_and_events(fakes, studies):
+    """ Adds notes and events to each fake release and task """
+    notes = []
+    events = []
+    for release in fakes['releases'].values():
+        for study in studies.values():
+            notes.append(ReleaseNote(release=release, study=study,
+                                     description='lorem ipsum'))
+    for task in fakes['tasks'].values():
+        events.append(Event(release=task.release, task=task,
+                            task_service=task.task_service,
+                            message='task event'))
+    ReleaseNote.objects.bulk_create(notes)
+    Event.objects.bulk_create(events)
+    return fakes
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.parametrize('endpoint', [
+    'releases',
+    'tasks',
+    'release-notes',
+    'events',
+])
+def test_list_queries_constant(client, db, notes_and_events, endpoint):
+    """
+    Test that a page of objects costs the same number of queries no matter
+    how many objects are on the page
+    """
+    one = count_queries(client, BASE_URL+f'/{endpoint}?limit=1')
+    many = count_queries(client, BASE_URL+f'/{endpoint}?limit=50')
+    assert one == many
+
+
+def test_release_list_queries(client, db, notes_and_events):
+    """
+    Test that a page of releases is the ETag aggregate, a count, the page,
+    and one query for each of the studies, tasks, and notes
+    """
+    assert count_queries(client, BASE_URL+'/releases?limit=50') == 6
+
+
+@pytest.mark.parametrize('endpoint,queries', [
+    ('releases', 5),
+    ('tasks', 3),
+    ('release-notes', 2),
+    ('events', 2),
+])
+def test_detail_queries(client, db, notes_and_events, endpoint, queries):
+    """ Test that details are loaded without per-relation lookups """
+    kf_id = client.get(BASE_URL+f'/{endpoint}').json()['results'][0]['kf_id']
+    assert count_queries(client, BASE_URL+f'/{endpoint}/{kf_id}') == queries
@@ -0,0 +1,25 @@
+from collections import OrderedDict
+from coordinator.tasks import health_check, start_release, status_check
+from coordinator.queues import queue_for, worker_config
+
+
+def test_queue_for():
+    """ Test that jobs are routed to their queues """
+    assert queue_for(start_release) == 'lifecycle'
+    assert queue_for(status_check) == 'polling'
+    assert queue_for(health_check) == 'health_checks'
+    assert queue_for(lambda: None) == 'default'
+
+
+def test_worker_config():
+    """ Test that a supervisor program is written for each non-empty pool """
+    config = worker_config(OrderedDict([
+        ('lifecycle', {'queues': ['lifecycle'], 'workers': 2}),
+        ('polling', {'queues': ['lifecycle', 'polling'], 'workers': 1}),
+        ('notifications', {'queues': ['notifications'], 'workers': 0}),
+    ]))
+
+    assert '[program:rqworker_lifecycle]\n' in config
+    assert 'numprocs=2\n' in config
+    assert 'command=python manage.py rqworker lifecycle polling\n' in config
+    assert 'notifications' not in config
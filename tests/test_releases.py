@@ -1,6 +1,8 @@
 import json
 import pytest
-from coordinator.api.models import Release, Event
+import threading
+from django.db import connection
+from coordinator.api.models import Release, Event, VersionCounter
 from coordinator.api.models.release import next_version
 
 
@@ -14,6 +16,53 @@ def test_version_bumping(db):
     assert str(next_version(patch=True)) == '0.0.1'
 
 
+def test_concurrent_versions(transactional_db):
+    """ Test that releases created at the same time get different versions """
+    barrier = threading.Barrier(10)
+
+    def create():
+        try:
+            barrier.wait()
+            Release(name='concurrent').save()
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=create) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    versions = sorted(str(v) for v in
+                      Release.objects.values_list('version', flat=True))
+    assert versions == sorted(f'0.0.{i}' for i in range(10))
+    assert str(VersionCounter.objects.get().version) == '0.0.9'
+
+
+def test_publish_allocates_version(db):
+    """ Test that publishing takes the next version rather than its own """
+    first = Release()
+    first.save()
+    Release().save()
+    first.state = 'publishing'
+    first.complete()
+
+    assert str(first.version) == '0.1.0'
+    second = Release()
+    second.save()
+    assert str(second.version) == '0.1.1'
+
+
+def test_unsaved_release_no_version(db):
+    """ Test that only saving a release uses up a version """
+    Release()
+    Release(name='unsaved')
+    release = Release()
+    release.save()
+    assert str(release.version) == '0.0.0'
+    assert str(VersionCounter.objects.get().version) == '0.0.0'
+
+
 def test_no_releases(client, transactional_db):
     """ Test basic response """
     assert Release.objects.count() == 0
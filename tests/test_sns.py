@@ -46,3 +46,38 @@ def test_no_arn(client, transactional_db, mocker):
 
     assert Event.objects.count() == 1
     assert mock().publish.call_count == 0
+
+
+def test_bulk_events(client, transactional_db, mocker):
+    """ Test that every event created at once is published """
+    settings.SNS_ARN = 'arn:aws:sns:us-east-1:538745987955:kf-coord-api'
+    mock = mocker.patch('coordinator.api.models.boto3.client')
+
+    events = [{'event_type': 'info', 'message': f'event {i}'}
+              for i in range(3)]
+    resp = client.post(BASE_URL+'/events', json.dumps(events),
+                       content_type='application/json')
+
+    assert resp.status_code == 201
+    assert [e['message'] for e in resp.json()['results']] == [
+        'event 0', 'event 1', 'event 2']
+    assert Event.objects.count() == 3
+    assert mock().publish.call_count == 3
+    settings.SNS_ARN = None
+
+
+def test_bulk_events_publish_failure(client, transactional_db, mocker):
+    """ Test that events are still created when publishing them fails """
+    settings.SNS_ARN = 'arn:aws:sns:us-east-1:538745987955:kf-coord-api'
+    mock = mocker.patch('coordinator.api.models.boto3.client')
+    mock().publish.side_effect = [None, Exception('SNS unavailable'), None]
+
+    events = [{'event_type': 'info', 'message': f'event {i}'}
+              for i in range(3)]
+    resp = client.post(BASE_URL+'/events', json.dumps(events),
+                       content_type='application/json')
+
+    assert resp.status_code == 201
+    assert Event.objects.count() == 3
+    assert mock().publish.call_count == 3
+    settings.SNS_ARN = None
@@ -0,0 +1,38 @@
+import sys
+import pytest
+import subprocess
+from mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from coordinator.utils import lazy_import
+
+
+def test_heavy_modules_deferred():
+    """ Test that the api starts without importing boto3 or the docs """
+    code = ('import sys, django; django.setup(); '
+            'import coordinator.wsgi, coordinator.urls; '
+            'print(",".join(m for m in ["boto3", "drf_yasg.views"] '
+            'if m in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], check=True,
+                         stdout=subprocess.PIPE)
+    assert out.stdout.decode().strip() == ''
+
+
+def test_lazy_import():
+    """ Test that a lazy module may be used and patched like the module """
+    json = lazy_import('json')
+    assert json.dumps([]) == '[]'
+
+    with patch.object(json, 'dumps', return_value='patched'):
+        assert json.dumps([]) == 'patched'
+    assert json.dumps([]) == '[]'
+
+
+def test_startup_budget(capsys):
+    """ Test that the benchmark fails when startup is over budget """
+    call_command('benchmark_startup', iterations=1)
+    out = capsys.readouterr().out
+    assert 'api' in out and 'worker' in out
+
+    with pytest.raises(CommandError):
+        call_command('benchmark_startup', iterations=1, max_seconds=0)
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from coordinator.api.models import (Event, Release, ReleaseStat, Task,
+                                    TaskService)
+
+
+BASE_URL = 'http://testserver'
+
+
+def make_release(state, created_at, published_after=None):
+    release = Release(name='stats', state=state)
+    release.save()
+    Release.objects.filter(kf_id=release.kf_id).update(created_at=created_at)
+    if published_after is not None:
+        event = Event(release=release,
+                      message=f'release {release.kf_id}, version 0.0.0 '
+                              'changed from publishing to published',
+                      from_state='publishing', to_state='published')
+        event.save()
+        (Event.objects.filter(kf_id=event.kf_id)
+                      .update(created_at=created_at + published_after))
+    return release
+
+
+def test_release_stats(client, db):
+    """ Test that releases are summarized by month and state """
+    january = datetime(2018, 1, 10, tzinfo=timezone.utc)
+    february = datetime(2018, 2, 10, tzinfo=timezone.utc)
+    make_release('published', january, timedelta(hours=1))
+    make_release('published', january, timedelta(hours=3))
+    make_release('published', january, timedelta(hours=8))
+    make_release('failed', january)
+    make_release('published', february, timedelta(hours=2))
+    make_release('canceled', february)
+    make_release('running', february)
+
+    ReleaseStat.refresh()
+    resp = client.get(BASE_URL+'/releases/stats')
+
+    assert resp.status_code == 200
+    res = resp.json()
+    assert res['refreshed_at'] is not None
+    assert res['releases'] == 7
+    assert res['states'] == {'published': 4, 'failed': 1, 'canceled': 1,
+                             'running': 1}
+    assert res['success_rate'] == 4 / 6
+    assert res['failure_rate'] == 1 / 6
+
+    jan, feb = res['months']
+    assert jan['month'] == '2018-01'
+    assert jan['states'] == {'published': 3, 'failed': 1}
+    assert jan['median_time_to_publish'] == 3 * 3600
+    assert jan['success_rate'] == 3 / 4
+    assert feb['month'] == '2018-02'
+    assert feb['median_time_to_publish'] == 2 * 3600
+    assert feb['failure_rate'] == 0
+
+
+def test_task_publish_events_ignored(client, db):
+    """ Test that tasks publishing before their release do not count """
+    january = datetime(2018, 1, 10, tzinfo=timezone.utc)
+    service = TaskService(name='stats', url='http://ts', author='me')
+    service.save()
+    for hours in [1, 3, 8]:
+        release = make_release('published', january, timedelta(hours=hours))
+        task = Task(release=release, task_service=service)
+        task.save()
+        event = Event(release=release, task=task, task_service=service,
+                      message=f'task {task.kf_id} changed from publishing '
+                              'to published',
+                      from_state='publishing', to_state='published')
+        event.save()
+        (Event.objects.filter(kf_id=event.kf_id)
+                      .update(created_at=january + timedelta(minutes=1)))
+
+    ReleaseStat.refresh()
+    res = client.get(BASE_URL+'/releases/stats').json()
+    assert res['months'][0]['median_time_to_publish'] == 3 * 3600
+
+
+def test_stats_not_refreshed(client, db):
+    """ Test that stats are only updated when the view is refreshed """
+    ReleaseStat.refresh()
+    make_release('waiting', datetime(2018, 1, 10, tzinfo=timezone.utc))
+
+    res = client.get(BASE_URL+'/releases/stats').json()
+    assert res['releases'] == 0
+    assert res['months'] == []
+    assert res['success_rate'] is None
+
+    ReleaseStat.refresh()
+    res = client.get(BASE_URL+'/releases/stats').json()
+    assert res['releases'] == 1
@@ -1,9 +1,14 @@
 import pytest
 from datetime import datetime, timezone
+from django.db import connection
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
 from requests.exceptions import ConnectionError
 from mock import Mock, patch
-from coordinator.api.models import Release, Study
+from coordinator.api.models import Release, Study, StudySync
 from coordinator.api.serializers import StudySerializer
+from coordinator.queues import enqueue
+from coordinator.tasks import health_check
 
 
 BASE_URL = 'http://testserver'
@@ -58,41 +63,47 @@ def test_nested_releases(admin_client, transactional_db, release, studies):
     assert resp.json()['results'][-1]['kf_id'] == release['kf_id']
 
 
-def test_sync_studies_fail(client):
+def sync(client, worker):
+    """ Start a sync, run it, and return its final status """
+    resp = client.post(BASE_URL+'/studies/sync')
+    assert resp.status_code == 202
+    job = resp.json()['job']
+
+    worker.work(burst=True)
+
+    resp = client.get(BASE_URL+f'/studies/sync/{job}')
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_sync_studies_fail(client, worker):
     """ Test that dataservice errors are returned when there is a problem  """
-    with patch('coordinator.api.views.studies.requests') as mock_requests:
-        mock_resp = Mock()
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={})
         mock_resp.json.return_value = {'message': 'server error'}
         mock_requests.get.return_value = mock_resp
         mock_requests.get.return_value.status_code = 500
 
-        resp = client.post(BASE_URL+'/studies/sync')
-        assert resp.status_code == 500
-        res = resp.json()
+        res = sync(client, worker)
+        assert res['status'] == 'failed'
         assert res['message'] == 'server error'
 
-        assert mock_requests.get.call_count == 1
         expected = 'http://dataservice/studies?limit=100'
-        mock_requests.get.assert_called_with(expected)
+        mock_requests.get.assert_called_with(expected, headers={}, timeout=0.1)
 
         mock_resp.json.return_value = {'<html>Server error</html>'}
         mock_requests.get.return_value = mock_resp
         mock_requests.get.return_value.status_code = 500
 
-        resp = client.post(BASE_URL+'/studies/sync')
-        assert resp.status_code == 500
-        res = resp.json()
+        res = sync(client, worker)
+        assert res['status'] == 'failed'
         assert res['message'].endswith('getting studies from the dataservice')
 
-        assert mock_requests.get.call_count == 2
-        expected = 'http://dataservice/studies?limit=100'
-        mock_requests.get.assert_called_with(expected)
 
-
-def test_sync_studies_updated(client, db, studies):
+def test_sync_studies_updated(client, db, studies, worker):
     """ Test that fields are updated on change in dataservice """
-    with patch('coordinator.api.views.studies.requests') as mock_requests:
-        mock_resp = Mock()
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={})
         mock_resp.json.return_value = {
             'results': [StudySerializer(v).data for v in studies.values()]
         }
@@ -102,48 +113,187 @@ def test_sync_studies_updated(client, db, studies):
 
         assert Study.objects.count() == 5
 
-        resp = client.post(BASE_URL+'/studies/sync')
-        assert resp.status_code == 200
-        res = resp.json()
+        res = sync(client, worker)
+        assert res['status'] == 'finished'
+        assert res['updated'] == 1
 
         assert mock_requests.get.call_count == 1
         expected = 'http://dataservice/studies?limit=100'
-        mock_requests.get.assert_called_with(expected)
+        mock_requests.get.assert_called_with(expected, headers={}, timeout=0.1)
 
         assert Study.objects.count() == 5
         assert Study.objects.get(kf_id='SD_00000004').name == 'Updated Name'
 
 
-def test_sync_studies_deleted(client, db, studies):
+def test_sync_studies_deleted(client, db, studies, worker):
     """ Test that studies are set as deleted when removed from dataservice """
-    with patch('coordinator.api.views.studies.requests') as mock_requests:
-        mock_resp = Mock()
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={})
         mock_resp.json.return_value = {
             'results': [StudySerializer(v).data for v in studies.values()]
         }
         mock_resp.json.return_value['results'][-1]['name'] = 'Updated Name'
         mock_requests.get.return_value = mock_resp
         mock_requests.get.return_value.status_code = 200
+        results = mock_resp.json.return_value['results']
 
         assert Study.objects.count() == 5
 
-        resp = client.post(BASE_URL+'/studies/sync')
-        assert resp.status_code == 200
-        res = resp.json()
+        res = sync(client, worker)
+        assert res['status'] == 'finished'
 
         # Remove a study
-        mock_resp.json.return_value = {
-            'results': mock_resp.json.return_value['results'][:-1]
-        }
+        mock_resp.json.return_value = {'results': results[:-1]}
 
-        resp = client.post(BASE_URL+'/studies/sync')
-        assert resp.status_code == 200
-        assert resp.json()['new'] == 0
-        assert resp.json()['deleted'] == 1
+        res = sync(client, worker)
+        assert res['new'] == 0
+        assert res['deleted'] == 1
         assert Study.objects.count() == 5
 
         assert Study.objects.get(kf_id='SD_00000004').deleted
 
+        # Bring it back
+        mock_resp.json.return_value = {'results': results}
+
+        res = sync(client, worker)
+        assert res['updated'] == 1
+        assert res['deleted'] == 0
+        assert not Study.objects.get(kf_id='SD_00000004').deleted
+
+
+def test_sync_studies_paginated(client, db, studies, worker):
+    """ Test that every page of studies is synchronized """
+    results = [StudySerializer(v).data for v in studies.values()]
+    results.append({
+        'kf_id': 'SD_XXXXXXXX',
+        'name': 'New Study',
+        'visible': True,
+        'created_at': '2019-06-06T00:00:00Z',
+    })
+    pages = {
+        '/studies?limit=100': {
+            'results': results[:3],
+            'total': 6,
+            '_links': {'next': '/studies?after=3&limit=100'},
+        },
+        '/studies?after=3&limit=100': {
+            'results': results[3:],
+            'total': 6,
+            '_links': {'self': '/studies?after=3&limit=100'},
+        },
+    }
+
+    def get(url, *args, **kwargs):
+        resp = Mock(headers={})
+        resp.status_code = 200
+        resp.json.return_value = pages[url.replace('http://dataservice', '')]
+        return resp
+
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_requests.get.side_effect = get
+        res = sync(client, worker)
+
+    assert res['status'] == 'finished'
+    assert res['pages'] == 2
+    assert res['studies'] == res['total'] == 6
+    assert res['new'] == 1
+    assert res['deleted'] == 0
+    assert Study.objects.count() == 6
+
+
+def test_sync_studies_unchanged(client, db, studies, worker):
+    """ Test that studies that have not changed are not written """
+    updated_at = {s.kf_id: s.updated_at for s in Study.objects.all()}
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={})
+        mock_resp.json.return_value = {
+            'results': [StudySerializer(v).data for v in studies.values()]
+        }
+        mock_requests.get.return_value = mock_resp
+        mock_requests.get.return_value.status_code = 200
+
+        res = sync(client, worker)
+
+    assert res['new'] == res['updated'] == res['deleted'] == 0
+    assert {s.kf_id: s.updated_at for s in Study.objects.all()} == updated_at
+
+
+def test_sync_studies_not_modified(client, db, studies, worker):
+    """ Test that pages the dataservice has not modified are skipped """
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={'ETag': '"abc"'})
+        mock_resp.json.return_value = {
+            'results': [StudySerializer(v).data for v in studies.values()]
+        }
+        mock_requests.get.return_value = mock_resp
+        mock_requests.get.return_value.status_code = 200
+
+        res = sync(client, worker)
+        assert res['unchanged_pages'] == 0
+
+        mock_requests.get.return_value = Mock(status_code=304)
+        res = sync(client, worker)
+
+        expected = 'http://dataservice/studies?limit=100'
+        mock_requests.get.assert_called_with(
+            expected, headers={'If-None-Match': '"abc"'}, timeout=0.1)
+
+    assert res['status'] == 'finished'
+    assert res['unchanged_pages'] == 1
+    assert res['studies'] == 5
+    assert res['deleted'] == 0
+
+    resp = client.get(BASE_URL+'/studies/sync')
+    assert resp.status_code == 200
+    assert resp.json()['state'] == 'succeeded'
+    assert resp.json()['unchanged_pages'] == 1
+    assert StudySync.objects.count() == 2
+
+
+def test_sync_studies_failed_record(client, db, worker):
+    """ Test that a failed sync is recorded but not reported as the last """
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_requests.get.return_value = Mock(status_code=500)
+        res = sync(client, worker)
+
+    assert res['status'] == 'failed'
+    assert StudySync.objects.get().state == 'failed'
+    assert client.get(BASE_URL+'/studies/sync').status_code == 404
+
+
+def test_sync_command(db, studies):
+    """ Test that the command skips syncing when the last sync is recent """
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={})
+        mock_resp.json.return_value = {
+            'results': [StudySerializer(v).data for v in studies.values()]
+        }
+        mock_requests.get.return_value = mock_resp
+        mock_requests.get.return_value.status_code = 200
+
+        call_command('sync_studies', '--max-age', '3600')
+        assert mock_requests.get.call_count == 1
+        call_command('sync_studies', '--max-age', '3600')
+        assert mock_requests.get.call_count == 1
+
+    assert StudySync.objects.get().state == 'succeeded'
+
+
+def test_sync_status_not_found(client):
+    """ Test that an unknown sync job is not found """
+    resp = client.get(BASE_URL+'/studies/sync/not-a-job')
+    assert resp.status_code == 404
+
+
+def test_sync_status_other_job(client):
+    """ Test that jobs other than study syncs are not shown """
+    job = enqueue(health_check, 'TS_00000000')
+    try:
+        resp = client.get(BASE_URL+f'/studies/sync/{job.id}')
+        assert resp.status_code == 404
+    finally:
+        job.cancel()
+
 
 def test_no_delete_update(client, db, studies):
     """ Test that studies may not be deleted or updated from api """
@@ -261,10 +411,38 @@ def test_last_published_fields(admin_client, db, studies, worker):
     assert resp.json()['last_pub_date'] == created_at_2
 
 
-def test_new_study(client, db, studies):
+def test_study_list_queries(client, db, releases):
+    """
+    Test that versions are annotated on the list of studies instead of being
+    looked up for each study
+    """
+    published = list(releases.values())[0]
+    published.state = 'published'
+    published.save()
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(BASE_URL+'/studies?limit=1')
+    one = len(ctx.captured_queries)
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(BASE_URL+'/studies?limit=100')
+    assert len(ctx.captured_queries) == one == 4
+
+    studies = {s['kf_id']: s for s in resp.json()['results']}
+    for release in releases.values():
+        study = studies[release.studies.first().kf_id]
+        assert study['version'] == str(release.version)
+        if release == published:
+            assert study['last_pub_version'] == str(release.version)
+            assert study['last_pub_date'] is not None
+        else:
+            assert study['last_pub_version'] is None
+            assert study['last_pub_date'] is None
+
+
+def test_new_study(client, db, studies, worker):
     """ Test case that a new study has been added to the dataservice """
-    with patch('coordinator.api.views.studies.requests') as mock_requests:
-        mock_resp = Mock()
+    with patch('coordinator.tasks.requests') as mock_requests:
+        mock_resp = Mock(headers={})
         mock_resp.json.return_value = {
             'results': [StudySerializer(v).data for v in studies.values()]
         }
@@ -281,15 +459,14 @@ def test_new_study(client, db, studies):
 
         assert Study.objects.count() == 5
 
-        resp = client.post(BASE_URL+'/studies/sync')
-        assert resp.status_code == 200
-        res = resp.json()
+        res = sync(client, worker)
+        assert res['status'] == 'finished'
         assert res['new'] == 1
         assert res['deleted'] == 0
 
         assert mock_requests.get.call_count == 1
         expected = 'http://dataservice/studies?limit=100'
-        mock_requests.get.assert_called_with(expected)
+        mock_requests.get.assert_called_with(expected, headers={}, timeout=0.1)
 
         assert Study.objects.count() == 6
         assert Study.objects.get(kf_id='SD_XXXXXXXX').name == 'New Study'
@@ -299,7 +476,7 @@ def test_get_study(client, db):
     """ Test that dataservice is called for studies """
     return
     with patch('coordinator.api.views.studies.requests') as mock_requests:
-        mock_resp = Mock()
+        mock_resp = Mock(headers={})
         mock_resp.raise_for_status.side_effect = ConnectionError()
         mock_resp.json.return_value = {'results': {'external_id': 'phs'}}
         mock_requests.get.return_value = mock_resp
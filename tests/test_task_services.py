@@ -205,3 +205,29 @@ def test_task_service_bad_status(client, db, task_service):
         ts.health_check()
         assert ts.last_ok_status == 4
         assert ts.health_status == 'down'
+
+
+def test_bulk_task_services(admin_client, db, mocker):
+    """ Test that many task services may be registered at once """
+    mock_requests = mocker.patch('coordinator.api.validators.requests')
+    mock_resp = Mock()
+    mock_resp.status_code = 200
+    mock_resp.content = str.encode('{"name": "test"}')
+    mock_requests.get.return_value = mock_resp
+
+    services = [{'name': f'service {i}',
+                 'url': f'http://service{i}',
+                 'author': 'daniel@d3b.center',
+                 'description': 'lorem ipsum'}
+                for i in range(3)]
+    services[1]['url'] = 'not a url'
+    resp = admin_client.post(BASE_URL+'/task-services', services,
+                             format='json')
+
+    assert resp.status_code == 207
+    res = resp.json()
+    assert res['results'][0]['name'] == 'service 0'
+    assert res['results'][1] is None
+    assert res['errors'][1]['url'] == ['Enter a valid URL.']
+    assert res['results'][2]['kf_id'].startswith('TS_')
+    assert TaskService.objects.count() == 2
@@ -1,5 +1,8 @@
+import json
 import pytest
 from mock import Mock, patch
+from django.conf import settings
+from django.db import connection
 from coordinator.api.models import Release, Task, TaskService
 
 
@@ -117,3 +120,97 @@ def test_status_check(client, transactional_db, task, worker, mock_ego):
         # worker.work(burst=True)
         # release = t.release
         # assert release.state == 'canceling'
+
+
+@pytest.fixture
+def running_release(transactional_db, task_services):
+    """ A running release with three running tasks """
+    release = Release(name='running', state='running')
+    release.save()
+    service = list(task_services.values())[0]
+    tasks = [Task(release=release, task_service=service, state='running')
+             for _ in range(3)]
+    Task.objects.bulk_create(tasks)
+    return release, [t.kf_id for t in tasks]
+
+
+def report(client, reports):
+    return client.post(BASE_URL+'/tasks/report', json.dumps(reports),
+                       content_type='application/json')
+
+
+def test_report_progress(client, running_release):
+    """ Test that progress of many tasks is reported at once """
+    release, tasks = running_release
+    resp = report(client, [{'kf_id': kf_id, 'progress': 10 * i}
+                           for i, kf_id in enumerate(tasks)])
+
+    assert resp.status_code == 200
+    assert [r['progress'] for r in resp.json()['results']] == [0, 10, 20]
+    assert {t.state for t in Task.objects.all()} == {'running'}
+    assert Release.objects.get().state == 'running'
+
+
+def test_report_staged(client, running_release):
+    """ Test that the release is staged once all tasks report staged """
+    release, tasks = running_release
+    resp = report(client, [{'kf_id': kf_id, 'state': 'staged'}
+                           for kf_id in tasks[:2]])
+    assert resp.status_code == 200
+    assert Release.objects.get().state == 'running'
+
+    resp = report(client, [{'kf_id': tasks[2], 'state': 'staged',
+                            'progress': 100}])
+    assert resp.status_code == 200
+    assert Release.objects.get().state == 'staged'
+    assert Task.objects.get(kf_id=tasks[2]).progress == 100
+
+
+def test_report_failed(client, running_release, mocker):
+    """ Test that a failed task fails its release once """
+    enqueue = mocker.patch('coordinator.api.views.task.enqueue')
+    release, tasks = running_release
+    resp = report(client, [{'kf_id': kf_id, 'state': 'failed'}
+                           for kf_id in tasks])
+
+    assert resp.status_code == 200
+    assert Release.objects.get().state == 'failed'
+    assert enqueue.call_count == 1
+
+
+def test_report_published_after_commit(client, running_release, mocker):
+    """ Test that reported transitions are published once they are saved """
+    settings.SNS_ARN = 'arn:aws:sns:us-east-1:538745987955:kf-coord-api'
+    mock = mocker.patch('coordinator.api.models.boto3.client')
+    in_transaction = []
+    mock().publish.side_effect = (
+        lambda **kwargs: in_transaction.append(connection.in_atomic_block))
+    release, tasks = running_release
+    resp = report(client, [{'kf_id': kf_id, 'state': 'staged'}
+                           for kf_id in tasks])
+    settings.SNS_ARN = None
+
+    assert resp.status_code == 200
+    assert in_transaction and not any(in_transaction)
+    published = [json.loads(json.loads(c[1]['Message'])['default'])['task']
+                 for c in mock().publish.call_args_list]
+    assert set(tasks) <= set(published)
+
+
+def test_report_errors(client, running_release):
+    """ Test that bad reports are returned with the good ones applied """
+    release, tasks = running_release
+    resp = report(client, [{'kf_id': tasks[0], 'progress': 50},
+                           {'kf_id': 'TA_XXXXXXXX', 'progress': 50},
+                           {'kf_id': tasks[1]}])
+
+    assert resp.status_code == 207
+    res = resp.json()
+    assert res['results'][0]['progress'] == 50
+    assert res['results'][1] is None
+    assert 'kf_id' in res['errors'][1]
+    assert res['errors'][2] is not None
+    assert Task.objects.get(kf_id=tasks[0]).progress == 50
+
+    resp = report(client, {'kf_id': tasks[0]})
+    assert resp.status_code == 400
@@ -0,0 +1,148 @@
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from coordinator import cache
+from coordinator.api.models import Event, Release, Task, TaskService
+
+
+BASE_URL = 'http://testserver'
+START = datetime(2018, 1, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def release_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def at(minutes, **kwargs):
+    """ Record an event as if it happened some minutes after the start """
+    event = Event(**kwargs)
+    event.save()
+    (Event.objects.filter(kf_id=event.kf_id)
+                  .update(created_at=START + timedelta(minutes=minutes)))
+
+
+def release_change(release, minutes, source, target):
+    at(minutes, release=release,
+       message=f'release {release.kf_id}, version 0.0.0 changed '
+               f'from {source} to {target}',
+       from_state=source, to_state=target)
+
+
+def task_change(task, minutes, source, target):
+    at(minutes, release=task.release, task=task,
+       task_service=task.task_service,
+       message=f'task {task.kf_id} changed from {source} to {target}',
+       from_state=source, to_state=target)
+
+
+@pytest.fixture
+def published(db):
+    """ A release whose second task took longest to run """
+    release = Release(name='timeline', state='published')
+    release.save()
+    Release.objects.filter(kf_id=release.kf_id).update(created_at=START)
+    tasks = []
+    for name in ['fast', 'slow']:
+        service = TaskService(name=name, url='http://ts', author='me')
+        service.save()
+        task = Task(release=release, task_service=service)
+        task.save()
+        tasks.append(task)
+    fast, slow = tasks
+
+    release_change(release, 1, 'waiting', 'initializing')
+    task_change(fast, 2, 'pending', 'initialized')
+    task_change(slow, 3, 'pending', 'initialized')
+    release_change(release, 3, 'initializing', 'running')
+    task_change(fast, 4, 'initialized', 'running')
+    task_change(slow, 4, 'initialized', 'running')
+    task_change(fast, 10, 'running', 'staged')
+    task_change(slow, 30, 'running', 'staged')
+    release_change(release, 30, 'running', 'staged')
+    release_change(release, 60, 'staged', 'publishing')
+    task_change(fast, 61, 'staged', 'publishing')
+    task_change(slow, 61, 'staged', 'publishing')
+    task_change(fast, 65, 'publishing', 'published')
+    task_change(slow, 62, 'publishing', 'published')
+    release_change(release, 65, 'publishing', 'published')
+    return release, fast, slow
+
+
+def test_timeline(client, published):
+    """ Test that phases are timed and the slowest task is on the path """
+    release, fast, slow = published
+    resp = client.get(BASE_URL+f'/releases/{release.kf_id}/timeline')
+
+    assert resp.status_code == 200
+    res = resp.json()
+    assert res['state'] == 'published'
+    assert res['duration'] == 65 * 60
+    assert [(p['phase'], p['duration']) for p in res['phases']] == [
+        ('initializing', 2 * 60),
+        ('running', 27 * 60),
+        ('staged', 30 * 60),
+        ('publishing', 5 * 60),
+    ]
+    assert [(p['phase'], p['task'], p['name'])
+            for p in res['critical_path']] == [
+        ('initializing', slow.kf_id, 'slow'),
+        ('running', slow.kf_id, 'slow'),
+        ('publishing', fast.kf_id, 'fast'),
+    ]
+    assert res['phases'][2]['critical_task'] is None
+
+    tasks = {t['kf_id']: t for t in res['tasks']}
+    running = tasks[slow.kf_id]['phases'][1]
+    assert running['duration'] == 26 * 60
+    assert running['critical']
+    assert not tasks[fast.kf_id]['phases'][1]['critical']
+
+
+def test_timeline_in_progress(client, db):
+    """ Test that phases that have not finished have no duration """
+    release = Release(name='timeline', state='initializing')
+    release.save()
+    release_change(release, 1, 'waiting', 'initializing')
+
+    res = client.get(BASE_URL+f'/releases/{release.kf_id}/timeline').json()
+    assert res['finished_at'] is None
+    assert res['phases'][0]['started_at'] is not None
+    assert res['phases'][0]['duration'] is None
+    assert res['critical_path'] == []
+
+
+def test_timeline_not_found(client, db):
+    resp = client.get(BASE_URL+'/releases/RE_00000000/timeline')
+    assert resp.status_code == 404
+
+
+def test_finished_timeline_cached(client, published, release_cache):
+    """ Test that the events of a finished release are only read once """
+    release = published[0]
+    url = BASE_URL+f'/releases/{release.kf_id}/timeline'
+    first = client.get(url).json()
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url).json() == first
+    # Only the release's state is looked up
+    assert len(ctx.captured_queries) == 1
+
+
+def test_reported_state_recorded(client, db, fakes):
+    """ Test that a task service reporting a new state records an event """
+    task = list(fakes['tasks'].values())[0]
+    resp = client.patch(BASE_URL+f'/tasks/{task.kf_id}',
+                        json.dumps({'state': 'running'}),
+                        content_type='application/json')
+    assert resp.status_code == 200
+
+    event = Event.objects.get(task_id=task.kf_id)
+    assert event.message == (f'task {task.kf_id} changed from '
+                             f'{task.state} to running')
+    assert (event.from_state, event.to_state) == (task.state, 'running')
+    assert event.release_id == task.release_id
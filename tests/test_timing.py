@@ -0,0 +1,41 @@
+import pytest
+from django.test import Client
+
+
+BASE_URL = 'http://testserver'
+
+
+@pytest.fixture
+def timed(settings):
+    settings.REQUEST_TIMING = True
+    # The middleware is loaded by the first request of a new client
+    return Client()
+
+
+def test_timing_disabled(client, db):
+    """ Test that requests are not timed unless enabled """
+    resp = client.get(BASE_URL+'/releases')
+    assert resp.status_code == 200
+    assert 'Server-Timing' not in resp
+
+
+def test_server_timing(timed, db, fakes):
+    """ Test that the phases of a request are reported """
+    resp = timed.get(BASE_URL+'/releases')
+    assert resp.status_code == 200
+
+    metrics = [m.split(';')[0] for m in resp['Server-Timing'].split(', ')]
+    assert metrics == ['db', 'serialize', 'view', 'render', 'total']
+    assert 'queries"' in resp['Server-Timing']
+
+
+def test_slow_request_logged(timed, db, fakes, settings, caplog):
+    """ Test that slow requests are logged with their slowest queries """
+    settings.SLOW_REQUEST_MS = 0
+    timed.get(BASE_URL+'/releases')
+
+    logged = [r.getMessage() for r in caplog.records
+              if r.name == 'coordinator.timing']
+    assert len(logged) == 1
+    assert logged[0].startswith('slow request GET /releases 200')
+    assert 'SELECT' in logged[0]
@@ -0,0 +1,80 @@
+import os
+import stat
+import pytest
+from mock import MagicMock
+from coordinator import vault
+
+
+PATHS = {
+    'database': 'secret/pg',
+    'redis': 'secret/redis',
+    'ego': 'secret/ego',
+}
+
+
+@pytest.fixture
+def mock_vault(mocker, tmpdir, monkeypatch):
+    """ Mocks the vault client and puts the secrets cache in a temp dir """
+    monkeypatch.setenv('VAULT_URL', 'http://vault')
+    monkeypatch.setenv('VAULT_ROLE', 'coordinator')
+    monkeypatch.setenv('PG_SECRET', PATHS['database'])
+    monkeypatch.setenv('REDIS_SECRET', PATHS['redis'])
+    monkeypatch.setenv('EGO_SECRET', PATHS['ego'])
+    mocker.patch('coordinator.vault.CACHE_PATH',
+                 str(tmpdir.join('secrets.json')))
+
+    hvac = MagicMock()
+    client = hvac.Client.return_value
+    client.read.side_effect = lambda path: {'data': {'path': path}}
+    mocker.patch.dict('sys.modules', {'hvac': hvac})
+    return client
+
+
+def test_no_vault(monkeypatch):
+    """ Test that nothing is loaded if vault is not configured """
+    monkeypatch.delenv('VAULT_URL', raising=False)
+    assert vault.load_secrets() == {}
+
+
+def test_load_secrets(mock_vault):
+    """ Test that all secrets are read with a single login """
+    secrets = vault.load_secrets()
+
+    assert secrets == {name: {'path': path} for name, path in PATHS.items()}
+    assert mock_vault.auth_iam.call_count == 1
+    assert mock_vault.read.call_count == 3
+    assert mock_vault.logout.call_count == 1
+
+
+def test_cached_secrets(mock_vault):
+    """ Test that secrets are loaded from the cache while it is current """
+    secrets = vault.load_secrets()
+    assert vault.load_secrets() == secrets
+    assert mock_vault.auth_iam.call_count == 1
+
+    mode = os.stat(vault.CACHE_PATH).st_mode
+    assert stat.S_IMODE(mode) == 0o600
+
+
+def test_expired_cache(mock_vault, mocker):
+    """ Test that secrets are loaded again once the cache expires """
+    vault.load_secrets()
+    mocker.patch('coordinator.vault.CACHE_TTL', -1)
+    vault.load_secrets()
+    assert mock_vault.auth_iam.call_count == 2
+
+
+def test_cache_for_other_paths(mock_vault):
+    """ Test that a cache of different secrets is not used """
+    vault.load_secrets()
+    secrets = vault.load_secrets({'database': 'secret/other'})
+    assert secrets == {'database': {'path': 'secret/other'}}
+    assert mock_vault.auth_iam.call_count == 2
+
+
+def test_unsafe_cache(mock_vault):
+    """ Test that a cache readable by others is ignored """
+    vault.load_secrets()
+    os.chmod(vault.CACHE_PATH, 0o644)
+    vault.load_secrets()
+    assert mock_vault.auth_iam.call_count == 2